@@ -2,6 +2,7 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -154,6 +155,43 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': int(os.getenv('API_PAGE_SIZE', '20')),
 }
 
+# Version stamps (core.versioning) and derived caches must be shared between
+# workers, so production requires REDIS_URL. LocMem is per-process: it is only
+# accepted with DEBUG or an explicit CACHE_LOCAL=True (single process, tests).
+REDIS_URL = os.getenv('REDIS_URL')
+CACHE_LOCAL = DEBUG or os.getenv('CACHE_LOCAL', 'False') == 'True'
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif CACHE_LOCAL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    raise ImproperlyConfigured(
+        'Defina REDIS_URL: sem cache compartilhado os workers servem versões e ETags desatualizadas. '
+        'Use CACHE_LOCAL=True apenas em desenvolvimento ou testes.'
+    )
+
+JOBS_SINCRONOS = os.getenv('JOBS_SINCRONOS', 'False') == 'True'
+
+PDF_BROWSER_POOL_SIZE = int(os.getenv('PDF_BROWSER_POOL_SIZE', '2'))
+PDF_BROWSER_MAX_RENDERS = int(os.getenv('PDF_BROWSER_MAX_RENDERS', '200'))
+# Defaults to MEDIA_ROOT / 'pdf_cache' when unset.
+PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR')
+PDF_CACHE_MAX_BYTES = int(os.getenv('PDF_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+PDF_LOTE_TAMANHO_BLOCO = int(os.getenv('PDF_LOTE_TAMANHO_BLOCO', '200'))
+PDF_LOTE_PARALELISMO = int(os.getenv('PDF_LOTE_PARALELISMO', '4'))
+PDF_LOTE_PARALELISMO_MAXIMO = int(os.getenv('PDF_LOTE_PARALELISMO_MAXIMO', '8'))
+
+RELATORIO_SNAPSHOT_MAX_AGE = int(os.getenv('RELATORIO_SNAPSHOT_MAX_AGE', '3600'))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
@@ -1,4 +1,9 @@
-from .settings import *  # noqa: F401,F403
+import os
+
+# Single-process test runs may use the per-process LocMem cache.
+os.environ.setdefault('CACHE_LOCAL', 'True')
+
+from .settings import *  # noqa: E402,F401,F403
 
 DATABASES['default'] = {  # type: ignore[name-defined]
     'ENGINE': 'django.db.backends.sqlite3',
@@ -10,3 +15,6 @@ PASSWORD_HASHERS = [
 ]
 
 MIDDLEWARE = [mw for mw in MIDDLEWARE if mw != 'whitenoise.middleware.WhiteNoiseMiddleware']  # type: ignore[name-defined]
+
+# Background jobs run inline so tests can assert on their final state.
+JOBS_SINCRONOS = True
@@ -1,8 +1,9 @@
 from django.contrib import admin
 
-from .models import Avaliacao, Caderno, CadernoQuestao, ProvaAluno
+from .models import Avaliacao, Caderno, CadernoQuestao, LoteImpressao, ProvaAluno
 
 admin.site.register(Avaliacao)
 admin.site.register(Caderno)
 admin.site.register(CadernoQuestao)
 admin.site.register(ProvaAluno)
+admin.site.register(LoteImpressao)
@@ -0,0 +1,73 @@
+"""Render contexts shared by every PDF output of a prova."""
+
+from typing import Any, Optional
+
+from .models import Avaliacao, Caderno, CadernoQuestao, ProvaAluno
+from .qr import payload_com_token
+
+
+GABARITO_LAYOUT = {
+    'columns': ['questao', 'A', 'B', 'C', 'D', 'E'],
+    'column_width_mm': [20, 16, 16, 16, 16, 16],
+    'row_height_mm': 12,
+    'grid_padding_mm': {'top': 18, 'bottom': 18, 'left': 22, 'right': 22},
+    'marker_size_mm': 14,
+    'marker_offset_mm': 12,
+    'marker_positions': [
+        {'id': 'M1', 'placement': 'top_left'},
+        {'id': 'M2', 'placement': 'top_right'},
+        {'id': 'M3', 'placement': 'bottom_left'},
+        {'id': 'M4', 'placement': 'bottom_right'},
+    ],
+}
+
+
+def build_caderno_pdf_context(avaliacao: Avaliacao, caderno: Optional[Caderno]) -> dict[str, Any]:
+    """Context shared by every prova of ``caderno``: questions and answer-sheet layout."""
+
+    questoes_info: list[dict[str, Any]] = []
+    if caderno:
+        caderno_questoes = (
+            CadernoQuestao.objects.filter(caderno=caderno).select_related('questao').order_by('ordem')
+        )
+        for cq in caderno_questoes:
+            questao = cq.questao
+            alternativas = [
+                {'letra': 'A', 'texto': questao.alternativa_a},
+                {'letra': 'B', 'texto': questao.alternativa_b},
+                {'letra': 'C', 'texto': questao.alternativa_c},
+                {'letra': 'D', 'texto': questao.alternativa_d},
+                {'letra': 'E', 'texto': questao.alternativa_e},
+            ]
+            questoes_info.append(
+                {
+                    'ordem': cq.ordem,
+                    'enunciado': questao.enunciado,
+                    'alternativas': alternativas,
+                }
+            )
+
+    return {
+        'titulo': avaliacao.titulo,
+        'data_aplicacao': getattr(avaliacao, 'data_aplicacao', None),
+        'questoes': questoes_info,
+        'total_questoes': len(questoes_info),
+        'gabarito_layout': GABARITO_LAYOUT,
+    }
+
+
+def build_prova_pdf_context(prova: ProvaAluno, caderno_context: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+    aluno = prova.aluno
+    turma = getattr(aluno, 'turma', None)
+    escola = getattr(turma, 'escola', None)
+    if caderno_context is None:
+        caderno_context = build_caderno_pdf_context(prova.avaliacao, prova.caderno)
+
+    return {
+        **caderno_context,
+        'aluno_nome': getattr(aluno, 'nome', ''),
+        'turma_nome': getattr(turma, 'nome', ''),
+        'escola_nome': getattr(escola, 'nome', ''),
+        # Rows created before the compact token format still print a signed token.
+        'qr_payload': payload_com_token(prova.qr_payload, prova.id, prova.caderno_id),
+    }
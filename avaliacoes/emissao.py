@@ -0,0 +1,150 @@
+"""Bulk issuance of provas (ProvaAluno) for the turmas of an avaliação."""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from django.db import transaction
+
+from core.versioning import marcar_alteracao
+from escolas.models import Aluno
+
+from .models import Avaliacao, Caderno, ProvaAluno
+from .qr import payload_com_token
+
+# rodizio: cadernos alternate between neighbouring alunos of each turma;
+# turma: every aluno of a turma gets the same caderno, turmas rotate through them.
+DISTRIBUICOES = ('rodizio', 'turma')
+TAMANHO_LOTE_EMISSAO = 2000
+
+
+class EmissaoInvalida(ValueError):
+    pass
+
+
+@dataclass
+class ResultadoEmissao:
+    criadas: int = 0
+    existentes: int = 0
+    por_caderno: dict[int, int] = field(default_factory=dict)
+    duracao_s: float = 0.0
+
+
+def _payload(aluno_id: int, aluno_nome: str, avaliacao: Avaliacao, caderno_id: int) -> dict:
+    # Same keys ProvaAlunoSerializer writes for a single prova.
+    return {
+        'aluno_id': aluno_id,
+        'aluno_nome': aluno_nome,
+        'avaliacao_id': avaliacao.id,
+        'avaliacao_titulo': avaliacao.titulo,
+        'caderno_id': caderno_id,
+    }
+
+
+def _atribuir(alunos: list[tuple[int, int, str]], cadernos: list[int], distribuicao: str) -> list[int]:
+    """Return the caderno of each aluno; ``alunos`` is ordered by turma."""
+
+    atribuidos = []
+    turma_atual, posicao, indice_turma = None, 0, -1
+    for _, turma_id, _ in alunos:
+        if turma_id != turma_atual:
+            turma_atual, posicao = turma_id, 0
+            indice_turma += 1
+        if distribuicao == 'turma':
+            atribuidos.append(cadernos[indice_turma % len(cadernos)])
+        else:
+            atribuidos.append(cadernos[posicao % len(cadernos)])
+        posicao += 1
+    return atribuidos
+
+
+def emitir_provas(
+    avaliacao: Avaliacao,
+    *,
+    turma_ids: Optional[Iterable[int]] = None,
+    caderno_ids: Optional[Iterable[int]] = None,
+    distribuicao: str = 'rodizio',
+    tamanho_lote: int = TAMANHO_LOTE_EMISSAO,
+) -> ResultadoEmissao:
+    """Create a prova for every aluno of the avaliação's turmas that has none yet.
+
+    Alunos are read with one ``values_list`` query and provas are inserted with
+    ``bulk_create``; the signed QR token needs the new ids, so payloads are then
+    completed in memory and written back with one ``bulk_update`` per batch. The
+    whole issuance runs in one transaction holding the avaliação row lock.
+    """
+
+    if distribuicao not in DISTRIBUICOES:
+        raise EmissaoInvalida(f"Distribuição deve ser uma de: {', '.join(DISTRIBUICOES)}.")
+    inicio = time.perf_counter()
+
+    turmas_avaliacao = set(avaliacao.turmas.values_list('id', flat=True))
+    if turma_ids is None:
+        turmas = turmas_avaliacao
+    else:
+        turmas = set(turma_ids)
+        if not turmas <= turmas_avaliacao:
+            raise EmissaoInvalida('Há turmas que não fazem parte desta avaliação.')
+    if not turmas:
+        raise EmissaoInvalida('A avaliação não possui turmas.')
+
+    cadernos_avaliacao = list(
+        Caderno.objects.filter(avaliacao=avaliacao).order_by('codigo', 'id').values_list('id', flat=True)
+    )
+    if caderno_ids is None:
+        cadernos = cadernos_avaliacao
+    else:
+        pedidos = list(dict.fromkeys(caderno_ids))
+        if not set(pedidos) <= set(cadernos_avaliacao):
+            raise EmissaoInvalida('Há cadernos que não pertencem a esta avaliação.')
+        cadernos = pedidos
+    if not cadernos:
+        raise EmissaoInvalida('A avaliação não possui cadernos.')
+
+    alunos = list(
+        Aluno.objects.filter(turma_id__in=turmas, secretaria_id=avaliacao.secretaria_id)
+        .order_by('turma_id', 'nome', 'id')
+        .values_list('id', 'turma_id', 'nome')
+    )
+    # Rotation runs over the whole turma, so a second run keeps its balance for late additions.
+    atribuidos = _atribuir(alunos, cadernos, distribuicao)
+
+    with transaction.atomic():
+        # Concurrent emissions of one avaliação queue on its row, so the second one
+        # sees the provas of the first instead of issuing them again.
+        Avaliacao.objects.select_for_update().only('id').get(pk=avaliacao.pk)
+        ja_emitidos = set(ProvaAluno.objects.filter(avaliacao=avaliacao).values_list('aluno_id', flat=True))
+
+        resultado = ResultadoEmissao(existentes=sum(1 for aluno_id, _, _ in alunos if aluno_id in ja_emitidos))
+        pendentes = [
+            (aluno, caderno_id) for aluno, caderno_id in zip(alunos, atribuidos) if aluno[0] not in ja_emitidos
+        ]
+        tamanho_lote = max(1, tamanho_lote)
+        for inicio_lote in range(0, len(pendentes), tamanho_lote):
+            lote = pendentes[inicio_lote:inicio_lote + tamanho_lote]
+            provas = [
+                ProvaAluno(
+                    secretaria_id=avaliacao.secretaria_id,
+                    avaliacao=avaliacao,
+                    aluno_id=aluno_id,
+                    caderno_id=caderno_id,
+                    qr_payload=_payload(aluno_id, nome, avaliacao, caderno_id),
+                )
+                for (aluno_id, _, nome), caderno_id in lote
+            ]
+            ProvaAluno.objects.bulk_create(provas)
+            for prova in provas:
+                prova.qr_payload = payload_com_token(
+                    {**prova.qr_payload, 'prova_id': prova.id}, prova.id, prova.caderno_id
+                )
+            ProvaAluno.objects.bulk_update(provas, ['qr_payload'])
+            for prova in provas:
+                resultado.por_caderno[prova.caderno_id] = resultado.por_caderno.get(prova.caderno_id, 0) + 1
+            resultado.criadas += len(provas)
+
+        if resultado.criadas:
+            marcar_alteracao(ProvaAluno, avaliacao.secretaria_id)
+    resultado.duracao_s = time.perf_counter() - inicio
+    return resultado
@@ -0,0 +1,328 @@
+"""Concurrent rendering of printing batches (lotes de impressão)."""
+
+from __future__ import annotations
+
+import os
+import queue
+import shutil
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from core.jobs import disparar
+
+from .contextos import build_caderno_pdf_context, build_prova_pdf_context
+from .models import Avaliacao, LoteImpressao, ProvaAluno
+from .pdf_cache import arquivo_temporario, caminho_cache, chave_pdf, podar_cache
+from .pdf_service import BrowserPool, get_browser_pool, render_caderno_pdf, render_prova_pdf
+
+# A running lote that has not saved progress for this long is presumed dead.
+LOTE_INATIVO_APOS = timedelta(minutes=15)
+# How often a lote still rendering a chunk refreshes ``atualizado_em``.
+LOTE_PULSO_A_CADA = timedelta(minutes=1)
+
+# 'caderno' renders each caderno body once and prepends per-student covers;
+# 'completa' lays out the whole prova for every student.
+MODOS_IMPRESSAO = ('caderno', 'completa')
+
+
+@dataclass(frozen=True)
+class TarefaPdf:
+    contexto: dict[str, Any]
+    destino: Path
+    corpo: Optional[Path] = None
+
+
+@dataclass
+class ResultadoLote:
+    paralelismo: int
+    arquivos: list[str] = field(default_factory=list)
+    falhas: list[dict[str, str]] = field(default_factory=list)
+    tempos_ms: list[float] = field(default_factory=list)
+    duracao_s: float = 0.0
+
+    @property
+    def pdfs_por_segundo(self) -> float:
+        if not self.duracao_s:
+            return 0.0
+        return round(len(self.arquivos) / self.duracao_s, 2)
+
+
+def resolver_paralelismo(valor: Optional[int] = None) -> int:
+    """Clamp a requested parallelism to ``[1, PDF_LOTE_PARALELISMO_MAXIMO]``."""
+
+    maximo = max(1, getattr(settings, 'PDF_LOTE_PARALELISMO_MAXIMO', 8))
+    if valor is None:
+        valor = getattr(settings, 'PDF_LOTE_PARALELISMO', 4)
+    return min(max(1, valor), maximo)
+
+
+def _executar(tarefas: Iterable[TarefaPdf], paralelismo: int,
+              renderizar: Callable[[TarefaPdf, BrowserPool], str],
+              pulso: Optional[Callable[[], None]] = None) -> ResultadoLote:
+    fila: queue.Queue[TarefaPdf] = queue.Queue()
+    for tarefa in tarefas:
+        fila.put(tarefa)
+
+    pool = get_browser_pool()
+    # More workers than browsers would only queue inside the pool.
+    resultado = ResultadoLote(paralelismo=min(paralelismo, pool.size, max(fila.qsize(), 1)))
+    trava = threading.Lock()
+
+    def trabalhar() -> None:
+        while True:
+            try:
+                tarefa = fila.get_nowait()
+            except queue.Empty:
+                return
+            inicio_tarefa = time.perf_counter()
+            try:
+                caminho = renderizar(tarefa, pool)
+            except Exception as exc:  # one broken prova must not abort the batch
+                with trava:
+                    resultado.falhas.append({'arquivo': str(tarefa.destino), 'erro': str(exc)})
+            else:
+                with trava:
+                    resultado.arquivos.append(caminho)
+                    resultado.tempos_ms.append((time.perf_counter() - inicio_tarefa) * 1000)
+
+    inicio = time.perf_counter()
+    workers = [
+        threading.Thread(target=trabalhar, name=f'lote-pdf-{idx}', daemon=True)
+        for idx in range(resultado.paralelismo)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        # The calling thread keeps the job alive while the workers render.
+        while worker.is_alive():
+            worker.join(LOTE_PULSO_A_CADA.total_seconds())
+            if pulso is not None:
+                pulso()
+    resultado.duracao_s = round(time.perf_counter() - inicio, 3)
+    resultado.arquivos.sort()
+    return resultado
+
+
+def renderizar_lote(tarefas: Iterable[TarefaPdf], paralelismo: Optional[int] = None,
+                    corpos: Optional[dict[Path, dict[str, Any]]] = None,
+                    pulso: Optional[Callable[[], None]] = None) -> ResultadoLote:
+    """Render ``tarefas`` with ``paralelismo`` worker threads.
+
+    Workers share the process-wide browser pool, so pages render in parallel while
+    Python only waits on the browsers; ``paralelismo`` is further capped by the
+    pool size (``PDF_BROWSER_POOL_SIZE``). Contexts must be built by
+    the caller beforehand: workers never touch the database. ``corpos`` maps the
+    shared caderno body PDFs referenced by ``TarefaPdf.corpo`` to their contexts;
+    they are rendered first, once each, and removed when the batch is done.
+    ``pulso`` is called from the calling thread while workers are busy.
+    """
+
+    paralelismo = resolver_paralelismo(paralelismo)
+    corpos = corpos or {}
+    inicio = time.perf_counter()
+    falhas_corpo: list[dict[str, str]] = []
+    try:
+        if corpos:
+            falhas_corpo = _executar(
+                [TarefaPdf(contexto, destino) for destino, contexto in corpos.items()],
+                paralelismo,
+                lambda tarefa, pool: render_caderno_pdf(tarefa.contexto, tarefa.destino, pool=pool),
+                pulso,
+            ).falhas
+        resultado = _executar(
+            tarefas,
+            paralelismo,
+            lambda tarefa, pool: render_prova_pdf(
+                tarefa.contexto, tarefa.destino, pool=pool, corpo_pdf=tarefa.corpo
+            ),
+            pulso,
+        )
+    finally:
+        for destino in corpos:
+            Path(destino).unlink(missing_ok=True)
+    resultado.falhas = falhas_corpo + resultado.falhas
+    resultado.duracao_s = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+
+class _SaidaZip:
+    """Write-only sink that lets ``zipfile`` stream into a response generator."""
+
+    def __init__(self):
+        self._partes: list[bytes] = []
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self) -> None:
+        pass
+
+    def drenar(self) -> bytes:
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def iterar_zip(entradas: Iterable[tuple[str, Callable[[], Path]]],
+               tamanho_bloco: int = 64 * 1024) -> Iterator[bytes]:
+    """Yield a ZIP archive chunk by chunk while its members are being produced.
+
+    ``entradas`` pairs each archive name with a callable returning the file to add,
+    so a PDF is only rendered when the stream reaches it. PDFs are already
+    compressed, hence ``ZIP_STORED``; sizes go into data descriptors because the
+    output is never seeked.
+    """
+
+    saida = _SaidaZip()
+    with zipfile.ZipFile(saida, mode='w', compression=zipfile.ZIP_STORED) as arquivo_zip:
+        for nome, obter_caminho in entradas:
+            caminho = obter_caminho()
+            info = zipfile.ZipInfo(nome, date_time=time.localtime(caminho.stat().st_mtime)[:6])
+            with arquivo_zip.open(info, mode='w') as membro, caminho.open('rb') as origem:
+                while bloco := origem.read(tamanho_bloco):
+                    membro.write(bloco)
+                    yield saida.drenar()
+            yield saida.drenar()
+    yield saida.drenar()
+
+
+def iniciar_lote_impressao(avaliacao: Avaliacao, *, modo: str = 'caderno',
+                           paralelismo: Optional[int] = None) -> LoteImpressao:
+    lote = LoteImpressao.objects.create(
+        secretaria_id=avaliacao.secretaria_id,
+        avaliacao=avaliacao,
+        modo=modo,
+        paralelismo=paralelismo,
+        total=ProvaAluno.objects.filter(avaliacao=avaliacao).count(),
+    )
+    # One directory per lote: concurrent lotes of an avaliação never share files.
+    lote.diretorio = str(Path(settings.MEDIA_ROOT) / 'pdfs' / f'avaliacao_{avaliacao.id}' / f'lote_{lote.id}')
+    lote.save(update_fields=['diretorio'])
+    disparar(processar_lote_impressao, lote.id)
+    lote.refresh_from_db()
+    return lote
+
+
+def processar_lote_impressao(lote_id: int) -> bool:
+    """Run (or resume) a lote; return False when another worker owns it or it is done."""
+
+    agora = timezone.now()
+    reivindicado = (
+        LoteImpressao.objects.filter(pk=lote_id)
+        .filter(
+            Q(status__in=[LoteImpressao.STATUS_PENDENTE, LoteImpressao.STATUS_FALHOU])
+            | Q(status=LoteImpressao.STATUS_EXECUTANDO, atualizado_em__lt=agora - LOTE_INATIVO_APOS)
+        )
+        .update(status=LoteImpressao.STATUS_EXECUTANDO, erro='', atualizado_em=agora)
+    )
+    if not reivindicado:
+        return False
+
+    lote = LoteImpressao.objects.select_related('avaliacao').get(pk=lote_id)
+    if lote.iniciado_em is None:
+        lote.iniciado_em = agora
+    lote.total = ProvaAluno.objects.filter(avaliacao_id=lote.avaliacao_id).count()
+    try:
+        _processar_blocos(lote)
+    except Exception as exc:
+        lote.status = LoteImpressao.STATUS_FALHOU
+        lote.erro = str(exc)
+        lote.save()
+        raise
+    lote.status = LoteImpressao.STATUS_CONCLUIDO
+    lote.concluido_em = timezone.now()
+    lote.save()
+    return True
+
+
+def _publicar(origem: Path, destino: Path) -> None:
+    destino.unlink(missing_ok=True)
+    try:
+        os.link(origem, destino)
+    except OSError:
+        shutil.copyfile(origem, destino)
+
+
+def _pulso(lote: LoteImpressao) -> Callable[[], None]:
+    def tocar() -> None:
+        LoteImpressao.objects.filter(pk=lote.pk, status=LoteImpressao.STATUS_EXECUTANDO).update(
+            atualizado_em=timezone.now()
+        )
+
+    return tocar
+
+
+def _processar_blocos(lote: LoteImpressao) -> None:
+    saida_dir = Path(lote.diretorio)
+    saida_dir.mkdir(parents=True, exist_ok=True)
+    tamanho_bloco = max(1, getattr(settings, 'PDF_LOTE_TAMANHO_BLOCO', 200))
+    provas_qs = (
+        ProvaAluno.objects.filter(avaliacao_id=lote.avaliacao_id)
+        .select_related('aluno', 'aluno__turma', 'aluno__turma__escola', 'caderno')
+        .order_by('id')
+    )
+    contextos_caderno: dict[Optional[int], dict[str, Any]] = {}
+
+    while True:
+        provas = list(provas_qs.filter(id__gt=lote.ultimo_prova_id)[:tamanho_bloco])
+        if not provas:
+            break
+
+        tarefas = []
+        corpos: dict[Path, dict[str, Any]] = {}
+        destinos: dict[str, tuple[Path, Path]] = {}
+        for prova in provas:
+            if prova.caderno_id not in contextos_caderno:
+                contextos_caderno[prova.caderno_id] = build_caderno_pdf_context(lote.avaliacao, prova.caderno)
+            caderno_context = contextos_caderno[prova.caderno_id]
+            contexto = build_prova_pdf_context(prova, caderno_context)
+            aluno_slug = slugify(prova.aluno.nome) or f'aluno-{prova.aluno_id}'
+            destino = saida_dir / f'prova_{aluno_slug}_{prova.id}.pdf'
+            em_cache = caminho_cache(chave_pdf(contexto))
+            if em_cache.exists():
+                # Same context and templates as a previous render: reuse the file.
+                _publicar(em_cache, destino)
+                lote.reaproveitadas += 1
+                continue
+
+            em_cache.parent.mkdir(parents=True, exist_ok=True)
+            temporario = arquivo_temporario(em_cache)
+            corpo = None
+            if lote.modo == 'caderno' and prova.caderno_id is not None:
+                corpo = saida_dir / f'.caderno_{lote.id}_{prova.caderno_id}.pdf'
+                corpos[corpo] = caderno_context
+            tarefas.append(TarefaPdf(contexto, temporario, corpo=corpo))
+            destinos[str(temporario)] = (em_cache, destino)
+
+        if tarefas:
+            resultado = renderizar_lote(tarefas, lote.paralelismo, corpos=corpos, pulso=_pulso(lote))
+            for caminho in resultado.arquivos:
+                em_cache, destino = destinos[caminho]
+                os.replace(caminho, em_cache)
+                _publicar(em_cache, destino)
+            for falha in resultado.falhas:
+                if falha['arquivo'] in destinos:
+                    Path(falha['arquivo']).unlink(missing_ok=True)
+                    falha = {**falha, 'arquivo': str(destinos[falha['arquivo']][1])}
+                lote.falhas.append(falha)
+            lote.geradas += len(resultado.arquivos)
+            lote.tempo_render_ms += sum(resultado.tempos_ms)
+            lote.tempo_render_max_ms = max([lote.tempo_render_max_ms, *resultado.tempos_ms])
+
+        lote.processadas += len(provas)
+        lote.ultimo_prova_id = provas[-1].id
+        # Saving after every chunk is both the progress report and the resume point.
+        lote.save()
+
+    podar_cache()
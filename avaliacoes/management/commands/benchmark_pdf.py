@@ -0,0 +1,252 @@
+import json
+import multiprocessing
+import platform
+import resource
+import statistics
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from avaliacoes.contextos import build_caderno_pdf_context, build_prova_pdf_context
+from avaliacoes.folha_resposta import renderizar_folhas_resposta
+from avaliacoes.impressao import TarefaPdf, renderizar_lote
+from avaliacoes.models import ProvaAluno
+from avaliacoes.pdf_service import (
+    BrowserPool,
+    contexto_com_qr,
+    medir_etapas,
+    render_caderno_pdf,
+    render_prova_pdf,
+    renderizar_html,
+    shutdown_browser_pool,
+)
+from core.benchmarks import semear_volume
+
+# Versioned so stored results can be compared across runs.
+FORMATO_RESULTADO = 1
+
+ESTRATEGIAS = ('html', 'nativa', 'por_prova', 'pool', 'caderno', 'lote')
+ESTRATEGIAS_SEM_NAVEGADOR = ('html', 'nativa')
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _pico_rss_kb() -> dict:
+    # ru_maxrss is in KiB on Linux; children only count once they have exited
+    # (i.e. Chromium after its browser is closed).
+    return {
+        'processo': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'filhos': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+
+def _isolado(estrategia, contextos, destino: Path) -> tuple[tuple, dict]:
+    """Run ``estrategia`` in a forked child, so its memory peak is its own.
+
+    ru_maxrss only grows, so measured in this process every strategy would report
+    the peak of the heaviest one before it. The child starts from the current RSS;
+    ``delta`` is what the strategy added on top of it. The child never touches the
+    database: the contexts are already built.
+    """
+
+    contexto_mp = multiprocessing.get_context('fork')
+    leitura, escrita = contexto_mp.Pipe(duplex=False)
+
+    def executar() -> None:
+        inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        try:
+            resultado = ('ok', estrategia(contextos, destino))
+        except Exception as exc:  # e.g. Chromium not installed
+            resultado = ('erro', str(exc).splitlines()[0] if str(exc) else repr(exc))
+        finally:
+            # Closing the browsers lets their peak count under ``filhos``.
+            shutdown_browser_pool()
+        pico = _pico_rss_kb()
+        escrita.send((resultado, {**pico, 'delta': pico['processo'] - inicial}))
+
+    processo = contexto_mp.Process(target=executar, daemon=True)
+    processo.start()
+    escrita.close()
+    try:
+        return leitura.recv()
+    except EOFError:
+        return ('erro', f'processo de medição terminou com código {processo.exitcode}'), {}
+    finally:
+        processo.join()
+
+
+def _resumo(tempos_ms: list[float], etapas: dict[str, float], provas: int) -> dict:
+    total_s = sum(tempos_ms) / 1000
+    return {
+        'provas': provas,
+        'media_ms': round(statistics.mean(tempos_ms), 2),
+        'mediana_ms': round(statistics.median(tempos_ms), 2),
+        'max_ms': round(max(tempos_ms), 2),
+        'pdfs_por_segundo': round(provas / total_s, 2) if total_s else None,
+        'etapas_ms': {nome: round(valor / provas, 2) for nome, valor in sorted(etapas.items())},
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a geração de PDFs por etapa (contexto, QR, Jinja, navegador, layout, escrita) '
+        'para cadernos de tamanhos diferentes, com pico de memória, em texto ou JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--provas', type=int, default=10, help='Provas por cenário.')
+        parser.add_argument(
+            '--questoes', type=int, nargs='+', default=[10, 30, 60], help='Tamanhos de caderno a medir.'
+        )
+        parser.add_argument(
+            '--estrategias', nargs='+', choices=ESTRATEGIAS, default=list(ESTRATEGIAS),
+            help='html: só contexto/QR/Jinja; nativa: folha de resposta vetorial; por_prova: um Chromium por '
+                 'PDF; pool: navegador reutilizado; caderno: corpo único + capas; lote: motor concorrente.',
+        )
+        parser.add_argument(
+            '--sem-navegador', action='store_true',
+            help=f"Executa apenas {', '.join(ESTRATEGIAS_SEM_NAVEGADOR)} (útil em CI sem Chromium).",
+        )
+        parser.add_argument('--paralelismo', type=int, default=None, help='Workers da estratégia lote.')
+        parser.add_argument('--json', action='store_true', help='Emite o resultado em JSON.')
+        parser.add_argument('--saida', help='Grava o JSON também neste arquivo.')
+
+    # Strategies -----------------------------------------------------------------
+
+    def _html(self, contextos, destino):
+        tempos = []
+        with medir_etapas() as etapas:
+            for contexto in contextos:
+                inicio = time.perf_counter()
+                renderizar_html('prova.html', contexto_com_qr(contexto))
+                tempos.append((time.perf_counter() - inicio) * 1000)
+        return tempos, etapas
+
+    def _nativa(self, contextos, destino):
+        tempos = []
+        for contexto in contextos:
+            inicio = time.perf_counter()
+            renderizar_folhas_resposta([contexto])
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        return tempos, {}
+
+    def _com_pool(self, contextos, destino, pool):
+        tempos = []
+        try:
+            with medir_etapas() as etapas:
+                for indice, contexto in enumerate(contextos):
+                    inicio = time.perf_counter()
+                    render_prova_pdf(contexto, destino / f'prova_{indice}.pdf', pool=pool)
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            pool.fechar()
+        return tempos, etapas
+
+    def _por_prova(self, contextos, destino):
+        # max_renders=1 relaunches Chromium for every PDF, as before the pool existed.
+        return self._com_pool(contextos, destino, BrowserPool(size=1, max_renders=1))
+
+    def _pool(self, contextos, destino):
+        return self._com_pool(contextos, destino, BrowserPool(size=1, max_renders=len(contextos) + 1))
+
+    def _caderno(self, contextos, destino):
+        pool = BrowserPool(size=1, max_renders=len(contextos) + 2)
+        tempos = []
+        try:
+            with medir_etapas() as etapas:
+                inicio = time.perf_counter()
+                corpo = Path(render_caderno_pdf(contextos[0], destino / 'caderno.pdf', pool=pool))
+                # The shared body is amortised over the provas of the caderno.
+                custo_corpo = (time.perf_counter() - inicio) * 1000 / len(contextos)
+                for indice, contexto in enumerate(contextos):
+                    inicio = time.perf_counter()
+                    render_prova_pdf(contexto, destino / f'prova_{indice}.pdf', pool=pool, corpo_pdf=corpo)
+                    tempos.append((time.perf_counter() - inicio) * 1000 + custo_corpo)
+        finally:
+            pool.fechar()
+        return tempos, etapas
+
+    def _lote(self, contextos, destino):
+        resultado = renderizar_lote(
+            [TarefaPdf(contexto, destino / f'lote_{indice}.pdf') for indice, contexto in enumerate(contextos)],
+            self.paralelismo,
+        )
+        if resultado.falhas:
+            raise RuntimeError(resultado.falhas[0]['erro'])
+        # Wall-clock share per PDF, which is what concurrency improves.
+        por_pdf = resultado.duracao_s * 1000 / max(len(resultado.arquivos), 1)
+        return [por_pdf] * len(resultado.arquivos), {}
+
+    # Scenario -------------------------------------------------------------------
+
+    def _contextos(self, questoes: int, provas: int) -> tuple[list[dict], float]:
+        volume = semear_volume(escolas=1, turmas_por_escola=1, alunos_por_turma=provas, questoes=questoes)
+        lista = list(
+            ProvaAluno.objects.filter(avaliacao_id=volume.avaliacao_id)
+            .select_related('avaliacao', 'aluno', 'aluno__turma', 'aluno__turma__escola', 'caderno')
+            .order_by('id')
+        )
+        inicio = time.perf_counter()
+        caderno_context = build_caderno_pdf_context(lista[0].avaliacao, lista[0].caderno)
+        contextos = [build_prova_pdf_context(prova, caderno_context) for prova in lista]
+        return contextos, (time.perf_counter() - inicio) * 1000 / len(contextos)
+
+    def handle(self, *args, **options):
+        estrategias = [
+            nome for nome in options['estrategias']
+            if not options['sem_navegador'] or nome in ESTRATEGIAS_SEM_NAVEGADOR
+        ]
+        self.paralelismo = options['paralelismo']
+        resultados = []
+        try:
+            with transaction.atomic():
+                for questoes in options['questoes']:
+                    contextos, contexto_ms = self._contextos(questoes, max(1, options['provas']))
+                    for estrategia in estrategias:
+                        resultado = {'questoes': questoes, 'estrategia': estrategia}
+                        with TemporaryDirectory() as tmp:
+                            (situacao, valor), pico = _isolado(
+                                getattr(self, f'_{estrategia}'), contextos, Path(tmp)
+                            )
+                        if situacao == 'erro':
+                            resultado['erro'] = valor
+                        else:
+                            tempos, etapas = valor
+                            etapas = {**etapas, 'contexto': contexto_ms * len(contextos)}
+                            resultado.update(_resumo(tempos, etapas, len(contextos)))
+                        resultado['pico_rss_kb'] = pico
+                        resultados.append(resultado)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        relatorio = {
+            'formato': FORMATO_RESULTADO,
+            'ambiente': {'python': platform.python_version(), 'plataforma': platform.platform()},
+            'resultados': resultados,
+            'pico_rss_kb': _pico_rss_kb(),
+        }
+        if options['saida']:
+            Path(options['saida']).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+        if options['json']:
+            self.stdout.write(json.dumps(relatorio, indent=2, ensure_ascii=False))
+            return
+
+        for resultado in resultados:
+            cabecalho = f"[{resultado['questoes']:>3} questões] {resultado['estrategia']:<10}"
+            if 'erro' in resultado:
+                self.stdout.write(f"{cabecalho} erro: {resultado['erro']}")
+                continue
+            etapas = ', '.join(f'{nome} {valor} ms' for nome, valor in resultado['etapas_ms'].items())
+            delta = resultado['pico_rss_kb'].get('delta')
+            self.stdout.write(
+                f"{cabecalho} média {resultado['media_ms']} ms, {resultado['pdfs_por_segundo']} PDFs/s "
+                f"({etapas}), +{delta} KiB de RSS"
+            )
+        pico = relatorio['pico_rss_kb']
+        self.stdout.write(f"Pico de RSS: processo {pico['processo']} KiB, filhos {pico['filhos']} KiB")
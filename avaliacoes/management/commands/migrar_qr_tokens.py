@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from avaliacoes.models import ProvaAluno
+from avaliacoes.qr import payload_com_token
+from core.versioning import marcar_alteracao
+
+
+class Command(BaseCommand):
+    help = 'Grava o token QR compacto e assinado no qr_payload das provas existentes, em lotes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Provas por lote (padrão: 2000).')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        queryset = ProvaAluno.objects.only('id', 'secretaria_id', 'caderno_id', 'qr_payload').order_by('id')
+
+        ultimo_id = 0
+        total = 0
+        while True:
+            lote = list(queryset.filter(id__gt=ultimo_id)[:batch_size])
+            if not lote:
+                break
+            alteradas = []
+            for prova in lote:
+                payload = payload_com_token(prova.qr_payload, prova.id, prova.caderno_id)
+                # Tokens are deterministic: only rows without one, or signed with an old key, change.
+                if payload != prova.qr_payload:
+                    prova.qr_payload = payload
+                    alteradas.append(prova)
+            if alteradas:
+                with transaction.atomic():
+                    ProvaAluno.objects.bulk_update(alteradas, ['qr_payload'])
+                for secretaria_id in {prova.secretaria_id for prova in alteradas}:
+                    marcar_alteracao(ProvaAluno, secretaria_id)
+            ultimo_id = lote[-1].id
+            total += len(alteradas)
+            self.stdout.write(f'{total} provas atualizadas (até id {ultimo_id}).')
+
+        self.stdout.write(self.style.SUCCESS(f'Migração concluída: {total} provas com token QR.'))
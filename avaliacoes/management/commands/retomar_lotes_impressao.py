@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from avaliacoes.impressao import LOTE_INATIVO_APOS, processar_lote_impressao
+from avaliacoes.models import LoteImpressao
+
+
+class Command(BaseCommand):
+    help = 'Retoma lotes de impressão interrompidos (ex.: após reinício do servidor) a partir do último bloco salvo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incluir-falhas', action='store_true', help='Também retoma lotes que falharam.')
+
+    def handle(self, *args, **options):
+        interrompidos = Q(status=LoteImpressao.STATUS_PENDENTE) | Q(
+            status=LoteImpressao.STATUS_EXECUTANDO,
+            atualizado_em__lt=timezone.now() - LOTE_INATIVO_APOS,
+        )
+        if options['incluir_falhas']:
+            interrompidos |= Q(status=LoteImpressao.STATUS_FALHOU)
+
+        retomados = 0
+        for lote_id in LoteImpressao.objects.filter(interrompidos).order_by('id').values_list('id', flat=True):
+            try:
+                if processar_lote_impressao(lote_id):
+                    retomados += 1
+            except Exception as exc:  # recorded on the lote; keep going with the others
+                self.stderr.write(f'Lote {lote_id} falhou novamente: {exc}')
+        self.stdout.write(self.style.SUCCESS(f'{retomados} lote(s) de impressão retomado(s).'))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('avaliacoes', '0004_update_qr_payload'),
+        ('core', '0001_initial'),
+        ('escolas', '0001_initial'),
+        ('itens', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cadernoquestao',
+            index=models.Index(fields=['caderno', 'ordem'], name='cq_caderno_ordem_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='provaaluno',
+            index=models.Index(fields=['avaliacao', 'aluno'], name='prova_avaliacao_aluno_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='provaaluno',
+            index=models.Index(fields=['secretaria', 'id'], name='prova_sec_id_idx'),
+        ),
+    ]
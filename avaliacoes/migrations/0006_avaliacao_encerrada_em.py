@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('avaliacoes', '0005_indices_consultas_quentes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='avaliacao',
+            name='encerrada_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('avaliacoes', '0006_avaliacao_encerrada_em'),
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoteImpressao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modo', models.CharField(default='caderno', max_length=20)),
+                ('paralelismo', models.PositiveIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluido', 'Concluído'), ('falhou', 'Falhou')], default='pendente', max_length=20)),
+                ('diretorio', models.CharField(blank=True, max_length=255)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('processadas', models.PositiveIntegerField(default=0)),
+                ('geradas', models.PositiveIntegerField(default=0)),
+                ('reaproveitadas', models.PositiveIntegerField(default=0)),
+                ('falhas', models.JSONField(blank=True, default=list)),
+                ('ultimo_prova_id', models.PositiveBigIntegerField(default=0)),
+                ('tempo_render_ms', models.FloatField(default=0)),
+                ('tempo_render_max_ms', models.FloatField(default=0)),
+                ('erro', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('avaliacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lotes_impressao', to='avaliacoes.avaliacao')),
+                ('secretaria', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='core.secretaria')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['secretaria', 'id'], name='lote_sec_id_idx'), models.Index(fields=['status', 'atualizado_em'], name='lote_status_atualizado_idx')],
+            },
+        ),
+    ]
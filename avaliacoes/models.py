@@ -1,3 +1,5 @@
+from typing import Optional
+
 from django.db import models
 
 from core.models import Secretaria
@@ -12,10 +14,15 @@ class Avaliacao(models.Model):
     turmas = models.ManyToManyField(Turma, blank=True)
     liberada_para_professores = models.BooleanField(default=False)
     habilitar_correcao_qr = models.BooleanField(default=False)
+    encerrada_em = models.DateTimeField(null=True, blank=True)
 
     def __str__(self) -> str:
         return self.titulo
 
+    @property
+    def encerrada(self) -> bool:
+        return self.encerrada_em is not None
+
 
 class Caderno(models.Model):
     secretaria = models.ForeignKey(Secretaria, on_delete=models.PROTECT)
@@ -35,6 +42,9 @@ class CadernoQuestao(models.Model):
     class Meta:
         ordering = ['ordem']
         unique_together = ('caderno', 'questao')
+        indexes = [
+            models.Index(fields=['caderno', 'ordem'], name='cq_caderno_ordem_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.caderno_id}-{self.questao_id}"
@@ -47,5 +57,70 @@ class ProvaAluno(models.Model):
     caderno = models.ForeignKey(Caderno, on_delete=models.SET_NULL, null=True)
     qr_payload = models.JSONField(default=dict)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['avaliacao', 'aluno'], name='prova_avaliacao_aluno_idx'),
+            models.Index(fields=['secretaria', 'id'], name='prova_sec_id_idx'),
+        ]
+
     def __str__(self) -> str:
         return f"ProvaAluno {self.id}"
+
+
+class LoteImpressao(models.Model):
+    """Background rendering of every prova of an avaliação, resumable by cursor."""
+
+    STATUS_PENDENTE = 'pendente'
+    STATUS_EXECUTANDO = 'executando'
+    STATUS_CONCLUIDO = 'concluido'
+    STATUS_FALHOU = 'falhou'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_EXECUTANDO, 'Executando'),
+        (STATUS_CONCLUIDO, 'Concluído'),
+        (STATUS_FALHOU, 'Falhou'),
+    )
+
+    secretaria = models.ForeignKey(Secretaria, on_delete=models.PROTECT)
+    avaliacao = models.ForeignKey(Avaliacao, on_delete=models.CASCADE, related_name='lotes_impressao')
+    modo = models.CharField(max_length=20, default='caderno')
+    paralelismo = models.PositiveIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDENTE)
+    diretorio = models.CharField(max_length=255, blank=True)
+    total = models.PositiveIntegerField(default=0)
+    processadas = models.PositiveIntegerField(default=0)
+    geradas = models.PositiveIntegerField(default=0)
+    reaproveitadas = models.PositiveIntegerField(default=0)
+    falhas = models.JSONField(default=list, blank=True)
+    # Keyset cursor: provas are processed in id order, so a resumed job skips ids <= this.
+    ultimo_prova_id = models.PositiveBigIntegerField(default=0)
+    tempo_render_ms = models.FloatField(default=0)
+    tempo_render_max_ms = models.FloatField(default=0)
+    erro = models.TextField(blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['secretaria', 'id'], name='lote_sec_id_idx'),
+            models.Index(fields=['status', 'atualizado_em'], name='lote_status_atualizado_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"LoteImpressao {self.id} ({self.status})"
+
+    @property
+    def percentual(self) -> float:
+        if not self.total:
+            return 100.0 if self.status == self.STATUS_CONCLUIDO else 0.0
+        return round(self.processadas * 100 / self.total, 1)
+
+    @property
+    def media_render_ms(self) -> Optional[float]:
+        if not self.geradas:
+            return None
+        return round(self.tempo_render_ms / self.geradas, 1)
@@ -0,0 +1,150 @@
+"""Content-addressed on-disk cache of rendered prova PDFs.
+
+The key hashes the full render context together with the templates, so any change
+to the aluno, the caderno, its questions or the layout yields a new key and stale
+files simply stop being read; they age out through the size-bounded LRU eviction.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from django.conf import settings
+
+from .pdf_service import TEMPLATES_DIR, mesclar_pdfs, render_prova_pdf
+
+_versao_templates: Optional[str] = None
+
+
+def versao_templates() -> str:
+    """Digest of every template file; computed once per process."""
+
+    global _versao_templates
+    if _versao_templates is None:
+        digest = hashlib.sha256()
+        for caminho in sorted(TEMPLATES_DIR.rglob('*.html')):
+            digest.update(caminho.relative_to(TEMPLATES_DIR).as_posix().encode())
+            digest.update(caminho.read_bytes())
+        _versao_templates = digest.hexdigest()
+    return _versao_templates
+
+
+def chave_pdf(contexto: dict[str, Any], variante: str = 'prova') -> str:
+    conteudo = json.dumps(contexto, sort_keys=True, default=str, ensure_ascii=False)
+    digest = hashlib.sha256()
+    for parte in (variante, versao_templates(), conteudo):
+        digest.update(parte.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def diretorio_cache() -> Path:
+    configurado = getattr(settings, 'PDF_CACHE_DIR', None)
+    return Path(configurado) if configurado else Path(settings.MEDIA_ROOT) / 'pdf_cache'
+
+
+def caminho_cache(chave: str) -> Path:
+    return diretorio_cache() / chave[:2] / f'{chave}.pdf'
+
+
+def arquivo_temporario(destino: Path) -> Path:
+    """Reserve a unique scratch file next to ``destino``, safe across threads and processes."""
+
+    with tempfile.NamedTemporaryFile(
+        dir=destino.parent, prefix=f'.{destino.stem}.', suffix='.tmp.pdf', delete=False
+    ) as arquivo:
+        return Path(arquivo.name)
+
+
+def podar_cache(limite_bytes: Optional[int] = None, preservar: Iterable[Path] = ()) -> int:
+    """Evict least recently used files until the cache fits; return bytes freed.
+
+    Files in ``preservar`` (the ones the caller is about to serve) are never evicted.
+    """
+
+    if limite_bytes is None:
+        limite_bytes = getattr(settings, 'PDF_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+    fixados = {Path(caminho) for caminho in preservar}
+    arquivos = []
+    total = 0
+    for caminho in diretorio_cache().glob('*/*.pdf'):
+        if caminho.name.startswith('.'):
+            continue  # scratch file of a render still in progress
+        try:
+            info = caminho.stat()
+        except FileNotFoundError:
+            continue
+        total += info.st_size
+        if caminho not in fixados:
+            arquivos.append((info.st_mtime, info.st_size, caminho))
+
+    liberados = 0
+    for _, tamanho, caminho in sorted(arquivos):
+        if total - liberados <= limite_bytes:
+            break
+        caminho.unlink(missing_ok=True)
+        liberados += tamanho
+    return liberados
+
+
+def obter_pdf(contexto: dict[str, Any],
+              renderizar: Optional[Callable[[dict[str, Any], Path], str]] = None,
+              podar: bool = True) -> tuple[Path, str]:
+    """Return ``(path, key)`` of the cached PDF for ``contexto``, rendering it on a miss.
+
+    With ``podar=False`` the caller takes over pruning, once, after it is done.
+    """
+
+    chave = chave_pdf(contexto)
+    destino = caminho_cache(chave)
+    if destino.exists():
+        # mtime doubles as the LRU clock.
+        os.utime(destino)
+        return destino, chave
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = arquivo_temporario(destino)
+    try:
+        (renderizar or render_prova_pdf)(contexto, temporario)
+        os.replace(temporario, destino)
+    finally:
+        temporario.unlink(missing_ok=True)
+    if podar:
+        podar_cache(preservar=[destino])
+    return destino, chave
+
+
+def obter_pacote_pdf(contextos: Iterable[dict[str, Any]]) -> tuple[Path, str]:
+    """Return one print-ready PDF concatenating the provas of ``contextos``.
+
+    The bundle is keyed by its parts, so it is rebuilt only when one of them changes
+    and can be served with byte ranges afterwards. The cache is pruned once, after
+    the bundle exists, and neither the bundle nor its parts are evicted by it.
+    """
+
+    contextos = list(contextos)
+    partes = [obter_pdf(contexto, podar=False) for contexto in contextos]
+    chave = chave_pdf({'partes': [chave_parte for _, chave_parte in partes]}, variante='pacote')
+    destino = caminho_cache(chave)
+    if destino.exists():
+        os.utime(destino)
+    else:
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        temporario = arquivo_temporario(destino)
+        # Another request may have evicted a part meanwhile; render it again.
+        caminhos = [
+            caminho if caminho.exists() else obter_pdf(contexto, podar=False)[0]
+            for (caminho, _), contexto in zip(partes, contextos)
+        ]
+        try:
+            mesclar_pdfs(caminhos, temporario)
+            os.replace(temporario, destino)
+        finally:
+            temporario.unlink(missing_ok=True)
+    podar_cache(preservar=[destino, *(caminho for caminho, _ in partes)])
+    return destino, chave
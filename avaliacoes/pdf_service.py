@@ -1,9 +1,19 @@
+import atexit
 import base64
+import contextvars
 import io
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Dict
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, TypeVar
 
 import qrcode
+from pypdf import PdfWriter
 from jinja2 import Environment, FileSystemLoader
 from playwright.sync_api import sync_playwright
 from django.conf import settings
@@ -14,28 +24,276 @@ TEMPLATES_DIR.mkdir(parents=True, exist_ok=True)
 
 _env = Environment(loader=FileSystemLoader(str(TEMPLATES_DIR)))
 
+PDF_OPTIONS = {
+    'format': 'A4',
+    'print_background': True,
+    'margin': {'top': '20mm', 'bottom': '20mm', 'left': '15mm', 'right': '15mm'},
+}
+
+
+T = TypeVar('T')
+
+_etapas_ativas: ContextVar[Optional[Dict[str, float]]] = ContextVar('pdf_etapas', default=None)
+
+
+@contextmanager
+def medir_etapas() -> Iterator[Dict[str, float]]:
+    """Accumulate per-stage render timings (ms) of the calling thread, for benchmarks."""
+
+    etapas: Dict[str, float] = {}
+    token = _etapas_ativas.set(etapas)
+    try:
+        yield etapas
+    finally:
+        _etapas_ativas.reset(token)
+
+
+@contextmanager
+def _etapa(nome: str) -> Iterator[None]:
+    etapas = _etapas_ativas.get()
+    if etapas is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        etapas[nome] = etapas.get(nome, 0.0) + (time.perf_counter() - inicio) * 1000
+
+
+class _ThreadBrowser:
+    """Playwright driver and Chromium owned by one browser thread of the pool."""
+
+    def __init__(self):
+        self.playwright = None
+        self.browser = None
+        self.renders = 0
+
+    def close(self) -> None:
+        try:
+            if self.browser is not None:
+                self.browser.close()
+        finally:
+            if self.playwright is not None:
+                self.playwright.stop()
+            self.browser = None
+            self.playwright = None
+            self.renders = 0
+
+
+class BrowserPool:
+    """At most ``size`` long-lived Chromium instances shared by every PDF render.
+
+    Playwright's sync API binds a driver (and its pages) to the thread that started
+    it, so each browser lives in a dedicated thread of the pool. Renders submitted
+    by any request or worker thread are queued and run on the next free browser,
+    each in a fresh, isolated context; the number of browsers, and of pages open at
+    once, therefore never exceeds ``size``. Browser threads start on demand.
+    Browsers are recycled after ``max_renders`` renders, when they disconnect or
+    after a failed render, and the pool discards inherited state after a fork.
+    """
+
+    def __init__(self, size: int = 2, max_renders: int = 200):
+        self.size = max(1, size)
+        self.max_renders = max(1, max_renders)
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._fila: queue.Queue = queue.Queue()
+        self._trava = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self._ociosas = 0
+
+    def executar(self, funcao: Callable[[Any], T]) -> T:
+        """Run ``funcao(page)`` on one of the pool's browsers and return its result."""
+
+        if self._pid != os.getpid():
+            # Browser threads of the parent process do not exist in a forked child.
+            self._reset()
+        futuro: Future = Future()
+        # The copied context carries medir_etapas() of the caller into the browser thread.
+        self._fila.put((contextvars.copy_context(), funcao, futuro))
+        with self._trava:
+            if self._ociosas == 0 and len(self._threads) < self.size:
+                thread = threading.Thread(
+                    target=self._trabalhar, name=f'pdf-browser-{len(self._threads)}', daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+        return futuro.result()
+
+    def _trabalhar(self) -> None:
+        estado = _ThreadBrowser()
+        try:
+            while True:
+                with self._trava:
+                    self._ociosas += 1
+                tarefa = self._fila.get()
+                with self._trava:
+                    self._ociosas -= 1
+                if tarefa is None:
+                    return
+                contexto, funcao, futuro = tarefa
+                if not futuro.set_running_or_notify_cancel():
+                    continue
+                try:
+                    futuro.set_result(contexto.run(self._renderizar, estado, funcao))
+                except BaseException as exc:
+                    futuro.set_exception(exc)
+        finally:
+            estado.close()
+
+    def _healthy_browser(self, estado: _ThreadBrowser):
+        if estado.browser is not None and not estado.browser.is_connected():
+            estado.close()
+        if estado.browser is None:
+            with _etapa('inicio_navegador'):
+                estado.playwright = sync_playwright().start()
+                estado.browser = estado.playwright.chromium.launch()
+        return estado.browser
+
+    def _renderizar(self, estado: _ThreadBrowser, funcao: Callable[[Any], T]) -> T:
+        browser = self._healthy_browser(estado)
+        with _etapa('contexto_navegador'):
+            context = browser.new_context()
+        falhou = False
+        try:
+            return funcao(context.new_page())
+        except Exception:
+            falhou = True
+            raise
+        finally:
+            try:
+                context.close()
+            except Exception:
+                falhou = True
+            estado.renders += 1
+            if falhou or estado.renders >= self.max_renders:
+                estado.close()
+
+    def fechar(self) -> None:
+        """Stop the browser threads, closing their browsers."""
+
+        with self._trava:
+            threads, self._threads = self._threads, []
+        if self._pid != os.getpid():
+            self._reset()
+            return
+        for _ in threads:
+            self._fila.put(None)
+        for thread in threads:
+            thread.join()
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BrowserPool(
+                    size=getattr(settings, 'PDF_BROWSER_POOL_SIZE', 2),
+                    max_renders=getattr(settings, 'PDF_BROWSER_MAX_RENDERS', 200),
+                )
+    return _pool
+
+
+def shutdown_browser_pool() -> None:
+    """Close the shared pool's browsers and drop it."""
+
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.fechar()
+
+
+atexit.register(shutdown_browser_pool)
+
+
+def qr_dados(payload: Dict) -> str:
+    """Text encoded in the identification QR code of a prova."""
+
+    if isinstance(payload, dict) and payload.get('qr_token'):
+        return payload['qr_token']
+    return str(payload)
+
 
 def _qr_png_b64(payload: Dict) -> str:
-    image = qrcode.make(payload)
+    image = qrcode.make(qr_dados(payload))
     buffer = io.BytesIO()
     image.save(buffer, format='PNG')
     return base64.b64encode(buffer.getvalue()).decode('utf-8')
 
 
-def render_prova_pdf(context: Dict, out_path: Path) -> str:
-    template = _env.get_template('prova.html')
-    html = template.render({**context, 'qr_png_b64': _qr_png_b64(context['qr_payload'])})
+def contexto_com_qr(context: Dict) -> Dict:
+    """``context`` plus the PNG of its identification QR code, as the prova templates expect."""
+
+    with _etapa('qr'):
+        qr_png_b64 = _qr_png_b64(context['qr_payload'])
+    return {**context, 'qr_png_b64': qr_png_b64}
+
+
+def renderizar_html(template_name: str, context: Dict) -> str:
+    """Render one of the PDF templates to HTML, without a browser."""
+
+    with _etapa('jinja'):
+        return _env.get_template(template_name).render(context)
+
+
+def _render_template_pdf(template_name: str, context: Dict, out_path: Path,
+                         pool: Optional[BrowserPool]) -> str:
+    html = renderizar_html(template_name, context)
     output_path = Path(out_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with sync_playwright() as playwright:
-        browser = playwright.chromium.launch()
-        page = browser.new_page()
-        page.set_content(html, wait_until='load')
-        page.pdf(
-            path=str(output_path),
-            format='A4',
-            print_background=True,
-            margin={'top': '20mm', 'bottom': '20mm', 'left': '15mm', 'right': '15mm'},
-        )
-        browser.close()
+
+    def imprimir(page) -> None:
+        with _etapa('layout'):
+            page.set_content(html, wait_until='load')
+        with _etapa('escrita_pdf'):
+            page.pdf(path=str(output_path), **PDF_OPTIONS)
+
+    (pool or get_browser_pool()).executar(imprimir)
     return str(output_path)
+
+
+def mesclar_pdfs(partes: Iterable[Path], out_path: Path) -> str:
+    """Concatenate ``partes`` into ``out_path`` without re-rendering them."""
+
+    output_path = Path(out_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with _etapa('mesclagem'):
+        writer = PdfWriter()
+        for parte in partes:
+            writer.append(str(parte))
+        with output_path.open('wb') as arquivo:
+            writer.write(arquivo)
+        writer.close()
+    return str(output_path)
+
+
+def render_caderno_pdf(context: Dict, out_path: Path, pool: Optional[BrowserPool] = None) -> str:
+    """Render the question pages and answer sheet shared by every prova of a caderno."""
+
+    return _render_template_pdf('caderno.html', context, out_path, pool)
+
+
+def render_prova_pdf(context: Dict, out_path: Path, pool: Optional[BrowserPool] = None,
+                     corpo_pdf: Optional[Path] = None) -> str:
+    """Render a prova; with ``corpo_pdf`` only the cover is laid out and the body is appended."""
+
+    context = contexto_com_qr(context)
+    if corpo_pdf is None:
+        return _render_template_pdf('prova.html', context, out_path, pool)
+
+    output_path = Path(out_path)
+    capa_path = output_path.with_name(f'.{output_path.stem}.capa.pdf')
+    try:
+        _render_template_pdf('capa.html', context, capa_path, pool)
+        return mesclar_pdfs([capa_path, Path(corpo_pdf)], output_path)
+    finally:
+        capa_path.unlink(missing_ok=True)
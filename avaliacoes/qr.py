@@ -0,0 +1,85 @@
+"""Compact, signed identification tokens printed as the QR code of a prova.
+
+A token packs a version byte, the prova and caderno ids and a truncated
+HMAC-SHA256 (keyed by ``SECRET_KEY``) into 17 bytes, written as unpadded base32
+behind a short prefix. Base32 stays inside the QR alphanumeric charset, so the
+whole token fits a version 2 symbol that phones read quickly, and no personal
+data is printed on the sheet. Ids past 32 bits (the keys are ``BigAutoField``)
+switch to the wide layout of version 2, 25 bytes that still fit a version 3
+symbol at level M.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hmac
+import struct
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from django.utils.crypto import salted_hmac
+
+PREFIXO = 'AV'
+VERSAO = 1
+VERSAO_LARGA = 2
+_CORPOS = {VERSAO: struct.Struct('>BII'), VERSAO_LARGA: struct.Struct('>BQQ')}
+_TAMANHO_MAC = 8
+_SAL = 'avaliacoes.qr.token'
+
+
+class TokenQRInvalido(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class TokenProva:
+    prova_id: int
+    caderno_id: Optional[int]
+    versao: int = VERSAO
+
+
+def _assinatura(corpo: bytes) -> bytes:
+    return salted_hmac(_SAL, corpo, algorithm='sha256').digest()[:_TAMANHO_MAC]
+
+
+def gerar_token(prova_id: int, caderno_id: Optional[int] = None) -> str:
+    caderno_id = caderno_id or 0
+    maior = max(prova_id, caderno_id)
+    if min(prova_id, caderno_id) < 0 or maior >= 2**64:
+        raise ValueError(f'Ids fora do intervalo do token de prova: {prova_id}, {caderno_id}.')
+    versao = VERSAO if maior < 2**32 else VERSAO_LARGA
+    corpo = _CORPOS[versao].pack(versao, prova_id, caderno_id)
+    codificado = base64.b32encode(corpo + _assinatura(corpo)).decode('ascii').rstrip('=')
+    return f'{PREFIXO}{codificado}'
+
+
+def ler_token(token: str) -> TokenProva:
+    """Decode and verify ``token``; raise :class:`TokenQRInvalido` when it is not genuine."""
+
+    texto = (token or '').strip().upper()
+    if not texto.startswith(PREFIXO):
+        raise TokenQRInvalido('Token de prova em formato desconhecido.')
+    codificado = texto[len(PREFIXO):]
+    try:
+        bruto = base64.b32decode(codificado + '=' * (-len(codificado) % 8))
+    except (binascii.Error, ValueError) as exc:
+        raise TokenQRInvalido('Token de prova em formato desconhecido.') from exc
+    formato = _CORPOS.get(bruto[0]) if bruto else None
+    if formato is None:
+        raise TokenQRInvalido('Versão de token de prova não suportada.')
+    if len(bruto) != formato.size + _TAMANHO_MAC:
+        raise TokenQRInvalido('Token de prova com tamanho inválido.')
+    corpo, mac = bruto[:formato.size], bruto[formato.size:]
+    versao, prova_id, caderno_id = formato.unpack(corpo)
+    if not hmac.compare_digest(mac, _assinatura(corpo)):
+        raise TokenQRInvalido('Assinatura do token de prova inválida.')
+    return TokenProva(prova_id=prova_id, caderno_id=caderno_id or None, versao=versao)
+
+
+def payload_com_token(payload: Any, prova_id: int, caderno_id: Optional[int]) -> dict[str, Any]:
+    """Return ``payload`` with an up-to-date ``qr_token`` for the prova."""
+
+    payload = dict(payload) if isinstance(payload, dict) else {}
+    payload['qr_token'] = gerar_token(prova_id, caderno_id)
+    return payload
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
-from .models import Avaliacao, Caderno, CadernoQuestao, ProvaAluno
+from .models import Avaliacao, Caderno, CadernoQuestao, LoteImpressao, ProvaAluno
+from .qr import payload_com_token
 
 
 class CadernoQuestaoSerializer(serializers.ModelSerializer):
@@ -29,8 +30,9 @@ class AvaliacaoSerializer(serializers.ModelSerializer):
             'turmas',
             'liberada_para_professores',
             'habilitar_correcao_qr',
+            'encerrada_em',
         ]
-        read_only_fields = ['secretaria']
+        read_only_fields = ['secretaria', 'encerrada_em']
 
 
 class ProvaAlunoSerializer(serializers.ModelSerializer):
@@ -78,5 +80,37 @@ class ProvaAlunoSerializer(serializers.ModelSerializer):
 
         if instance.id is not None:
             payload['prova_id'] = instance.id
+            payload = payload_com_token(payload, instance.id, payload.get('caderno_id'))
 
         return payload
+
+
+class LoteImpressaoSerializer(serializers.ModelSerializer):
+    percentual = serializers.FloatField(read_only=True)
+    media_render_ms = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = LoteImpressao
+        fields = [
+            'id',
+            'secretaria',
+            'avaliacao',
+            'modo',
+            'paralelismo',
+            'status',
+            'diretorio',
+            'total',
+            'processadas',
+            'percentual',
+            'geradas',
+            'reaproveitadas',
+            'falhas',
+            'media_render_ms',
+            'tempo_render_max_ms',
+            'erro',
+            'criado_em',
+            'iniciado_em',
+            'concluido_em',
+            'atualizado_em',
+        ]
+        read_only_fields = fields
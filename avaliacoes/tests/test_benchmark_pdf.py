@@ -0,0 +1,43 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from avaliacoes.models import ProvaAluno
+
+
+@pytest.mark.django_db
+def test_benchmark_pdf_reports_stages_as_json_and_rolls_back(tmp_path):
+    saida = StringIO()
+    arquivo = tmp_path / 'resultado.json'
+
+    call_command(
+        'benchmark_pdf', sem_navegador=True, json=True, questoes=[3, 6], provas=2,
+        saida=str(arquivo), stdout=saida,
+    )
+
+    relatorio = json.loads(saida.getvalue())
+    assert relatorio == json.loads(arquivo.read_text())
+    assert relatorio['formato'] == 1
+    assert {(item['questoes'], item['estrategia']) for item in relatorio['resultados']} == {
+        (3, 'html'), (3, 'nativa'), (6, 'html'), (6, 'nativa'),
+    }
+    html = next(item for item in relatorio['resultados'] if item['estrategia'] == 'html')
+    assert set(html['etapas_ms']) == {'contexto', 'qr', 'jinja'}
+    assert html['provas'] == 2 and html['pdfs_por_segundo'] > 0
+    # Each strategy is measured in its own process, from the same baseline.
+    assert all(item['pico_rss_kb']['delta'] >= 0 for item in relatorio['resultados'])
+    assert relatorio['pico_rss_kb']['processo'] > 0
+    assert not ProvaAluno.objects.exists()
+
+
+@pytest.mark.django_db
+def test_benchmark_pdf_text_output_reports_each_strategy():
+    saida = StringIO()
+
+    call_command('benchmark_pdf', estrategias=['html'], questoes=[3], provas=1, stdout=saida)
+
+    linhas = saida.getvalue().splitlines()
+    assert linhas[0].startswith('[  3 questões] html') and 'KiB de RSS' in linhas[0]
+    assert linhas[-1].startswith('Pico de RSS')
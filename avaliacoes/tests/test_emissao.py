@@ -0,0 +1,95 @@
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from avaliacoes.emissao import EmissaoInvalida, emitir_provas
+from avaliacoes.models import ProvaAluno
+from avaliacoes.qr import ler_token
+
+
+@pytest.fixture
+def cenario():
+    secretaria = baker.make('core.Secretaria')
+    turmas = baker.make('escolas.Turma', secretaria=secretaria, _quantity=2)
+    for turma in turmas:
+        for idx in range(3):
+            baker.make('escolas.Aluno', secretaria=secretaria, turma=turma, nome=f'Aluno {idx}')
+    avaliacao = baker.make('avaliacoes.Avaliacao', secretaria=secretaria, titulo='Diagnóstica')
+    avaliacao.turmas.set(turmas)
+    cadernos = [
+        baker.make('avaliacoes.Caderno', secretaria=secretaria, avaliacao=avaliacao, codigo=codigo)
+        for codigo in ('A', 'B')
+    ]
+    return avaliacao, turmas, cadernos
+
+
+@pytest.mark.django_db
+def test_emitir_provas_round_robin_with_signed_payloads(cenario, django_assert_max_num_queries):
+    avaliacao, turmas, cadernos = cenario
+
+    with django_assert_max_num_queries(10):
+        resultado = emitir_provas(avaliacao)
+
+    assert (resultado.criadas, resultado.existentes) == (6, 0)
+    assert resultado.por_caderno == {cadernos[0].id: 4, cadernos[1].id: 2}
+    provas = list(ProvaAluno.objects.filter(avaliacao=avaliacao).order_by('aluno__turma_id', 'aluno__nome'))
+    assert [prova.caderno_id for prova in provas[:3]] == [cadernos[0].id, cadernos[1].id, cadernos[0].id]
+    prova = provas[0]
+    assert prova.qr_payload['prova_id'] == prova.id
+    assert prova.qr_payload['aluno_nome'] == prova.aluno.nome
+    token = ler_token(prova.qr_payload['qr_token'])
+    assert (token.prova_id, token.caderno_id) == (prova.id, prova.caderno_id)
+
+    # A second run only reports the provas already issued.
+    repetido = emitir_provas(avaliacao)
+    assert (repetido.criadas, repetido.existentes) == (0, 6)
+
+
+@pytest.mark.django_db
+def test_emitir_provas_by_turma_and_validation(cenario):
+    avaliacao, turmas, cadernos = cenario
+
+    resultado = emitir_provas(avaliacao, distribuicao='turma', caderno_ids=[cadernos[1].id, cadernos[0].id])
+
+    por_turma = {
+        turma.id: set(
+            ProvaAluno.objects.filter(aluno__turma=turma).values_list('caderno_id', flat=True)
+        )
+        for turma in turmas
+    }
+    assert por_turma == {turmas[0].id: {cadernos[1].id}, turmas[1].id: {cadernos[0].id}}
+    assert resultado.criadas == 6
+
+    with pytest.raises(EmissaoInvalida):
+        emitir_provas(avaliacao, turma_ids=[baker.make('escolas.Turma').id])
+    with pytest.raises(EmissaoInvalida):
+        emitir_provas(avaliacao, distribuicao='sorteio')
+
+
+@pytest.mark.django_db
+def test_emitir_provas_endpoint(cenario):
+    avaliacao, turmas, _ = cenario
+    user = baker.make('core.User', secretaria=avaliacao.secretaria, role='admin')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('avaliacao-emitir-provas', args=[avaliacao.id])
+
+    response = client.post(url, {'turmas': [turmas[0].id]}, format='json')
+    assert response.status_code == 201
+    assert (response.data['criadas'], response.data['existentes']) == (3, 0)
+
+    assert client.post(url, {'cadernos': ['x']}, format='json').status_code == 400
+    assert client.post(url, {'turmas': str(turmas[1].id)}, format='json').status_code == 400
+    # Form bodies carry one value per key; the id is not split into digits.
+    response = client.post(url, {'turmas': [turmas[1].id]})
+    assert (response.status_code, response.data['criadas']) == (201, 3)
+
+    avaliacao.encerrada_em = timezone.now()
+    avaliacao.save()
+    assert client.post(url, {}, format='json').status_code == 409
+
+    professor = baker.make('core.User', secretaria=avaliacao.secretaria, role='professor')
+    client.force_authenticate(user=professor)
+    assert client.post(url, {}, format='json').status_code == 403
@@ -0,0 +1,79 @@
+import io
+
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+from pypdf import PdfReader
+from rest_framework.test import APIClient
+
+from avaliacoes.folha_resposta import _linhas_por_pagina, renderizar_folhas_resposta
+from avaliacoes.contextos import GABARITO_LAYOUT
+
+
+def _contexto(questoes=10, **extra):
+    return {
+        'titulo': 'Avaliação Diagnóstica',
+        'aluno_nome': 'João (Turno B)',
+        'turma_nome': '6º A',
+        'escola_nome': 'Escola Municipal Central',
+        'data_aplicacao': '2024-06-01',
+        'qr_payload': {'prova_aluno_id': 7},
+        'questoes': [{'ordem': ordem} for ordem in range(1, questoes + 1)],
+        'gabarito_layout': GABARITO_LAYOUT,
+        **extra,
+    }
+
+
+def test_renderizar_folhas_resposta_draws_one_page_per_sheet():
+    pdf = PdfReader(io.BytesIO(renderizar_folhas_resposta([_contexto(), _contexto(aluno_nome='Maria')])))
+
+    assert len(pdf.pages) == 2
+    texto = pdf.pages[0].extract_text()
+    assert 'João (Turno B)' in texto
+    assert 'Escola Municipal Central' in texto
+    assert 'QUESTÃO' in texto and '10' in texto
+    assert 'Maria' in pdf.pages[1].extract_text()
+
+
+def test_long_cadernos_continue_on_extra_pages():
+    por_pagina = _linhas_por_pagina(GABARITO_LAYOUT)
+    pdf = PdfReader(io.BytesIO(renderizar_folhas_resposta([_contexto(questoes=por_pagina + 1)])))
+
+    assert len(pdf.pages) == 2
+    assert 'Página 2 de 2' in pdf.pages[1].extract_text()
+
+
+@pytest.mark.django_db
+def test_folha_resposta_endpoints_return_pdf_without_browser():
+    secretaria = baker.make('core.Secretaria')
+    user = baker.make('core.User', secretaria=secretaria, role='admin')
+    avaliacao = baker.make('avaliacoes.Avaliacao', secretaria=secretaria, titulo='Simulado')
+    caderno = baker.make('avaliacoes.Caderno', secretaria=secretaria, avaliacao=avaliacao)
+    questoes = baker.make('itens.Questao', secretaria=secretaria, _quantity=3)
+    for ordem, questao in enumerate(questoes, start=1):
+        baker.make('avaliacoes.CadernoQuestao', caderno=caderno, questao=questao, ordem=ordem)
+    turma = baker.make('escolas.Turma', secretaria=secretaria, escola__secretaria=secretaria)
+    provas = [
+        baker.make(
+            'avaliacoes.ProvaAluno',
+            secretaria=secretaria,
+            avaliacao=avaliacao,
+            aluno=baker.make('escolas.Aluno', secretaria=secretaria, turma=turma, nome=nome),
+            caderno=caderno,
+            qr_payload={'aluno': nome},
+        )
+        for nome in ('Ana', 'Bruno')
+    ]
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.get(reverse('provaaluno-folha-resposta', args=[provas[0].id]))
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/pdf'
+    pdf = PdfReader(io.BytesIO(response.content))
+    assert len(pdf.pages) == 1
+    assert 'Simulado' in pdf.pages[0].extract_text()
+
+    response = client.get(reverse('avaliacao-folhas-resposta', args=[avaliacao.id]), {'turma': turma.id})
+    assert response.status_code == 200
+    assert len(PdfReader(io.BytesIO(response.content)).pages) == 2
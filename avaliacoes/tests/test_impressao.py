@@ -0,0 +1,251 @@
+import threading
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from avaliacoes import impressao
+from avaliacoes.models import LoteImpressao
+
+
+@pytest.fixture
+def fake_render(monkeypatch):
+    chamadas = {'threads': set(), 'cadernos': [], 'provas': []}
+
+    def render(contexto, out_path, pool=None, corpo_pdf=None):
+        if contexto.get('falhar'):
+            raise RuntimeError('falha simulada')
+        chamadas['threads'].add(threading.current_thread().name)
+        chamadas['provas'].append(corpo_pdf)
+        Path(out_path).write_bytes(b'%PDF-1.4 test pdf')
+        return str(out_path)
+
+    def render_caderno(contexto, out_path, pool=None):
+        chamadas['cadernos'].append(Path(out_path).name)
+        Path(out_path).write_bytes(b'%PDF-1.4 corpo')
+        return str(out_path)
+
+    monkeypatch.setattr(impressao, 'render_prova_pdf', render)
+    monkeypatch.setattr(impressao, 'render_caderno_pdf', render_caderno)
+    return chamadas
+
+
+@pytest.fixture
+def pool_de_tres(settings):
+    from avaliacoes import pdf_service
+
+    settings.PDF_BROWSER_POOL_SIZE = 3
+    pdf_service.shutdown_browser_pool()
+    yield pdf_service.get_browser_pool()
+    pdf_service.shutdown_browser_pool()
+
+
+def test_renderizar_lote_distributes_work_and_collects_failures(fake_render, pool_de_tres, tmp_path):
+    tarefas = [impressao.TarefaPdf({'idx': idx}, tmp_path / f'prova_{idx}.pdf') for idx in range(6)]
+    tarefas.append(impressao.TarefaPdf({'falhar': True}, tmp_path / 'quebrada.pdf'))
+
+    resultado = impressao.renderizar_lote(tarefas, paralelismo=3)
+
+    assert resultado.paralelismo == 3
+    assert len(resultado.arquivos) == 6
+    assert resultado.falhas == [{'arquivo': str(tmp_path / 'quebrada.pdf'), 'erro': 'falha simulada'}]
+    assert fake_render['threads'] <= {'lote-pdf-0', 'lote-pdf-1', 'lote-pdf-2'}
+    assert resultado.pdfs_por_segundo > 0
+
+
+def test_renderizar_lote_reuses_the_shared_pool_and_caps_workers(fake_render, pool_de_tres, monkeypatch, tmp_path):
+    pools = set()
+    render = impressao.render_prova_pdf
+    monkeypatch.setattr(
+        impressao, 'render_prova_pdf',
+        lambda contexto, out_path, pool=None, corpo_pdf=None: pools.add(pool) or render(contexto, out_path),
+    )
+    tarefas = [impressao.TarefaPdf({'idx': idx}, tmp_path / f'prova_{idx}.pdf') for idx in range(6)]
+
+    assert impressao.renderizar_lote(tarefas, paralelismo=8).paralelismo == 3
+    assert impressao.renderizar_lote(tarefas, paralelismo=8).paralelismo == 3
+    assert pools == {pool_de_tres}
+
+
+def test_resolver_paralelismo_is_clamped(settings):
+    settings.PDF_LOTE_PARALELISMO = 2
+    settings.PDF_LOTE_PARALELISMO_MAXIMO = 4
+
+    assert impressao.resolver_paralelismo() == 2
+    assert impressao.resolver_paralelismo(0) == 1
+    assert impressao.resolver_paralelismo(50) == 4
+
+
+def _avaliacao_com_provas(cadernos=1, alunos=('Ana', 'Bruno', 'Carla')):
+    secretaria = baker.make('core.Secretaria')
+    user = baker.make('core.User', secretaria=secretaria, role='admin')
+    avaliacao = baker.make('avaliacoes.Avaliacao', secretaria=secretaria)
+    cadernos_obj = baker.make(
+        'avaliacoes.Caderno', secretaria=secretaria, avaliacao=avaliacao, _quantity=cadernos
+    )
+    turma = baker.make('escolas.Turma', secretaria=secretaria, escola__secretaria=secretaria)
+    for idx, nome in enumerate(alunos):
+        aluno = baker.make('escolas.Aluno', secretaria=secretaria, turma=turma, nome=nome)
+        baker.make(
+            'avaliacoes.ProvaAluno',
+            secretaria=secretaria,
+            avaliacao=avaliacao,
+            aluno=aluno,
+            caderno=cadernos_obj[idx % cadernos],
+            qr_payload={'prova_aluno_id': aluno.id},
+        )
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client, avaliacao
+
+
+def _gerar(client, avaliacao, **dados):
+    return client.post(
+        reverse('avaliacao-gerar-lote-impressao', args=[avaliacao.id]), dados, format='json'
+    )
+
+
+@pytest.mark.django_db
+def test_gerar_lote_impressao_runs_tracked_job(fake_render, settings):
+    client, avaliacao = _avaliacao_com_provas()
+
+    response = _gerar(client, avaliacao, paralelismo=2, modo='completa')
+
+    assert response.status_code == 202
+    assert response['Location'].endswith(reverse('loteimpressao-detail', args=[response.data['id']]))
+    assert response.data['status'] == LoteImpressao.STATUS_CONCLUIDO
+    assert response.data['total'] == response.data['processadas'] == response.data['geradas'] == 3
+    assert response.data['percentual'] == 100.0
+    assert response.data['falhas'] == []
+    assert response.data['media_render_ms'] is not None
+    assert fake_render['cadernos'] == []
+    assert fake_render['provas'] == [None, None, None]
+    assert len(list(Path(response.data['diretorio']).glob('prova_*.pdf'))) == 3
+
+    detalhe = client.get(response['Location'])
+    assert detalhe.status_code == 200 and detalhe.data['id'] == response.data['id']
+
+    assert _gerar(client, avaliacao, paralelismo='x').status_code == 400
+    assert _gerar(client, avaliacao, modo='outro').status_code == 400
+
+
+@pytest.mark.django_db
+def test_gerar_lote_impressao_renders_each_caderno_body_once(fake_render):
+    client, avaliacao = _avaliacao_com_provas(cadernos=2, alunos=('Ana', 'Bruno', 'Carla', 'Davi'))
+
+    response = _gerar(client, avaliacao)
+
+    assert response.data['modo'] == 'caderno'
+    assert response.data['geradas'] == 4
+    assert len(fake_render['cadernos']) == 2
+    assert len(set(fake_render['provas'])) == 2
+    # Shared bodies are temporary and never left next to the provas.
+    assert not list(Path(response.data['diretorio']).glob('.caderno_*'))
+
+
+@pytest.mark.django_db
+def test_second_lote_reuses_unchanged_pdfs(fake_render):
+    client, avaliacao = _avaliacao_com_provas()
+    _gerar(client, avaliacao, modo='completa')
+
+    aluno = avaliacao.provaaluno_set.order_by('id').first().aluno
+    aluno.nome = 'Ana Maria'
+    aluno.save()
+    response = _gerar(client, avaliacao, modo='completa')
+
+    assert response.data['geradas'] == 1
+    assert response.data['reaproveitadas'] == 2
+    assert len(fake_render['provas']) == 4
+
+
+@pytest.mark.django_db
+def test_failed_lote_resumes_from_last_chunk(fake_render, settings, monkeypatch):
+    settings.PDF_LOTE_TAMANHO_BLOCO = 2
+    client, avaliacao = _avaliacao_com_provas(alunos=('Ana', 'Bruno', 'Carla', 'Davi', 'Eva'))
+    original = impressao.renderizar_lote
+    chamadas = []
+
+    def quebrar_no_segundo_bloco(*args, **kwargs):
+        chamadas.append(1)
+        if len(chamadas) == 2:
+            raise RuntimeError('servidor reiniciado')
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(impressao, 'renderizar_lote', quebrar_no_segundo_bloco)
+    response = _gerar(client, avaliacao, modo='completa')
+
+    lote = LoteImpressao.objects.get(pk=response.data['id'])
+    assert lote.status == LoteImpressao.STATUS_FALHOU
+    assert lote.erro == 'servidor reiniciado'
+    assert lote.processadas == 2
+
+    retomado = client.post(reverse('loteimpressao-retomar', args=[lote.id]))
+
+    assert retomado.status_code == 202
+    assert retomado.data['status'] == LoteImpressao.STATUS_CONCLUIDO
+    assert retomado.data['processadas'] == 5
+    assert retomado.data['geradas'] == 5
+    assert len(fake_render['provas']) == 5
+    assert client.post(reverse('loteimpressao-retomar', args=[lote.id])).status_code == 409
+    assert client.post(reverse('loteimpressao-list'), {}).status_code == 405
+
+
+@pytest.mark.django_db
+def test_retomar_lotes_command_picks_up_stalled_lotes(fake_render):
+    client, avaliacao = _avaliacao_com_provas()
+    lote = LoteImpressao.objects.create(
+        secretaria=avaliacao.secretaria, avaliacao=avaliacao, modo='completa',
+        diretorio=str(Path(settings.MEDIA_ROOT) / 'lote'),
+        status=LoteImpressao.STATUS_EXECUTANDO,
+    )
+    LoteImpressao.objects.filter(pk=lote.pk).update(
+        atualizado_em=timezone.now() - impressao.LOTE_INATIVO_APOS * 2
+    )
+
+    call_command('retomar_lotes_impressao')
+
+    lote.refresh_from_db()
+    assert lote.status == LoteImpressao.STATUS_CONCLUIDO
+    assert lote.geradas == 3
+
+
+def test_renderizar_lote_pulses_while_workers_render(fake_render, monkeypatch, tmp_path):
+    liberar = threading.Event()
+    pulsos = []
+    original = impressao.render_prova_pdf
+
+    def lento(*args, **kwargs):
+        liberar.wait(5)
+        return original(*args, **kwargs)
+
+    def pulso():
+        pulsos.append(1)
+        if len(pulsos) >= 3:
+            liberar.set()
+
+    monkeypatch.setattr(impressao, 'render_prova_pdf', lento)
+    monkeypatch.setattr(impressao, 'LOTE_PULSO_A_CADA', timedelta(milliseconds=10))
+
+    resultado = impressao.renderizar_lote([impressao.TarefaPdf({}, tmp_path / 'p.pdf')], 1, pulso=pulso)
+
+    assert len(resultado.arquivos) == 1
+    assert len(pulsos) >= 3
+
+
+@pytest.mark.django_db
+def test_concurrent_lotes_of_one_avaliacao_use_their_own_files(fake_render):
+    client, avaliacao = _avaliacao_com_provas()
+
+    primeiro = _gerar(client, avaliacao).data
+    segundo = _gerar(client, avaliacao).data
+
+    assert primeiro['diretorio'] != segundo['diretorio']
+    assert Path(primeiro['diretorio']).parent == Path(segundo['diretorio']).parent
+    temporarios = {impressao.arquivo_temporario(Path(primeiro['diretorio']) / 'x.pdf') for _ in range(5)}
+    assert len(temporarios) == 5
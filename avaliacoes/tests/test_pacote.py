@@ -0,0 +1,103 @@
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+from pypdf import PdfReader, PdfWriter
+from rest_framework.test import APIClient
+
+from avaliacoes import pdf_cache
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    chamadas = []
+
+    def renderizar(contexto, out_path, pool=None):
+        chamadas.append(contexto['aluno_nome'])
+        writer = PdfWriter()
+        writer.add_blank_page(width=595, height=842)
+        with Path(out_path).open('wb') as arquivo:
+            writer.write(arquivo)
+        return str(out_path)
+
+    monkeypatch.setattr(pdf_cache, 'render_prova_pdf', renderizar)
+    return chamadas
+
+
+@pytest.fixture
+def cenario(db):
+    secretaria = baker.make('core.Secretaria')
+    user = baker.make('core.User', secretaria=secretaria, role='admin')
+    avaliacao = baker.make('avaliacoes.Avaliacao', secretaria=secretaria)
+    caderno = baker.make('avaliacoes.Caderno', secretaria=secretaria, avaliacao=avaliacao)
+    escola = baker.make('escolas.Escola', secretaria=secretaria, nome='Escola Central')
+    turmas = [
+        baker.make('escolas.Turma', secretaria=secretaria, escola=escola, nome=nome)
+        for nome in ('6A', '6B')
+    ]
+    for turma, nomes in zip(turmas, (('Ana', 'Bruno'), ('Carla',))):
+        for nome in nomes:
+            aluno = baker.make('escolas.Aluno', secretaria=secretaria, turma=turma, nome=nome)
+            baker.make(
+                'avaliacoes.ProvaAluno',
+                secretaria=secretaria,
+                avaliacao=avaliacao,
+                aluno=aluno,
+                caderno=caderno,
+                qr_payload={'aluno': aluno.id},
+            )
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client, reverse('avaliacao-pacote', args=[avaliacao.id]), turmas
+
+
+def test_pacote_streams_zip_for_a_turma(renders, cenario):
+    client, url, turmas = cenario
+
+    response = client.get(url, {'turma': turmas[0].id})
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response['Content-Type'] == 'application/zip'
+    arquivo = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+    nomes = arquivo.namelist()
+    assert len(nomes) == 2
+    assert all(nome.startswith('escola-central/6a/prova_') for nome in nomes)
+    assert arquivo.read(nomes[0]).startswith(b'%PDF')
+    assert arquivo.testzip() is None
+
+
+def test_pacote_pdf_concatenates_and_supports_ranges(renders, cenario):
+    client, url, _ = cenario
+
+    response = client.get(url, {'formato': 'pdf'})
+    conteudo = b''.join(response.streaming_content)
+    assert response.status_code == 200
+    assert response['Accept-Ranges'] == 'bytes'
+    assert len(PdfReader(io.BytesIO(conteudo)).pages) == 3
+    etag = response['ETag']
+
+    parcial = client.get(url, {'formato': 'pdf'}, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE=etag)
+    assert parcial.status_code == 206
+    assert parcial['Content-Range'] == f'bytes 10-19/{len(conteudo)}'
+    assert b''.join(parcial.streaming_content) == conteudo[10:20]
+
+    final = client.get(url, {'formato': 'pdf'}, HTTP_RANGE='bytes=-5')
+    assert b''.join(final.streaming_content) == conteudo[-5:]
+
+    fora = client.get(url, {'formato': 'pdf'}, HTTP_RANGE=f'bytes={len(conteudo)}-')
+    assert fora.status_code == 416
+
+    # Bundle and parts came from the cache after the first request.
+    assert len(renders) == 3
+
+
+def test_pacote_validates_parameters(renders, cenario):
+    client, url, _ = cenario
+
+    assert client.get(url, {'formato': 'tar'}).status_code == 400
+    assert client.get(url, {'escola': 'x'}).status_code == 400
+    assert client.get(url, {'turma': 999999}).status_code == 404
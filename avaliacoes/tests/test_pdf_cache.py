@@ -0,0 +1,132 @@
+import os
+import threading
+from pathlib import Path
+
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from avaliacoes import pdf_cache
+
+
+@pytest.fixture
+def renders():
+    chamadas = []
+
+    def renderizar(contexto, out_path):
+        chamadas.append(contexto)
+        Path(out_path).write_bytes(b'%PDF-1.4 ' + str(contexto).encode() * 10)
+        return str(out_path)
+
+    renderizar.chamadas = chamadas
+    return renderizar
+
+
+def test_obter_pdf_reuses_file_until_context_changes(renders, settings):
+    contexto = {'aluno_nome': 'Ana', 'questoes': [{'ordem': 1, 'enunciado': '2 + 2'}]}
+
+    primeiro, chave = pdf_cache.obter_pdf(contexto, renders)
+    segundo, mesma_chave = pdf_cache.obter_pdf(dict(contexto), renders)
+
+    assert primeiro == segundo and chave == mesma_chave
+    assert len(renders.chamadas) == 1
+    assert primeiro.is_relative_to(Path(settings.MEDIA_ROOT) / 'pdf_cache')
+
+    alterado = {**contexto, 'questoes': [{'ordem': 1, 'enunciado': '3 + 3'}]}
+    terceiro, outra_chave = pdf_cache.obter_pdf(alterado, renders)
+    assert outra_chave != chave and terceiro != primeiro
+    assert len(renders.chamadas) == 2
+
+
+def test_podar_cache_evicts_least_recently_used(renders, settings):
+    caminhos = []
+    for idx in range(3):
+        caminho, _ = pdf_cache.obter_pdf({'aluno_nome': f'Aluno {idx}'}, renders)
+        os.utime(caminho, (1000 + idx, 1000 + idx))
+        caminhos.append(caminho)
+    os.utime(caminhos[0], (5000, 5000))  # most recently served
+    tamanho = caminhos[0].stat().st_size
+
+    pdf_cache.podar_cache(limite_bytes=tamanho * 2)
+
+    assert caminhos[0].exists()
+    assert not caminhos[1].exists()
+    assert caminhos[2].exists()
+
+
+@pytest.mark.django_db
+def test_download_serves_cached_pdf_with_etag(renders, monkeypatch):
+    monkeypatch.setattr(pdf_cache, 'render_prova_pdf', renders)
+    secretaria = baker.make('core.Secretaria')
+    user = baker.make('core.User', secretaria=secretaria, role='admin')
+    avaliacao = baker.make('avaliacoes.Avaliacao', secretaria=secretaria)
+    caderno = baker.make('avaliacoes.Caderno', secretaria=secretaria, avaliacao=avaliacao)
+    turma = baker.make('escolas.Turma', secretaria=secretaria, escola__secretaria=secretaria)
+    aluno = baker.make('escolas.Aluno', secretaria=secretaria, turma=turma, nome='Ana Souza')
+    prova = baker.make(
+        'avaliacoes.ProvaAluno',
+        secretaria=secretaria,
+        avaliacao=avaliacao,
+        aluno=aluno,
+        caderno=caderno,
+        qr_payload={'prova_aluno_id': 1},
+    )
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('provaaluno-download', args=[prova.id])
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response['Content-Disposition'] == 'attachment; filename="prova_ana-souza.pdf"'
+    assert b''.join(response.streaming_content).startswith(b'%PDF')
+    etag = response['ETag']
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert client.get(url).status_code == 200
+    assert len(renders.chamadas) == 1
+
+    aluno.nome = 'Ana Souza Lima'
+    aluno.save()
+    response = client.get(url)
+    assert response['ETag'] != etag
+    assert len(renders.chamadas) == 2
+
+
+def test_pacote_prunes_once_and_keeps_the_files_it_serves(renders, settings, monkeypatch):
+    settings.PDF_CACHE_MAX_BYTES = 1
+    podas = []
+    podar = pdf_cache.podar_cache
+    monkeypatch.setattr(pdf_cache, 'render_prova_pdf', renders)
+    monkeypatch.setattr(pdf_cache, 'mesclar_pdfs', lambda caminhos, destino: Path(destino).write_bytes(
+        b''.join(Path(caminho).read_bytes() for caminho in caminhos)
+    ))
+    monkeypatch.setattr(
+        pdf_cache, 'podar_cache', lambda *args, **kwargs: podas.append(kwargs) or podar(*args, **kwargs)
+    )
+    antigo, _ = pdf_cache.obter_pdf({'aluno_nome': 'Antigo'}, renders, podar=False)
+
+    pacote, _ = pdf_cache.obter_pacote_pdf({'aluno_nome': f'Aluno {idx}'} for idx in range(3))
+
+    assert len(podas) == 1
+    # Over the limit, only files outside the request are evicted.
+    assert pacote.exists() and not antigo.exists()
+    assert len(list(pdf_cache.diretorio_cache().glob('*/*.pdf'))) == 4
+
+
+def test_scratch_files_are_unique_across_threads_and_never_pruned(settings):
+    destino = pdf_cache.caminho_cache('ab' * 32)
+    destino.parent.mkdir(parents=True)
+    temporarios = []
+    threads = [
+        threading.Thread(target=lambda: temporarios.append(pdf_cache.arquivo_temporario(destino)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(temporarios)) == 8
+    pdf_cache.podar_cache(limite_bytes=0)
+    assert all(temporario.exists() for temporario in temporarios)
@@ -1,8 +1,10 @@
 import sys
+import threading
 import types
 from pathlib import Path
 
 import pytest
+from pypdf import PdfReader, PdfWriter
 
 
 class _Capture:
@@ -10,6 +12,8 @@ class _Capture:
         self.set_content_args = None
         self.pdf_kwargs = None
         self.browser_closed = False
+        self.launches = 0
+        self.contexts_closed = 0
 
 
 class FakePage:
@@ -23,10 +27,13 @@ class FakePage:
         self._capture.pdf_kwargs = kwargs
         output = Path(kwargs['path'])
         output.parent.mkdir(parents=True, exist_ok=True)
-        output.write_bytes(b'%PDF-1.4 test pdf')
+        writer = PdfWriter()
+        writer.add_blank_page(width=595, height=842)
+        with output.open('wb') as arquivo:
+            writer.write(arquivo)
 
 
-class FakeBrowser:
+class FakeBrowserContext:
     def __init__(self, page: FakePage, capture: _Capture):
         self._page = page
         self._capture = capture
@@ -34,6 +41,21 @@ class FakeBrowser:
     def new_page(self) -> FakePage:
         return self._page
 
+    def close(self) -> None:
+        self._capture.contexts_closed += 1
+
+
+class FakeBrowser:
+    def __init__(self, page: FakePage, capture: _Capture):
+        self._page = page
+        self._capture = capture
+
+    def new_context(self) -> FakeBrowserContext:
+        return FakeBrowserContext(self._page, self._capture)
+
+    def is_connected(self) -> bool:
+        return not self._capture.browser_closed
+
     def close(self) -> None:
         self._capture.browser_closed = True
 
@@ -44,6 +66,8 @@ class FakeChromium:
         self._capture = capture
 
     def launch(self) -> FakeBrowser:
+        self._capture.launches += 1
+        self._capture.browser_closed = False
         return FakeBrowser(self._page, self._capture)
 
 
@@ -51,21 +75,45 @@ class FakePlaywright:
     def __init__(self, page: FakePage, capture: _Capture):
         self.chromium = FakeChromium(page, capture)
 
+    def stop(self) -> None:
+        pass
+
 
 class FakeContext:
     def __init__(self, page: FakePage, capture: _Capture):
         self._page = page
         self._capture = capture
 
-    def __enter__(self) -> FakePlaywright:
+    def start(self) -> FakePlaywright:
         return FakePlaywright(self._page, self._capture)
 
-    def __exit__(self, exc_type, exc, tb) -> bool:
-        return False
 
-
-@pytest.mark.django_db
-def test_render_prova_pdf_creates_file(monkeypatch, tmp_path):
+CONTEXTO = {
+    'titulo': 'Prova de Matemática',
+    'aluno_nome': 'Fulano',
+    'turma_nome': '6º A',
+    'escola_nome': 'Escola Municipal Central',
+    'data_aplicacao': '2025-11-10',
+    'questoes': [
+        {
+            'ordem': 1,
+            'enunciado': 'Quanto é 2 + 2?',
+            'alternativas': [
+                {'letra': 'A', 'texto': '1'},
+                {'letra': 'B', 'texto': '2'},
+                {'letra': 'C', 'texto': '3'},
+                {'letra': 'D', 'texto': '4'},
+                {'letra': 'E', 'texto': '5'},
+            ],
+        }
+    ],
+    'total_questoes': 1,
+    'qr_payload': {'token': 'abc'},
+}
+
+
+@pytest.fixture
+def fake_playwright(monkeypatch):
     capture = _Capture()
     fake_page = FakePage(capture)
 
@@ -78,34 +126,21 @@ def test_render_prova_pdf_creates_file(monkeypatch, tmp_path):
 
     from avaliacoes import pdf_service
 
+    pdf_service.shutdown_browser_pool()
     monkeypatch.setattr(pdf_service, 'sync_playwright', fake_sync_playwright)
     monkeypatch.setattr(pdf_service, '_qr_png_b64', lambda payload: 'fake-b64')
+    yield capture
+    pdf_service.shutdown_browser_pool()
+
+
+@pytest.mark.django_db
+def test_render_prova_pdf_creates_file(fake_playwright, tmp_path):
+    from avaliacoes import pdf_service
 
+    capture = fake_playwright
     output_path = tmp_path / 'pdfs' / 'prova.pdf'
-    contexto = {
-        'titulo': 'Prova de Matemática',
-        'aluno_nome': 'Fulano',
-        'turma_nome': '6º A',
-        'escola_nome': 'Escola Municipal Central',
-        'data_aplicacao': '2025-11-10',
-        'questoes': [
-            {
-                'ordem': 1,
-                'enunciado': 'Quanto é 2 + 2?',
-                'alternativas': [
-                    {'letra': 'A', 'texto': '1'},
-                    {'letra': 'B', 'texto': '2'},
-                    {'letra': 'C', 'texto': '3'},
-                    {'letra': 'D', 'texto': '4'},
-                    {'letra': 'E', 'texto': '5'},
-                ],
-            }
-        ],
-        'total_questoes': 1,
-        'qr_payload': {'token': 'abc'},
-    }
 
-    generated_path = pdf_service.render_prova_pdf(contexto, output_path)
+    generated_path = pdf_service.render_prova_pdf(CONTEXTO, output_path)
 
     assert Path(generated_path).exists()
     html, wait_until = capture.set_content_args
@@ -113,4 +148,91 @@ def test_render_prova_pdf_creates_file(monkeypatch, tmp_path):
     assert 'fake-b64' in html
     assert wait_until == 'load'
     assert capture.pdf_kwargs['path'] == str(output_path)
+    assert capture.contexts_closed == 1
+
+    pdf_service.shutdown_browser_pool()
+    assert capture.browser_closed is True
+
+
+@pytest.mark.django_db
+def test_browser_pool_reuses_and_recycles_browsers(fake_playwright, tmp_path):
+    from avaliacoes import pdf_service
+
+    capture = fake_playwright
+    pool = pdf_service.BrowserPool(size=1, max_renders=2)
+
+    for idx in range(3):
+        pdf_service.render_prova_pdf(CONTEXTO, tmp_path / f'prova_{idx}.pdf', pool=pool)
+
+    # Two renders share the first browser, which is then recycled.
+    assert capture.launches == 2
+    assert capture.contexts_closed == 3
+
+    capture.browser_closed = True  # simulate a crashed browser
+    pdf_service.render_prova_pdf(CONTEXTO, tmp_path / 'prova_3.pdf', pool=pool)
+    assert capture.launches == 3
+    pool.fechar()
+
+
+@pytest.mark.django_db
+def test_render_prova_pdf_prepends_cover_to_shared_body(fake_playwright, tmp_path):
+    from avaliacoes import pdf_service
+
+    capture = fake_playwright
+    corpo = pdf_service.render_caderno_pdf(CONTEXTO, tmp_path / 'caderno.pdf')
+    assert 'Quanto é 2 + 2?' in capture.set_content_args[0]
+    assert 'fake-b64' not in capture.set_content_args[0]
+
+    prova = pdf_service.render_prova_pdf(CONTEXTO, tmp_path / 'prova.pdf', corpo_pdf=corpo)
+
+    html = capture.set_content_args[0]
+    assert 'Fulano' in html and 'fake-b64' in html
+    assert 'Quanto é 2 + 2?' not in html
+    assert len(PdfReader(prova).pages) == 2
+    assert sorted(path.name for path in tmp_path.glob('*.pdf')) == ['caderno.pdf', 'prova.pdf']
+    assert not list(tmp_path.glob('.*.pdf'))
+
+
+@pytest.mark.django_db
+def test_medir_etapas_collects_render_stages(fake_playwright, tmp_path):
+    from avaliacoes import pdf_service
+
+    pool = pdf_service.BrowserPool(size=1, max_renders=10)
+    with pdf_service.medir_etapas() as etapas:
+        pdf_service.render_prova_pdf(CONTEXTO, tmp_path / 'a.pdf', pool=pool)
+        pdf_service.render_prova_pdf(CONTEXTO, tmp_path / 'b.pdf', pool=pool)
+    pool.fechar()
+
+    assert set(etapas) == {
+        'qr', 'jinja', 'inicio_navegador', 'contexto_navegador', 'layout', 'escrita_pdf',
+    }
+    # Outside the block nothing is collected.
+    pdf_service.render_prova_pdf(CONTEXTO, tmp_path / 'c.pdf', pool=pool)
+    pool.fechar()
+    assert 'mesclagem' not in etapas
+
+
+@pytest.mark.django_db
+def test_browser_pool_bounds_browsers_across_threads(fake_playwright, tmp_path):
+    from avaliacoes import pdf_service
+
+    capture = fake_playwright
+    pool = pdf_service.BrowserPool(size=2, max_renders=100)
+    threads = [
+        threading.Thread(
+            target=pdf_service.render_prova_pdf, args=(CONTEXTO, tmp_path / f'prova_{idx}.pdf'),
+            kwargs={'pool': pool},
+        )
+        for idx in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Caller threads come and go; the browsers stay with the pool.
+    assert capture.launches <= 2
+    assert capture.contexts_closed == 8
+    assert len(list(tmp_path.glob('prova_*.pdf'))) == 8
+    pool.fechar()
     assert capture.browser_closed is True
@@ -0,0 +1,112 @@
+import pytest
+import qrcode
+from django.core.management import call_command
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from avaliacoes.models import ProvaAluno
+from avaliacoes.pdf_service import qr_dados
+from avaliacoes.qr import TokenQRInvalido, gerar_token, ler_token
+
+
+def test_token_roundtrip_is_compact_and_alphanumeric():
+    token = gerar_token(123456, 42)
+
+    assert len(token) <= 32
+    assert token.isalnum() and token.isupper()
+    dados = ler_token(token.lower())
+    assert (dados.prova_id, dados.caderno_id) == (123456, 42)
+    assert ler_token(gerar_token(7)).caderno_id is None
+
+
+def _versao_qr(dados):
+    codigo = qrcode.QRCode(border=0, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    codigo.add_data(dados)
+    codigo.make(fit=True)
+    return codigo.version
+
+
+def test_big_ids_use_the_wide_layout_and_stay_small():
+    compacto = gerar_token(2**32 - 1, 42)
+    largo = gerar_token(2**32, 2**40)
+
+    assert (ler_token(compacto).versao, _versao_qr(compacto)) == (1, 2)
+    dados = ler_token(largo)
+    assert (dados.prova_id, dados.caderno_id, dados.versao) == (2**32, 2**40, 2)
+    assert _versao_qr(largo) == 3
+    with pytest.raises(ValueError):
+        gerar_token(2**64)
+
+
+@pytest.mark.parametrize('token', ['', 'XX123', 'AV!!!!', 'AVAAAA'])
+def test_malformed_tokens_are_rejected(token):
+    with pytest.raises(TokenQRInvalido):
+        ler_token(token)
+
+
+def test_tampered_or_foreign_tokens_are_rejected(settings):
+    token = gerar_token(10, 2)
+    meio = len(token) // 2
+    adulterado = token[:meio] + ('A' if token[meio] != 'A' else 'B') + token[meio + 1:]
+    with pytest.raises(TokenQRInvalido):
+        ler_token(adulterado)
+
+    settings.SECRET_KEY = 'outra-chave'
+    with pytest.raises(TokenQRInvalido):
+        ler_token(token)
+
+
+def test_qr_encodes_only_the_token():
+    token = gerar_token(1, 1)
+
+    assert qr_dados({'qr_token': token, 'aluno_nome': 'Ana'}) == token
+
+
+@pytest.mark.django_db
+def test_prova_creation_stores_token_and_qr_endpoint_resolves_it():
+    secretaria = baker.make('core.Secretaria')
+    user = baker.make('core.User', secretaria=secretaria, role='admin')
+    avaliacao = baker.make('avaliacoes.Avaliacao', secretaria=secretaria)
+    caderno = baker.make('avaliacoes.Caderno', secretaria=secretaria, avaliacao=avaliacao)
+    aluno = baker.make('escolas.Aluno', secretaria=secretaria, turma__secretaria=secretaria)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.post(
+        reverse('provaaluno-list'),
+        {'avaliacao': avaliacao.id, 'aluno': aluno.id, 'caderno': caderno.id},
+        format='json',
+    )
+    assert response.status_code == 201
+    token = response.data['qr_payload']['qr_token']
+    assert ler_token(token).prova_id == response.data['id']
+
+    resolvida = client.get(reverse('provaaluno-qr', args=[token]))
+    assert resolvida.status_code == 200
+    assert resolvida.data['id'] == response.data['id']
+
+    assert client.get(reverse('provaaluno-qr', args=['AVINVALIDO'])).status_code == 400
+
+    outra = baker.make('core.User', secretaria=baker.make('core.Secretaria'), role='admin')
+    client.force_authenticate(user=outra)
+    assert client.get(reverse('provaaluno-qr', args=[token])).status_code == 404
+
+
+@pytest.mark.django_db
+def test_migrar_qr_tokens_backfills_existing_rows():
+    secretaria = baker.make('core.Secretaria')
+    provas = baker.make(
+        'avaliacoes.ProvaAluno',
+        secretaria=secretaria,
+        avaliacao__secretaria=secretaria,
+        aluno__secretaria=secretaria,
+        qr_payload={'aluno_nome': 'Fulano'},
+        _quantity=3,
+    )
+
+    call_command('migrar_qr_tokens', batch_size=2)
+
+    for prova in ProvaAluno.objects.filter(id__in=[prova.id for prova in provas]):
+        assert prova.qr_payload['aluno_nome'] == 'Fulano'
+        assert ler_token(prova.qr_payload['qr_token']).prova_id == prova.id
@@ -4,6 +4,7 @@ from .views import (
     AvaliacaoViewSet,
     CadernoQuestaoViewSet,
     CadernoViewSet,
+    LoteImpressaoViewSet,
     ProvaAlunoViewSet,
 )
 
@@ -12,5 +13,6 @@ router.register('avaliacoes', AvaliacaoViewSet)
 router.register('cadernos', CadernoViewSet)
 router.register('cadernos-questoes', CadernoQuestaoViewSet)
 router.register('provas', ProvaAlunoViewSet)
+router.register('lotes-impressao', LoteImpressaoViewSet)
 
 urlpatterns = router.urls
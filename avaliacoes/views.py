@@ -1,79 +1,35 @@
 from pathlib import Path
-from tempfile import NamedTemporaryFile
-from typing import Any
+from typing import Any, Iterator, Optional
 
+from django.shortcuts import get_object_or_404
 from django.utils.text import slugify
-from django.http import HttpResponse
-from rest_framework import status
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from rest_framework import exceptions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 
+from core.jobs import disparar
 from core.tenancy import TenantScopedViewSet
+from relatorios.services import encerrar_avaliacao, reabrir_avaliacao
 from respostas.models import Gabarito
-from .models import Avaliacao, Caderno, CadernoQuestao, ProvaAluno
-from .pdf_service import render_prova_pdf
+from respostas.services import sincronizar_analiticos
+from .models import Avaliacao, Caderno, CadernoQuestao, LoteImpressao, ProvaAluno
+from .contextos import build_caderno_pdf_context, build_prova_pdf_context
+from .emissao import EmissaoInvalida, emitir_provas
+from .folha_resposta import renderizar_folhas_resposta
+from .impressao import MODOS_IMPRESSAO, iniciar_lote_impressao, iterar_zip, processar_lote_impressao
+from .pdf_cache import obter_pacote_pdf, obter_pdf, podar_cache
+from .qr import TokenQRInvalido, ler_token
 from .serializers import (
     AvaliacaoSerializer,
     CadernoQuestaoSerializer,
     CadernoSerializer,
+    LoteImpressaoSerializer,
     ProvaAlunoSerializer,
 )
 
 
-def build_prova_pdf_context(prova: ProvaAluno) -> dict[str, Any]:
-    avaliacao = prova.avaliacao
-    aluno = prova.aluno
-    turma = getattr(aluno, 'turma', None)
-    escola = getattr(turma, 'escola', None)
-
-    questoes_info: list[dict[str, Any]] = []
-    if prova.caderno:
-        caderno_questoes = (
-            prova.caderno.cadernoquestao_set.select_related('questao').all().order_by('ordem')
-        )
-        for cq in caderno_questoes:
-            questao = cq.questao
-            alternativas = [
-                {'letra': 'A', 'texto': questao.alternativa_a},
-                {'letra': 'B', 'texto': questao.alternativa_b},
-                {'letra': 'C', 'texto': questao.alternativa_c},
-                {'letra': 'D', 'texto': questao.alternativa_d},
-                {'letra': 'E', 'texto': questao.alternativa_e},
-            ]
-            questoes_info.append(
-                {
-                    'ordem': cq.ordem,
-                    'enunciado': questao.enunciado,
-                    'alternativas': alternativas,
-                }
-            )
-
-    return {
-        'titulo': avaliacao.titulo,
-        'data_aplicacao': getattr(avaliacao, 'data_aplicacao', None),
-        'aluno_nome': getattr(aluno, 'nome', ''),
-        'turma_nome': getattr(turma, 'nome', ''),
-        'escola_nome': getattr(escola, 'nome', ''),
-        'qr_payload': prova.qr_payload,
-        'questoes': questoes_info,
-        'total_questoes': len(questoes_info),
-        'gabarito_layout': {
-            'columns': ['questao', 'A', 'B', 'C', 'D', 'E'],
-            'column_width_mm': [20, 16, 16, 16, 16, 16],
-            'row_height_mm': 12,
-            'grid_padding_mm': {'top': 18, 'bottom': 18, 'left': 22, 'right': 22},
-            'marker_size_mm': 14,
-            'marker_offset_mm': 12,
-            'marker_positions': [
-                {'id': 'M1', 'placement': 'top_left'},
-                {'id': 'M2', 'placement': 'top_right'},
-                {'id': 'M3', 'placement': 'bottom_left'},
-                {'id': 'M4', 'placement': 'bottom_right'},
-            ],
-        },
-    }
-
-
 class AvaliacaoViewSet(TenantScopedViewSet):
     queryset = Avaliacao.objects.prefetch_related('turmas')
     serializer_class = AvaliacaoSerializer
@@ -87,33 +43,314 @@ class AvaliacaoViewSet(TenantScopedViewSet):
         'partial_update': ['admin'],
         'destroy': ['admin'],
         'gerar_lote_impressao': ['admin'],
+        'emitir_provas': ['admin'],
+        'pacote': ['admin'],
+        'folhas_resposta': ['admin'],
+        'encerrar': ['admin'],
+        'reabrir': ['admin'],
     }
 
+    def finish_bulk_instances(self, instances):
+        # bulk_update skips the post_save copy into the Resposta analytics columns.
+        sincronizar_analiticos(instances)
+
+    @action(detail=True, methods=['post'])
+    def encerrar(self, request, pk=None):
+        avaliacao = self.get_object()
+        snapshot = encerrar_avaliacao(avaliacao)
+        return Response(
+            {
+                'encerrada_em': avaliacao.encerrada_em,
+                'snapshot': {'etag': snapshot.etag, 'gerado_em': snapshot.gerado_em},
+            }
+        )
+
+    @action(detail=True, methods=['post'])
+    def reabrir(self, request, pk=None):
+        avaliacao = self.get_object()
+        reabrir_avaliacao(avaliacao)
+        return Response({'encerrada_em': None})
+
+    @action(detail=True, methods=['post'])
+    def emitir_provas(self, request, pk=None):
+        """Issue provas for every aluno of the avaliação's turmas (or the given subset)."""
+
+        avaliacao = self.get_object()
+        if avaliacao.encerrada:
+            return Response(
+                {'detail': 'Avaliação encerrada não pode receber novas provas.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        try:
+            resultado = emitir_provas(
+                avaliacao,
+                turma_ids=self._ids_informados(request, 'turmas'),
+                caderno_ids=self._ids_informados(request, 'cadernos'),
+                distribuicao=request.data.get('distribuicao') or 'rodizio',
+            )
+        except (TypeError, ValueError) as exc:
+            detalhe = str(exc) if isinstance(exc, EmissaoInvalida) else 'turmas e cadernos devem ser listas de ids.'
+            return Response({'detail': detalhe}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {
+                'criadas': resultado.criadas,
+                'existentes': resultado.existentes,
+                'por_caderno': resultado.por_caderno,
+                'duracao_s': round(resultado.duracao_s, 3),
+            },
+            status=status.HTTP_201_CREATED if resultado.criadas else status.HTTP_200_OK,
+        )
+
     @action(detail=True, methods=['post'])
     def gerar_lote_impressao(self, request, pk=None):
         if getattr(request.user, 'role', None) not in {'admin', 'superadmin'}:
             return Response(status=status.HTTP_403_FORBIDDEN)
+        modo = request.data.get('modo', request.query_params.get('modo')) or 'caderno'
+        if modo not in MODOS_IMPRESSAO:
+            return Response(
+                {'detail': f"Parâmetro modo deve ser um de: {', '.join(MODOS_IMPRESSAO)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        paralelismo = request.data.get('paralelismo', request.query_params.get('paralelismo'))
+        try:
+            paralelismo = int(paralelismo) if paralelismo not in (None, '') else None
+        except (TypeError, ValueError):
+            return Response(
+                {'detail': 'Parâmetro paralelismo deve ser um inteiro.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         avaliacao = self.get_object()
-        saida_dir = Path('media/pdfs') / f'avaliacao_{avaliacao.id}'
-        saida_dir.mkdir(parents=True, exist_ok=True)
-        gerados = []
+        lote = iniciar_lote_impressao(avaliacao, modo=modo, paralelismo=paralelismo)
+        response = Response(LoteImpressaoSerializer(lote).data, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = reverse('loteimpressao-detail', args=[lote.id], request=request)
+        return response
+
+    @action(detail=True, methods=['get'])
+    def pacote(self, request, pk=None):
+        """Download the provas of the avaliação, a turma or an escola as one ZIP or PDF."""
+
+        if getattr(request.user, 'role', None) not in {'admin', 'superadmin'}:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        formato = request.query_params.get('formato') or 'zip'
+        if formato not in {'zip', 'pdf'}:
+            return Response(
+                {'detail': 'Parâmetro formato deve ser zip ou pdf.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        filtros, erro = self._filtros_de_selecao(request)
+        if erro is not None:
+            return erro
+
+        avaliacao = self.get_object()
+        entradas = []
+        for prova, contexto in self._contextos_selecionados(avaliacao, filtros):
+            turma = prova.aluno.turma
+            pasta = f"{slugify(turma.escola.nome) or 'escola'}/{slugify(turma.nome) or 'turma'}"
+            aluno_slug = slugify(prova.aluno.nome) or f'aluno-{prova.aluno_id}'
+            entradas.append((f'{pasta}/prova_{aluno_slug}_{prova.id}.pdf', contexto))
+        if not entradas:
+            return Response(
+                {'detail': 'Nenhuma prova encontrada para os filtros informados.'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        nome_base = self._nome_base(avaliacao, filtros)
+        if formato == 'pdf':
+            caminho, chave = obter_pacote_pdf(contexto for _, contexto in entradas)
+            return _resposta_arquivo(request, caminho, f'{nome_base}.pdf', f'"{chave}"')
+
+        # Each PDF is rendered (or read from the cache) only when the stream reaches it;
+        # the cache is pruned once the archive is complete.
+        response = StreamingHttpResponse(
+            _podar_ao_final(iterar_zip(
+                (nome, lambda contexto=contexto: obter_pdf(contexto, podar=False)[0])
+                for nome, contexto in entradas
+            )),
+            content_type='application/zip',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{nome_base}.zip"'
+        return response
+
+    @action(detail=True, methods=['get'], url_path='folhas-resposta')
+    def folhas_resposta(self, request, pk=None):
+        """Answer sheets of the selection drawn as vector PDF, without a browser."""
+
+        if getattr(request.user, 'role', None) not in {'admin', 'superadmin'}:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        filtros, erro = self._filtros_de_selecao(request)
+        if erro is not None:
+            return erro
+        avaliacao = self.get_object()
+        contextos = [contexto for _, contexto in self._contextos_selecionados(avaliacao, filtros)]
+        if not contextos:
+            return Response(
+                {'detail': 'Nenhuma prova encontrada para os filtros informados.'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        response = HttpResponse(renderizar_folhas_resposta(contextos), content_type='application/pdf')
+        filename = f'{self._nome_base(avaliacao, filtros)}_folhas_resposta.pdf'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @staticmethod
+    def _ids_informados(request, campo: str) -> Optional[list[int]]:
+        # Form bodies repeat the key (turmas=1&turmas=2); JSON bodies must send a list.
+        if hasattr(request.data, 'getlist'):
+            valores = request.data.getlist(campo)
+        else:
+            valores = request.data.get(campo)
+        if not valores:
+            return None
+        if not isinstance(valores, list):
+            raise TypeError(campo)
+        return [int(valor) for valor in valores]
+
+    @staticmethod
+    def _filtros_de_selecao(request) -> tuple[dict[str, int], Optional[Response]]:
+        filtros = {}
+        for parametro, campo in (('escola', 'aluno__turma__escola_id'), ('turma', 'aluno__turma_id')):
+            valor = request.query_params.get(parametro)
+            if valor in (None, ''):
+                continue
+            try:
+                filtros[campo] = int(valor)
+            except ValueError:
+                return {}, Response(
+                    {'detail': f'Parâmetro {parametro} deve ser um inteiro.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        return filtros, None
+
+    @staticmethod
+    def _contextos_selecionados(avaliacao: Avaliacao, filtros: dict[str, int]):
         provas = (
-            ProvaAluno.objects.filter(avaliacao=avaliacao)
+            ProvaAluno.objects.filter(avaliacao=avaliacao, **filtros)
             .select_related('aluno', 'aluno__turma', 'aluno__turma__escola', 'caderno')
-            .prefetch_related('caderno__cadernoquestao_set__questao')
+            .order_by('aluno__turma__escola__nome', 'aluno__turma__nome', 'aluno__nome', 'id')
         )
+        contextos_caderno: dict[Optional[int], dict[str, Any]] = {}
         for prova in provas:
-            contexto = build_prova_pdf_context(prova)
-            aluno_slug = slugify(prova.aluno.nome) or f'aluno-{prova.aluno_id}'
-            pdf_path = saida_dir / f'prova_{aluno_slug}.pdf'
-            render_prova_pdf(contexto, pdf_path)
-            gerados.append(str(pdf_path))
-        return Response({'arquivos': gerados}, status=status.HTTP_201_CREATED)
+            if prova.caderno_id not in contextos_caderno:
+                contextos_caderno[prova.caderno_id] = build_caderno_pdf_context(avaliacao, prova.caderno)
+            yield prova, build_prova_pdf_context(prova, contextos_caderno[prova.caderno_id])
+
+    @staticmethod
+    def _nome_base(avaliacao: Avaliacao, filtros: dict[str, int]) -> str:
+        nome_base = f'avaliacao_{avaliacao.id}'
+        if 'aluno__turma_id' in filtros:
+            nome_base += f"_turma_{filtros['aluno__turma_id']}"
+        elif 'aluno__turma__escola_id' in filtros:
+            nome_base += f"_escola_{filtros['aluno__turma__escola_id']}"
+        return nome_base
+
+
+def _intervalo_solicitado(cabecalho: str, tamanho: int) -> Optional[tuple[int, int]]:
+    """Parse a single ``bytes=`` range; raise ValueError when it cannot be satisfied."""
+
+    unidade, _, especificacao = cabecalho.partition('=')
+    if unidade.strip() != 'bytes' or ',' in especificacao:
+        return None  # multipart ranges are answered with the full file
+    inicio_txt, _, fim_txt = especificacao.strip().partition('-')
+    if not inicio_txt:
+        sufixo = int(fim_txt)
+        if sufixo <= 0:
+            raise ValueError(cabecalho)
+        return max(tamanho - sufixo, 0), tamanho - 1
+    inicio = int(inicio_txt)
+    fim = min(int(fim_txt), tamanho - 1) if fim_txt else tamanho - 1
+    if inicio >= tamanho or fim < inicio:
+        raise ValueError(cabecalho)
+    return inicio, fim
+
+
+def _ler_trecho(caminho: Path, inicio: int, fim: int, tamanho_bloco: int = 64 * 1024):
+    with caminho.open('rb') as arquivo:
+        arquivo.seek(inicio)
+        restante = fim - inicio + 1
+        while restante > 0:
+            bloco = arquivo.read(min(tamanho_bloco, restante))
+            if not bloco:
+                break
+            restante -= len(bloco)
+            yield bloco
+
+
+def _podar_ao_final(blocos: Iterator[bytes]) -> Iterator[bytes]:
+    yield from blocos
+    podar_cache()
+
+
+def _resposta_arquivo(request, caminho: Path, filename: str, etag: str):
+    """Stream ``caminho`` honouring ``Range``/``If-Range`` so large bundles can resume."""
+
+    tamanho = caminho.stat().st_size
+    cabecalho = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    intervalo = None
+    if cabecalho and (not if_range or if_range == etag):
+        try:
+            intervalo = _intervalo_solicitado(cabecalho, tamanho)
+        except ValueError:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{tamanho}'
+            return response
+
+    if intervalo is None:
+        response = FileResponse(
+            caminho.open('rb'), as_attachment=True, filename=filename, content_type='application/pdf'
+        )
+    else:
+        inicio, fim = intervalo
+        response = StreamingHttpResponse(
+            _ler_trecho(caminho, inicio, fim),
+            status=status.HTTP_206_PARTIAL_CONTENT,
+            content_type='application/pdf',
+        )
+        response['Content-Range'] = f'bytes {inicio}-{fim}/{tamanho}'
+        response['Content-Length'] = str(fim - inicio + 1)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    return response
+
+
+class LoteImpressaoViewSet(TenantScopedViewSet):
+    """Progress of background print lots; they are created by ``gerar_lote_impressao``."""
+
+    queryset = LoteImpressao.objects.all()
+    serializer_class = LoteImpressaoSerializer
+    filterset_fields = ['avaliacao_id', 'status']
+    http_method_names = ['get', 'post', 'head', 'options']
+    bulk_write = False
+    role_permissions = {
+        'list': ['admin'],
+        'retrieve': ['admin'],
+        'retomar': ['admin'],
+    }
+
+    def create(self, request, *args, **kwargs):
+        raise exceptions.MethodNotAllowed(request.method)
+
+    @action(detail=True, methods=['post'])
+    def retomar(self, request, pk=None):
+        """Resume a failed or stalled lote from its last saved chunk."""
+
+        lote = self.get_object()
+        if lote.status == LoteImpressao.STATUS_CONCLUIDO:
+            return Response(
+                {'detail': 'Lote de impressão já foi concluído.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        # processar_lote_impressao claims the lote itself and ignores one that is still alive.
+        disparar(processar_lote_impressao, lote.id)
+        lote.refresh_from_db()
+        return Response(LoteImpressaoSerializer(lote).data, status=status.HTTP_202_ACCEPTED)
 
 
 class CadernoViewSet(TenantScopedViewSet):
-    queryset = Caderno.objects.select_related('avaliacao')
+    queryset = Caderno.objects.select_related('avaliacao').prefetch_related('cadernoquestao_set')
     serializer_class = CadernoSerializer
+    conditional_models = (Caderno, CadernoQuestao)
     filterset_fields = ['avaliacao_id']
     role_permissions = {
         'list': ['admin', 'professor'],
@@ -171,9 +408,18 @@ class ProvaAlunoViewSet(TenantScopedViewSet):
         'partial_update': ['admin'],
         'destroy': ['admin'],
         'download': ['admin', 'professor'],
+        'folha_resposta': ['admin', 'professor'],
         'gabarito': ['admin', 'professor'],
+        'qr': ['admin', 'professor'],
     }
 
+    def finish_bulk_instances(self, instances):
+        # The signed QR token needs the prova id, known only after the insert.
+        serializer = self.get_serializer()
+        for prova in instances:
+            prova.qr_payload = serializer._build_payload(instance=prova, validated_data={})
+        ProvaAluno.objects.bulk_update(instances, ['qr_payload'], batch_size=self.bulk_batch_size)
+
     def _has_professor_permission(self, request, prova: ProvaAluno, *, for_qr: bool) -> bool:
         role = getattr(request.user, 'role', None)
         if role in {'admin', 'superadmin'}:
@@ -196,20 +442,49 @@ class ProvaAlunoViewSet(TenantScopedViewSet):
         if not self._has_professor_permission(request, prova, for_qr=False):
             return Response(status=status.HTTP_403_FORBIDDEN)
 
-        contexto = build_prova_pdf_context(prova)
-        with NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-            temp_path = Path(temp_file.name)
+        pdf_path, chave = obter_pdf(build_prova_pdf_context(prova))
+        etag = f'"{chave}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            return HttpResponseNotModified(headers={'ETag': etag})
+
+        aluno_slug = slugify(prova.aluno.nome) or f'aluno-{prova.aluno_id}'
+        response = FileResponse(
+            pdf_path.open('rb'),
+            as_attachment=True,
+            filename=f'prova_{aluno_slug}.pdf',
+            content_type='application/pdf',
+        )
+        response['ETag'] = etag
+        return response
+
+    @action(detail=False, methods=['get'], url_path=r'qr/(?P<token>[A-Za-z0-9]+)')
+    def qr(self, request, token=None):
+        """Resolve a scanned QR token to its prova after checking the signature."""
 
-        pdf_path = Path(render_prova_pdf(contexto, temp_path))
         try:
-            content = pdf_path.read_bytes()
-        finally:
-            pdf_path.unlink(missing_ok=True)
+            dados = ler_token(token)
+        except TokenQRInvalido as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        prova = get_object_or_404(self.get_queryset(), pk=dados.prova_id)
+        if dados.caderno_id != prova.caderno_id:
+            return Response(
+                {'detail': 'QR Code não corresponde ao caderno atual da prova.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if not self._has_professor_permission(request, prova, for_qr=True):
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        return Response(self.get_serializer(prova).data)
 
+    @action(detail=True, methods=['get'], url_path='folha-resposta')
+    def folha_resposta(self, request, pk=None):
+        prova = self.get_object()
+        if not self._has_professor_permission(request, prova, for_qr=False):
+            return Response(status=status.HTTP_403_FORBIDDEN)
+
+        contexto = build_prova_pdf_context(prova)
         aluno_slug = slugify(prova.aluno.nome) or f'aluno-{prova.aluno_id}'
-        filename = f'prova_{aluno_slug}.pdf'
-        response = HttpResponse(content, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response = HttpResponse(renderizar_folhas_resposta([contexto]), content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="folha_resposta_{aluno_slug}.pdf"'
         return response
 
     @action(detail=True, methods=['get'], url_path='gabarito')
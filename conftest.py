@@ -1,6 +1,9 @@
 import os
+from types import SimpleNamespace
 
 import pytest
+from model_bakery import baker
+from rest_framework.test import APIClient
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings_test')
 os.environ.setdefault('USE_SQLITE_FOR_TESTS', 'True')
@@ -12,3 +15,76 @@ def _override_media_root(tmp_path, settings):
     media_root.mkdir(parents=True, exist_ok=True)
     settings.MEDIA_ROOT = media_root
     yield
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def admin(db):
+    return baker.make('core.User', secretaria=baker.make('core.Secretaria'), role='admin')
+
+
+@pytest.fixture
+def cliente_api():
+    """Factory for an APIClient authenticated as the given user."""
+
+    def autenticar(user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    return autenticar
+
+
+@pytest.fixture
+def montar_avaliacao(db):
+    """Factory for an avaliação with one caderno question per habilidade.
+
+    Each ``(turma, corretas)`` pair in ``provas`` adds an aluno of that turma with a
+    prova answering the questions in order, ``correta`` taken from ``corretas``.
+    Returns a namespace with ``avaliacao``, ``caderno``, ``cqs`` and ``provas``.
+    """
+
+    def montar(secretaria, habilidades=(None,), provas=(), data_aplicacao='2024-06-01', competencia=None):
+        avaliacao = baker.make('avaliacoes.Avaliacao', secretaria=secretaria, data_aplicacao=data_aplicacao)
+        caderno = baker.make('avaliacoes.Caderno', secretaria=secretaria, avaliacao=avaliacao)
+        cqs = [
+            baker.make(
+                'avaliacoes.CadernoQuestao',
+                caderno=caderno,
+                questao=baker.make(
+                    'itens.Questao', secretaria=secretaria, habilidade=habilidade, competencia=competencia
+                ),
+                ordem=ordem,
+            )
+            for ordem, habilidade in enumerate(habilidades, start=1)
+        ]
+        montadas = []
+        for turma, corretas in provas:
+            prova = baker.make(
+                'avaliacoes.ProvaAluno',
+                secretaria=secretaria,
+                avaliacao=avaliacao,
+                aluno=baker.make('escolas.Aluno', secretaria=secretaria, turma=turma),
+                caderno=caderno,
+            )
+            for cq, correta in zip(cqs, corretas):
+                baker.make(
+                    'respostas.Resposta',
+                    secretaria=secretaria,
+                    prova_aluno=prova,
+                    caderno_questao=cq,
+                    alternativa='A',
+                    correta=correta,
+                )
+            montadas.append(prova)
+        return SimpleNamespace(avaliacao=avaliacao, caderno=caderno, cqs=cqs, provas=montadas)
+
+    return montar
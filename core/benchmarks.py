@@ -0,0 +1,227 @@
+"""Seed data and hot-query catalogue used by the query-plan regression harness."""
+
+from __future__ import annotations
+
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from typing import Any, Callable
+
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
+
+from avaliacoes.models import Avaliacao, Caderno, CadernoQuestao, ProvaAluno
+from escolas.models import Aluno, Turma
+from itens.models import Habilidade, Questao
+from respostas.models import Resposta
+
+from .models import Secretaria
+from .sinteticos import GeradorSintetico, ParametrosSinteticos
+
+
+@dataclass
+class VolumeSemeado:
+    secretaria_id: int
+    escola_id: int
+    turma_id: int
+    turma_ano: str
+    aluno_id: int
+    avaliacao_id: int
+    caderno_id: int
+    contagens: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ConsultaQuente:
+    nome: str
+    montar: Callable[[VolumeSemeado], QuerySet]
+    indice: str
+    # SQLite secondary indexes end with the rowid, so the plain secretaria FK index
+    # already yields id order there; only PostgreSQL needs the (secretaria, id) index.
+    somente_postgres: bool = False
+
+    def atendida_por(self, plano: str) -> bool:
+        if self.somente_postgres and connection.vendor != 'postgresql':
+            return 'USING INDEX' in plano and 'TEMP B-TREE' not in plano
+        return self.indice in plano
+
+
+@dataclass
+class ResultadoConsulta:
+    nome: str
+    indice: str
+    usa_indice: bool
+    consultas: int
+    tempo_ms: float
+    plano: str
+
+
+@transaction.atomic
+def semear_volume(escolas: int = 5, turmas_por_escola: int = 4, alunos_por_turma: int = 25,
+                  questoes: int = 20) -> VolumeSemeado:
+    """Create one secretaria with a realistic shape using bulk inserts.
+
+    The escolas, turmas and alunos come from the synthetic data generator; the
+    answers stay simple and deterministic so the plans do not depend on a seed.
+    """
+
+    secretaria = Secretaria.objects.create(nome='Rede benchmark')
+    habilidade = Habilidade.objects.create(secretaria=secretaria, codigo='HB-BENCH', descricao='-')
+    rede = GeradorSintetico(
+        ParametrosSinteticos(
+            escolas=escolas, turmas_por_escola=turmas_por_escola, alunos_por_turma=alunos_por_turma,
+            tamanho_lote=1000,
+        )
+    )
+    escolas_obj, turmas_obj, alunos_obj = rede.semear_rede(secretaria, 1)
+    questoes_obj = Questao.objects.bulk_create(
+        [
+            Questao(
+                secretaria=secretaria,
+                enunciado=f'Questão {idx}',
+                alternativa_a='A', alternativa_b='B', alternativa_c='C',
+                alternativa_d='D', alternativa_e='E',
+                correta='A',
+                habilidade=habilidade,
+            )
+            for idx in range(questoes)
+        ]
+    )
+    avaliacao = Avaliacao.objects.create(
+        secretaria=secretaria, titulo='Avaliação benchmark', data_aplicacao=date(2024, 6, 1)
+    )
+    caderno = Caderno.objects.create(secretaria=secretaria, avaliacao=avaliacao, codigo='A')
+    cqs = CadernoQuestao.objects.bulk_create(
+        [
+            CadernoQuestao(caderno=caderno, questao=questao, ordem=ordem)
+            for ordem, questao in enumerate(questoes_obj, start=1)
+        ]
+    )
+    provas = ProvaAluno.objects.bulk_create(
+        [
+            ProvaAluno(secretaria=secretaria, avaliacao=avaliacao, aluno=aluno, caderno=caderno)
+            for aluno in alunos_obj
+        ],
+        batch_size=1000,
+    )
+    turma_por_aluno = {aluno.id: aluno.turma for aluno in alunos_obj}
+    respostas = []
+    for prova in provas:
+        turma = turma_por_aluno[prova.aluno_id]
+        for idx, cq in enumerate(cqs):
+            respostas.append(
+                Resposta(
+                    secretaria=secretaria,
+                    prova_aluno=prova,
+                    caderno_questao=cq,
+                    alternativa='ABCDE'[(prova.id + idx) % 5],
+                    correta=(prova.id + idx) % 5 == 0,
+                    avaliacao=avaliacao,
+                    turma=turma,
+                    escola_id=turma.escola_id,
+                    habilidade=habilidade,
+                    data_aplicacao=avaliacao.data_aplicacao,
+                )
+            )
+    Resposta.objects.bulk_create(respostas, batch_size=2000)
+
+    return VolumeSemeado(
+        secretaria_id=secretaria.id,
+        escola_id=escolas_obj[0].id,
+        turma_id=turmas_obj[0].id,
+        turma_ano=turmas_obj[0].ano,
+        aluno_id=alunos_obj[0].id,
+        avaliacao_id=avaliacao.id,
+        caderno_id=caderno.id,
+        contagens={
+            'escolas': len(escolas_obj),
+            'turmas': len(turmas_obj),
+            'alunos': len(alunos_obj),
+            'provas': len(provas),
+            'respostas': len(respostas),
+        },
+    )
+
+
+CONSULTAS_QUENTES: list[ConsultaQuente] = [
+    ConsultaQuente(
+        'respostas_corretas_da_secretaria',
+        lambda v: Resposta.objects.filter(secretaria_id=v.secretaria_id, correta=True),
+        'resp_sec_correta_idx',
+    ),
+    ConsultaQuente(
+        'respostas_da_turma_na_avaliacao',
+        lambda v: Resposta.objects.filter(turma_id=v.turma_id, avaliacao_id=v.avaliacao_id),
+        'resp_turma_avaliacao_idx',
+    ),
+    ConsultaQuente(
+        'questoes_do_caderno_em_ordem',
+        lambda v: CadernoQuestao.objects.filter(caderno_id=v.caderno_id).order_by('ordem'),
+        'cq_caderno_ordem_idx',
+    ),
+    ConsultaQuente(
+        'prova_do_aluno_na_avaliacao',
+        lambda v: ProvaAluno.objects.filter(avaliacao_id=v.avaliacao_id, aluno_id=v.aluno_id),
+        'prova_avaliacao_aluno_idx',
+    ),
+    ConsultaQuente(
+        'turmas_por_escola_e_ano',
+        lambda v: Turma.objects.filter(escola_id=v.escola_id, ano=v.turma_ano),
+        'turma_escola_ano_idx',
+    ),
+    ConsultaQuente(
+        'alunos_da_secretaria_paginados',
+        lambda v: Aluno.objects.filter(secretaria_id=v.secretaria_id).order_by('pk')[:20],
+        'aluno_sec_id_idx',
+        somente_postgres=True,
+    ),
+    ConsultaQuente(
+        'provas_da_secretaria_paginadas',
+        lambda v: ProvaAluno.objects.filter(secretaria_id=v.secretaria_id).order_by('pk')[:20],
+        'prova_sec_id_idx',
+        somente_postgres=True,
+    ),
+    ConsultaQuente(
+        'questoes_pendentes_da_secretaria',
+        lambda v: Questao.objects.filter(secretaria_id=v.secretaria_id, status=Questao.STATUS_PENDENTE),
+        'questao_sec_status_idx',
+    ),
+]
+
+
+def explicar(queryset: QuerySet) -> str:
+    """Return the query plan; on PostgreSQL seq scans are disabled to expose index choice."""
+
+    if connection.vendor == 'postgresql':
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+    return queryset.explain()
+
+
+def executar_consulta(consulta: ConsultaQuente, volume: VolumeSemeado, repeticoes: int = 5) -> ResultadoConsulta:
+    queryset = consulta.montar(volume)
+    plano = explicar(queryset)
+
+    with CaptureQueriesContext(connection) as capturadas:
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            list(consulta.montar(volume))
+        decorrido = time.perf_counter() - inicio
+
+    return ResultadoConsulta(
+        nome=consulta.nome,
+        indice=consulta.indice,
+        usa_indice=consulta.atendida_por(plano),
+        consultas=len(capturadas) // max(repeticoes, 1),
+        tempo_ms=round(decorrido * 1000 / max(repeticoes, 1), 3),
+        plano=plano,
+    )
+
+
+def executar_consultas_quentes(volume: VolumeSemeado, repeticoes: int = 5) -> list[dict[str, Any]]:
+    return [
+        asdict(executar_consulta(consulta, volume, repeticoes=repeticoes))
+        for consulta in CONSULTAS_QUENTES
+    ]
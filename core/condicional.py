@@ -0,0 +1,85 @@
+"""Conditional GET (``ETag``/``Last-Modified``) derived from the version stamps.
+
+The validators are computed from :mod:`core.versioning` stamps alone, so a request
+whose ``If-None-Match``/``If-Modified-Since`` still matches is answered with 304
+before the main queryset is built or serialized.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Iterable, Optional
+
+from django.http import HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .signals import MODELOS_VERSIONADOS
+from .versioning import ModelRef, _label, obter_versoes
+
+_VERSIONADOS = {label.lower() for label in MODELOS_VERSIONADOS}
+
+
+def versionado(model: ModelRef) -> bool:
+    return _label(model) in _VERSIONADOS
+
+
+def validadores(modelos: Iterable[ModelRef], secretaria_id: Optional[int], *partes: Any) -> tuple[str, int]:
+    """Return ``(etag, last_modified)`` for data built from ``modelos``.
+
+    ``partes`` identifies the representation (path, query string, role...); the
+    last-modified time is the newest stamp, in whole seconds.
+    """
+
+    modelos = tuple(modelos)
+    versoes = obter_versoes(modelos, secretaria_id)
+    base = '|'.join([*(_label(model) for model in modelos), *map(str, versoes), str(secretaria_id), *map(str, partes)])
+    return quote_etag(hashlib.sha256(base.encode('utf-8')).hexdigest()[:32]), max(versoes) // 1_000_000_000
+
+
+class ConditionalGetMixin:
+    """Answer GETs with 304 from the stamps of ``conditional_models``.
+
+    Views call :meth:`conditional_response` once tenant and role checks passed; the
+    validators are then also set on the full response.
+    """
+
+    conditional_models: Optional[tuple[ModelRef, ...]] = None
+
+    def default_conditional_models(self) -> tuple[ModelRef, ...]:
+        return ()
+
+    def get_conditional_models(self) -> tuple[ModelRef, ...]:
+        modelos = self.conditional_models
+        if modelos is None:
+            modelos = self.default_conditional_models()
+        modelos = tuple(modelos)
+        if all(versionado(model) for model in modelos):
+            return modelos
+        # A model without stamps could change unnoticed: never answer 304 for it.
+        return ()
+
+    def conditional_response(self, request, secretaria_id: Optional[int]) -> Optional[HttpResponseBase]:
+        self._validadores = None
+        modelos = self.get_conditional_models()
+        if not modelos or request.method not in ('GET', 'HEAD'):
+            return None
+        renderer = getattr(getattr(request, 'accepted_renderer', None), 'format', '')
+        self._validadores = validadores(
+            modelos, secretaria_id, request.get_full_path(), getattr(request.user, 'role', ''), renderer
+        )
+        etag, ultima_alteracao = self._validadores
+        return get_conditional_response(request, etag=etag, last_modified=ultima_alteracao)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validadores_atuais = getattr(self, '_validadores', None)
+        if validadores_atuais and response.status_code in (200, 304):
+            etag, ultima_alteracao = validadores_atuais
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(ultima_alteracao)
+            # Stored by the browser but revalidated on every use.
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ['Authorization'])
+        return response
+
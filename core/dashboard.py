@@ -0,0 +1,93 @@
+"""Tenant dashboard figures computed in one query and cached per data version.
+
+The catalogue counts are keyed by the version stamps of their models. The answer
+figures move with every graded prova, so they are cached apart with a short TTL
+instead; otherwise each Resposta write would drop the whole summary.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from django.core.cache import cache
+from django.db import connection
+
+from avaliacoes.models import Avaliacao, ProvaAluno
+from escolas.models import Aluno, Escola, Turma
+from itens.models import Questao
+from respostas.models import Resposta
+
+from .versioning import obter_versoes
+
+# (chave, modelo, expressão agregada, condição extra)
+INDICADORES_CADASTRO = (
+    ('escolas', Escola, 'COUNT(*)', None),
+    ('turmas', Turma, 'COUNT(*)', None),
+    ('alunos', Aluno, 'COUNT(*)', None),
+    ('questoes', Questao, 'COUNT(*)', None),
+    ('avaliacoes', Avaliacao, 'COUNT(*)', None),
+    ('provas_emitidas', ProvaAluno, 'COUNT(*)', None),
+)
+INDICADORES_RESPOSTAS = (
+    ('provas_corrigidas', Resposta, 'COUNT(DISTINCT prova_aluno_id)', 'correta IS NOT NULL'),
+    ('media_acertos', Resposta, 'AVG(CASE WHEN correta THEN 100.0 ELSE 0 END)', 'correta IS NOT NULL'),
+)
+INDICADORES = INDICADORES_CADASTRO + INDICADORES_RESPOSTAS
+MODELOS_DO_RESUMO = (Escola, Turma, Aluno, Questao, Avaliacao, ProvaAluno)
+RESUMO_CACHE_TIMEOUT = 60 * 60 * 24
+RESPOSTAS_CACHE_TIMEOUT = 60
+
+
+def _consultar_indicadores(secretaria_id: Optional[int], indicadores=INDICADORES) -> dict[str, Any]:
+    quote = connection.ops.quote_name
+    colunas = []
+    params: list[Any] = []
+    for chave, model, expressao, condicao in indicadores:
+        condicoes = [condicao] if condicao else []
+        if secretaria_id is not None:
+            condicoes.append('secretaria_id = %s')
+            params.append(secretaria_id)
+        where = f" WHERE {' AND '.join(condicoes)}" if condicoes else ''
+        colunas.append(f'(SELECT {expressao} FROM {quote(model._meta.db_table)}{where}) AS {quote(chave)}')
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(colunas)}", params)
+        linha = cursor.fetchone()
+
+    resumo = dict(zip([chave for chave, *_ in indicadores], linha))
+    if resumo.get('media_acertos') is not None:
+        resumo['media_acertos'] = round(float(resumo['media_acertos']), 2)
+    return resumo
+
+
+def resumo_dashboard(secretaria_id: Optional[int]) -> dict[str, Any]:
+    """Return the dashboard figures for a secretaria (``None`` means every tenant).
+
+    The catalogue key embeds the version stamps of its models, so a write that
+    bumps one recomputes those counts; the answer figures expire on their own.
+    Whatever is missing is recomputed together in a single query.
+    """
+
+    versoes = obter_versoes(MODELOS_DO_RESUMO, secretaria_id)
+    escopo = '*' if secretaria_id is None else secretaria_id
+    partes = {
+        f"dashboard:{escopo}:{'-'.join(str(versao) for versao in versoes)}": (
+            INDICADORES_CADASTRO,
+            RESUMO_CACHE_TIMEOUT,
+        ),
+        f'dashboard:{escopo}:respostas': (INDICADORES_RESPOSTAS, RESPOSTAS_CACHE_TIMEOUT),
+    }
+    em_cache = cache.get_many(partes)
+    faltando = [chave for chave in partes if chave not in em_cache]
+    if faltando:
+        calculado = _consultar_indicadores(
+            secretaria_id, tuple(indicador for chave in faltando for indicador in partes[chave][0])
+        )
+        for chave in faltando:
+            indicadores, timeout = partes[chave]
+            em_cache[chave] = {nome: calculado[nome] for nome, *_ in indicadores}
+            cache.set(chave, em_cache[chave], timeout)
+    resumo: dict[str, Any] = {}
+    for chave in partes:
+        resumo.update(em_cache[chave])
+    return resumo
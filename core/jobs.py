@@ -0,0 +1,49 @@
+"""Minimal background job runner.
+
+Jobs are plain callables whose state lives in the database (each feature keeps its
+own job model), so a crashed worker loses nothing but the current chunk and the
+job can be resumed from its stored cursor. Work runs on a daemon thread with its
+own database connection; with ``JOBS_SINCRONOS`` (the test settings) it runs
+inline instead.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Callable
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+
+def _executar(funcao: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+    try:
+        funcao(*args, **kwargs)
+    except Exception:  # the job records its own failure state
+        logger.exception('Falha no job em segundo plano %s', getattr(funcao, '__name__', funcao))
+
+
+def _executar_em_thread(funcao: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+    close_old_connections()
+    try:
+        _executar(funcao, args, kwargs)
+    finally:
+        connection.close()
+
+
+def disparar(funcao: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+    """Run ``funcao`` in the background, or inline when ``JOBS_SINCRONOS`` is set."""
+
+    if getattr(settings, 'JOBS_SINCRONOS', False):
+        _executar(funcao, args, kwargs)
+        return
+    worker = threading.Thread(
+        target=_executar_em_thread,
+        args=(funcao, args, kwargs),
+        name=f'job-{getattr(funcao, "__name__", "anonimo")}',
+        daemon=True,
+    )
+    worker.start()
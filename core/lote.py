@@ -0,0 +1,359 @@
+"""Bulk create/update/delete for :class:`core.tenancy.TenantScopedViewSet`.
+
+A list payload sent to ``<recurso>/lote/`` is checked against the tenant and the
+role permissions once, validated item by item with the relations of the whole
+payload resolved in one query per field and uniqueness checked in one query per
+constraint, then written with ``bulk_create``/``bulk_update`` in one transaction.
+Those writes skip model signals, so the version stamps are bumped here.
+"""
+
+from __future__ import annotations
+
+from functools import reduce
+from operator import or_
+from typing import Any, Iterable, Optional
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models, transaction
+from django.db.models import Q
+from rest_framework import exceptions, status
+from rest_framework.decorators import action
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
+
+from .signals import resolver_secretaria_id
+from .versioning import marcar_alteracao
+
+# Role-permission key checked for each bulk method when ``lote`` has no entry.
+ACOES_EQUIVALENTES = {'POST': 'create', 'PUT': 'update', 'PATCH': 'partial_update', 'DELETE': 'destroy'}
+# Keys per query when checking uniqueness; keeps the OR chains within SQLite limits.
+_CHAVES_POR_CONSULTA = 200
+
+
+def filtro_de_tenant(model: type[models.Model], campo: str, secretaria_id: int) -> Optional[Q]:
+    """Rows of ``model`` visible to the secretaria, following one FK when needed.
+
+    Mirrors :func:`core.signals.resolver_secretaria_id`; rows with a nullable, empty
+    tenant are shared and stay visible. ``None`` means the model is not scoped.
+    """
+
+    try:
+        field = model._meta.get_field(campo)
+    except FieldDoesNotExist:
+        for fk in model._meta.concrete_fields:
+            if isinstance(fk, models.ForeignKey) and _tem_campo(fk.related_model, campo):
+                return Q(**{f'{fk.name}__{campo}_id': secretaria_id})
+        return None
+    filtro = Q(**{f'{campo}_id': secretaria_id})
+    if field.null:
+        filtro |= Q(**{f'{campo}__isnull': True})
+    return filtro
+
+
+def _tem_campo(model: type[models.Model], campo: str) -> bool:
+    try:
+        model._meta.get_field(campo)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def _chave(valor: Any) -> Any:
+    return valor.pk if isinstance(valor, models.Model) else valor
+
+
+def resolver_relacoes_em_lote(serializer, itens: list[dict], escopo: Optional[tuple[str, int]]) -> None:
+    """Resolve every primary-key relation of ``itens`` with one query per field.
+
+    The fields of ``serializer`` then look ids up in memory; with ``escopo``
+    (tenant field, secretaria id) rows of other secretarias are reported as missing.
+    """
+
+    for nome, field in serializer.fields.items():
+        if field.read_only:
+            continue
+        muitos = isinstance(field, ManyRelatedField)
+        relacao = field.child_relation if muitos else field
+        if not isinstance(relacao, PrimaryKeyRelatedField):
+            continue
+        queryset = relacao.get_queryset()
+        if escopo is not None:
+            filtro = filtro_de_tenant(queryset.model, *escopo)
+            if filtro is not None:
+                queryset = queryset.filter(filtro)
+        pk = queryset.model._meta.pk
+        brutos = []
+        for item in itens:
+            valor = item.get(nome) if isinstance(item, dict) else None
+            brutos.extend(valor if muitos and isinstance(valor, list) else [valor])
+        ids = set()
+        for valor in brutos:
+            if valor is None or isinstance(valor, (bool, dict, list)):
+                continue
+            try:
+                ids.add(pk.to_python(valor))
+            except DjangoValidationError:
+                continue
+        relacao.to_internal_value = _busca_em_memoria(relacao, pk, queryset.in_bulk(ids) if ids else {})
+
+
+def _busca_em_memoria(relacao: PrimaryKeyRelatedField, pk: models.Field, encontrados: dict):
+    original = relacao.to_internal_value
+
+    def to_internal_value(data):
+        if isinstance(data, bool):
+            return original(data)
+        try:
+            chave = pk.to_python(data)
+        except DjangoValidationError:
+            return original(data)
+        if chave not in encontrados:
+            relacao.fail('does_not_exist', pk_value=data)
+        return encontrados[chave]
+
+    return to_internal_value
+
+
+def extrair_restricoes_unicas(serializer) -> list[tuple[str, tuple[str, ...], Any, str]]:
+    """Detach the unique validators of ``serializer`` so they can run once per lote.
+
+    Returns ``(error key, model fields, queryset, message)``; conditional
+    constraints are left on the serializer.
+    """
+
+    restricoes = []
+    for validador in list(serializer.validators):
+        if isinstance(validador, UniqueTogetherValidator) and validador.condition is None:
+            fontes = tuple(serializer.fields[nome].source for nome in validador.fields)
+            mensagem = validador.message.format(field_names=', '.join(validador.fields))
+            restricoes.append((api_settings.NON_FIELD_ERRORS_KEY, fontes, validador.queryset, mensagem))
+            serializer.validators.remove(validador)
+    for nome, field in serializer.fields.items():
+        for validador in list(field.validators):
+            if isinstance(validador, UniqueValidator) and validador.lookup == 'exact':
+                restricoes.append((nome, (field.source,), validador.queryset, str(validador.message)))
+                field.validators.remove(validador)
+    return restricoes
+
+
+def validar_unicidade(restricoes, validados: list[tuple[Optional[models.Model], dict]], erros: dict) -> None:
+    """Report keys repeated inside the lote or already taken by other rows."""
+
+    for chave_erro, fontes, queryset, mensagem in restricoes:
+        pedidos: dict[tuple, int] = {}
+        for indice, (instancia, attrs) in enumerate(validados):
+            if indice in erros:
+                continue
+            if instancia is not None and not any(
+                fonte in attrs and _chave(attrs[fonte]) != _chave(getattr(instancia, fonte, None)) for fonte in fontes
+            ):
+                continue
+            valores = tuple(
+                _chave(attrs[fonte] if fonte in attrs else getattr(instancia, fonte, None)) for fonte in fontes
+            )
+            if None in valores:
+                continue
+            if valores in pedidos:
+                erros[indice] = {chave_erro: [mensagem]}
+            else:
+                pedidos[valores] = indice
+
+        chaves = list(pedidos)
+        for inicio in range(0, len(chaves), _CHAVES_POR_CONSULTA):
+            bloco = chaves[inicio:inicio + _CHAVES_POR_CONSULTA]
+            if len(fontes) == 1:
+                filtro = Q(**{f'{fontes[0]}__in': [valores[0] for valores in bloco]})
+            else:
+                filtro = reduce(or_, (Q(**dict(zip(fontes, valores))) for valores in bloco))
+            for pk, *valores in queryset.filter(filtro).values_list('pk', *fontes):
+                indice = pedidos.get(tuple(valores))
+                if indice is None:
+                    continue
+                instancia = validados[indice][0]
+                if instancia is None or instancia.pk != pk:
+                    erros[indice] = {chave_erro: [mensagem]}
+
+
+class BulkWriteMixin:
+    """``POST``/``PUT``/``PATCH``/``DELETE`` of lists on ``<recurso>/lote/``.
+
+    Role permissions come from the ``lote`` key or, without one, from the
+    equivalent single-object action (``create``, ``update``...). Viewsets whose
+    writes need more than the serializer fields set ``bulk_write = False`` or use
+    the ``prepare_bulk_instances``/``finish_bulk_instances``/``finish_bulk_delete``
+    hooks.
+    """
+
+    bulk_write: bool = True
+    bulk_max_items: int = 1000
+    bulk_batch_size: int = 500
+    # Fields filled by ``prepare_bulk_instances`` that bulk updates must write too.
+    bulk_extra_update_fields: tuple[str, ...] = ()
+
+    @action(detail=False, methods=['post', 'put', 'patch', 'delete'], url_path='lote')
+    def lote(self, request, *args, **kwargs):
+        if not self.bulk_write:
+            raise exceptions.MethodNotAllowed(request.method)
+        itens = request.data
+        if not isinstance(itens, list) or not itens:
+            raise exceptions.ValidationError({'detail': 'Envie uma lista não vazia de registros.'})
+        if len(itens) > self.bulk_max_items:
+            raise exceptions.ValidationError(
+                {'detail': f'Envie no máximo {self.bulk_max_items} registros por lote.'}
+            )
+        if request.method == 'DELETE':
+            return self._excluir_em_lote(itens)
+        if request.method == 'POST':
+            return self._gravar_em_lote(itens, [None] * len(itens))
+        return self._gravar_em_lote(itens, self._instancias_do_lote(itens))
+
+    def prepare_bulk_instances(self, instances: list[models.Model]) -> None:
+        """Called with the unsaved instances right before they are written."""
+
+    def finish_bulk_instances(self, instances: list[models.Model]) -> None:
+        """Called inside the transaction once the instances are written."""
+
+    def finish_bulk_delete(self, instances: list[models.Model]) -> None:
+        """Called inside the transaction once the instances are deleted."""
+
+    # Helpers -----------------------------------------------------------------
+
+    def _escopo_do_lote(self) -> Optional[tuple[str, int]]:
+        user = self.request.user
+        if getattr(user, 'role', '') == 'superadmin':
+            return None
+        return self.tenant_field, getattr(user, 'secretaria_id', None)
+
+    def _ids_do_lote(self, itens: list) -> list[int]:
+        pk = self.get_queryset().model._meta.pk
+        ids, erros = [], {}
+        for indice, item in enumerate(itens):
+            valor = item.get('id') if isinstance(item, dict) else item
+            try:
+                if valor is None or isinstance(valor, bool):
+                    raise DjangoValidationError('')
+                ids.append(pk.to_python(valor))
+            except DjangoValidationError:
+                erros[indice] = {'id': ['Informe o id do registro.']}
+        if not erros and len(set(ids)) != len(ids):
+            raise exceptions.ValidationError({'detail': 'Cada registro só pode aparecer uma vez no lote.'})
+        if erros:
+            raise exceptions.ValidationError(erros)
+        return ids
+
+    def _instancias_do_lote(self, itens: list) -> list[models.Model]:
+        ids = self._ids_do_lote(itens)
+        encontradas = self.get_queryset().in_bulk(ids)
+        faltando = [str(pk) for pk in ids if pk not in encontradas]
+        if faltando:
+            raise exceptions.NotFound(f"Registros não encontrados: {', '.join(faltando)}.")
+        return [encontradas[pk] for pk in ids]
+
+    def _gravar_em_lote(self, itens: list, instancias: list[Optional[models.Model]]) -> Response:
+        model = self.get_queryset().model
+        criacao = instancias[0] is None
+        serializer = self.get_serializer(partial=self.request.method == 'PATCH')
+        resolver_relacoes_em_lote(serializer, itens, self._escopo_do_lote())
+        restricoes = extrair_restricoes_unicas(serializer)
+        com_tenant = _tem_campo(model, self.tenant_field)
+        tenants: dict[Any, Any] = {}
+
+        validados, erros = [], {}
+        for indice, (item, instancia) in enumerate(zip(itens, instancias)):
+            serializer.instance, serializer.initial_data = instancia, item
+            try:
+                attrs = serializer.run_validation(item)
+                if com_tenant:
+                    tenant = self._tenant_do_item(item, instancia, tenants)
+                    if tenant is not None or not self._tenant_allows_null():
+                        attrs[self.tenant_field] = tenant
+            except exceptions.ValidationError as exc:
+                erros[indice] = exc.detail
+                attrs = {}
+            validados.append((instancia, attrs))
+        validar_unicidade(restricoes, validados, erros)
+        if erros:
+            raise exceptions.ValidationError(dict(sorted(erros.items())))
+
+        muitos = {field.name: field for field in model._meta.many_to_many}
+        objetos, relacoes, campos = [], [], set()
+        for instancia, attrs in validados:
+            relacoes.append({nome: attrs.pop(nome) for nome in list(attrs) if nome in muitos})
+            if instancia is None:
+                objetos.append(model(**attrs))
+                continue
+            for nome, valor in attrs.items():
+                setattr(instancia, nome, valor)
+            campos.update(attrs)
+            objetos.append(instancia)
+
+        with transaction.atomic():
+            self.prepare_bulk_instances(objetos)
+            if criacao:
+                model._default_manager.bulk_create(objetos, batch_size=self.bulk_batch_size)
+            elif campos:
+                campos.update(self.bulk_extra_update_fields)
+                model._default_manager.bulk_update(objetos, sorted(campos), batch_size=self.bulk_batch_size)
+            for nome, field in muitos.items():
+                self._gravar_relacoes(field, objetos, relacoes, nome, criacao)
+            self.finish_bulk_instances(objetos)
+            self._marcar_lote(model, objetos)
+
+        gravados = self.get_queryset().in_bulk([obj.pk for obj in objetos])
+        dados = self.get_serializer([gravados[obj.pk] for obj in objetos], many=True).data
+        return Response(dados, status=status.HTTP_201_CREATED if criacao else status.HTTP_200_OK)
+
+    def _tenant_do_item(self, item: dict, instancia: Optional[models.Model], tenants: dict):
+        if getattr(self.request.user, 'role', '') != 'superadmin':
+            if None not in tenants:
+                tenants[None] = self._resolve_tenant()
+            return tenants[None]
+        campo = self.tenant_field
+        bruto = item.get(f'{campo}_id') or item.get(campo)
+        if bruto in (None, '', 'null'):
+            tenant = getattr(instancia, campo, None) if instancia is not None else None
+        else:
+            if bruto not in tenants:
+                tenants[bruto] = self._resolve_tenant(data=item)
+            tenant = tenants[bruto]
+        if tenant is None and not self._tenant_allows_null():
+            raise exceptions.ValidationError({campo: 'Informe a secretaria do registro.'})
+        return tenant
+
+    def _gravar_relacoes(self, field, objetos, relacoes, nome: str, criacao: bool) -> None:
+        alterados = [(obj, rel[nome]) for obj, rel in zip(objetos, relacoes) if nome in rel]
+        if not alterados:
+            return
+        through = field.remote_field.through
+        origem, destino = field.m2m_field_name(), field.m2m_reverse_field_name()
+        if not criacao:
+            through.objects.filter(**{f'{origem}_id__in': [obj.pk for obj, _ in alterados]}).delete()
+        through.objects.bulk_create(
+            [
+                through(**{f'{origem}_id': obj.pk, f'{destino}_id': _chave(alvo)})
+                for obj, alvos in alterados
+                for alvo in alvos
+            ],
+            batch_size=self.bulk_batch_size,
+        )
+
+    def _excluir_em_lote(self, itens: list) -> Response:
+        ids = self._ids_do_lote(itens)
+        objetos = list(self.get_queryset().filter(pk__in=ids))
+        encontrados = {obj.pk for obj in objetos}
+        faltando = [str(pk) for pk in ids if pk not in encontrados]
+        if faltando:
+            raise exceptions.NotFound(f"Registros não encontrados: {', '.join(faltando)}.")
+        model = self.get_queryset().model
+        with transaction.atomic():
+            model._default_manager.filter(pk__in=ids).delete()
+            self.finish_bulk_delete(objetos)
+            self._marcar_lote(model, objetos)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def _marcar_lote(self, model: type[models.Model], objetos: Iterable[models.Model]) -> None:
+        for secretaria_id in {resolver_secretaria_id(obj) for obj in objetos}:
+            marcar_alteracao(model, secretaria_id)
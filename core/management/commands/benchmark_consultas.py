@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.benchmarks import executar_consultas_quentes, semear_volume
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Semeia um volume realista e mede as consultas quentes (tempo, nº de queries e plano).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escolas', type=int, default=20)
+        parser.add_argument('--turmas-por-escola', type=int, default=6)
+        parser.add_argument('--alunos-por-turma', type=int, default=30)
+        parser.add_argument('--questoes', type=int, default=20)
+        parser.add_argument('--repeticoes', type=int, default=5)
+        parser.add_argument('--json', action='store_true', help='Emite o resultado em JSON.')
+        parser.add_argument(
+            '--manter',
+            action='store_true',
+            help='Mantém os dados semeados (por padrão tudo é desfeito ao final).',
+        )
+
+    def handle(self, *args, **options):
+        resultados = []
+        volume = None
+        try:
+            with transaction.atomic():
+                volume = semear_volume(
+                    escolas=options['escolas'],
+                    turmas_por_escola=options['turmas_por_escola'],
+                    alunos_por_turma=options['alunos_por_turma'],
+                    questoes=options['questoes'],
+                )
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute('ANALYZE')
+                resultados = executar_consultas_quentes(volume, repeticoes=options['repeticoes'])
+                if not options['manter']:
+                    raise _Rollback
+        except _Rollback:
+            pass
+
+        if options['json']:
+            self.stdout.write(json.dumps({'volume': volume.contagens, 'consultas': resultados}, indent=2))
+        else:
+            self.stdout.write(f'Volume: {volume.contagens}')
+            for resultado in resultados:
+                marca = 'OK ' if resultado['usa_indice'] else 'SEM'
+                self.stdout.write(
+                    f"[{marca}] {resultado['nome']}: {resultado['tempo_ms']} ms, "
+                    f"{resultado['consultas']} query(s), índice {resultado['indice']}"
+                )
+
+        faltando = [resultado['nome'] for resultado in resultados if not resultado['usa_indice']]
+        if faltando:
+            raise CommandError(f"Consultas sem o índice esperado: {', '.join(faltando)}")
@@ -0,0 +1,65 @@
+from dataclasses import fields
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sinteticos import ParametrosSinteticos, gerar_dados_sinteticos
+
+AJUDA = {
+    'secretarias': 'Número de secretarias.',
+    'escolas': 'Escolas por secretaria.',
+    'turmas_por_escola': 'Turmas por escola.',
+    'alunos_por_turma': 'Alunos por turma.',
+    'habilidades': 'Habilidades por secretaria.',
+    'competencias': 'Competências por secretaria.',
+    'questoes': 'Questões no banco de cada secretaria.',
+    'avaliacoes': 'Avaliações por secretaria (aplicadas a todas as turmas).',
+    'cadernos_por_avaliacao': 'Cadernos por avaliação.',
+    'questoes_por_caderno': 'Questões por caderno (respostas por prova).',
+    'taxa_omissao': 'Fração de questões deixadas em branco.',
+    'seed': 'Semente do gerador: mesmos parâmetros e semente geram os mesmos dados.',
+    'tamanho_lote': 'Linhas por bulk_create/transação.',
+    'senha_usuarios': 'Cria usuários admin e professor por secretaria com esta senha.',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera uma base sintética determinística e parametrizável (secretarias, escolas, turmas, '
+        'alunos, questões, avaliações, provas e respostas) para testes de carga e desempenho.'
+    )
+
+    def add_arguments(self, parser):
+        for campo in fields(ParametrosSinteticos):
+            opcao = '--' + campo.name.replace('_', '-')
+            tipo = str if campo.name == 'senha_usuarios' else type(campo.default)
+            parser.add_argument(
+                opcao, type=tipo, default=campo.default, help=f'{AJUDA[campo.name]} (padrão: {campo.default})'
+            )
+        parser.add_argument('--dry-run', action='store_true', help='Mostra apenas o volume estimado.')
+
+    def handle(self, *args, **options):
+        parametros = ParametrosSinteticos(**{campo.name: options[campo.name] for campo in fields(ParametrosSinteticos)})
+        if min(parametros.secretarias, parametros.escolas, parametros.tamanho_lote) < 1:
+            raise CommandError('secretarias, escolas e tamanho-lote devem ser positivos.')
+        if not 0 <= parametros.taxa_omissao < 1:
+            raise CommandError('taxa-omissao deve estar entre 0 e 1.')
+        self.stdout.write(f'Respostas estimadas: {parametros.respostas_estimadas()}')
+        if options['dry_run']:
+            return
+
+        totais: dict[str, int] = {}
+
+        def progresso(nome: str, quantidade: int) -> None:
+            totais[nome] = totais.get(nome, 0) + quantidade
+            if nome == 'respostas' and totais[nome] % (parametros.tamanho_lote * 100) < quantidade:
+                self.stdout.write(f'{totais[nome]} respostas geradas...')
+
+        resultado = gerar_dados_sinteticos(parametros, progresso)
+        for nome, quantidade in resultado.contagens.items():
+            self.stdout.write(f'  {nome}: {quantidade}')
+        respostas = resultado.contagens.get('respostas', 0)
+        taxa = round(respostas / resultado.duracao_s) if resultado.duracao_s else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Base sintética gerada em {resultado.duracao_s:.1f}s ({taxa} respostas/s); '
+            f"secretarias: {', '.join(map(str, resultado.secretaria_ids))}."
+        ))
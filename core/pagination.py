@@ -1,17 +1,98 @@
 from __future__ import annotations
 
-from rest_framework.pagination import PageNumberPagination
+import json
+from typing import Optional
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+# Below this planner estimate the exact COUNT(*) is cheap enough to run anyway.
+LIMIAR_CONTAGEM_EXATA = 10_000
+
+
+def linhas_estimadas(queryset: QuerySet) -> Optional[int]:
+    """Planner row estimate for ``queryset`` (PostgreSQL only; ``None`` elsewhere)."""
+
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plano = json.loads(queryset.order_by().explain(format='json'))
+    return int(plano[0]['Plan']['Plan Rows'])
+
+
+def estimar_contagem(queryset: QuerySet) -> tuple[int, bool]:
+    """Row count of ``queryset`` and whether it is the planner estimate."""
+
+    estimativa = linhas_estimadas(queryset)
+    if estimativa is None or estimativa < LIMIAR_CONTAGEM_EXATA:
+        return queryset.count(), False
+    return estimativa, True
+
+
+class EstimatedCountPaginator(Paginator):
+    estimada = False
+
+    @cached_property
+    def count(self) -> int:
+        total, self.estimada = estimar_contagem(self.object_list)
+        return total
+
+
+class TenantCursorPagination(CursorPagination):
+    """Keyset pagination: no COUNT(*) and no OFFSET, whatever the page depth."""
+
+    ordering = 'pk'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(OrderingFilter.ordering_param):
+            # Keep the queryset's own order (TenantScopedViewSet falls back to pk).
+            atual = tuple(queryset.query.order_by) or tuple(queryset.model._meta.ordering)
+            if atual and all(isinstance(campo, str) and '__' not in campo for campo in atual):
+                return atual
+        return super().get_ordering(request, queryset, view)
 
 
 class DefaultPagination(PageNumberPagination):
-    """Default pagination that supports ?page_size=0 to disable paging."""
+    """Default pagination that supports ?page_size=0 to disable paging.
+
+    ``?paginacao=cursor`` switches the request to keyset pagination and
+    ``?contagem=estimada`` replaces the exact count with the planner estimate on
+    large PostgreSQL tables.
+    """
 
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+    modo_query_param = 'paginacao'
+    contagem_query_param = 'contagem'
 
     def get_page_size(self, request):  # type: ignore[override]
         raw = request.query_params.get(self.page_size_query_param)
         if raw == '0':
             return 0
         return super().get_page_size(request)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self._cursor = None
+        self.contagem_estimada = request.query_params.get(self.contagem_query_param) == 'estimada'
+        if request.query_params.get(self.modo_query_param) == 'cursor' and self.get_page_size(request) != 0:
+            self._cursor = TenantCursorPagination()
+            return self._cursor.paginate_queryset(queryset, request, view)
+        if self.contagem_estimada:
+            self.django_paginator_class = EstimatedCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self._cursor is not None:
+            return self._cursor.get_paginated_response(data)
+        response = super().get_paginated_response(data)
+        # Only flagged when the estimate was used, not on the exact fallback.
+        if self.contagem_estimada and self.page.paginator.estimada:
+            response.data['count_estimado'] = True
+        return response
@@ -0,0 +1,63 @@
+from typing import Optional
+
+from django.apps import apps
+from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .versioning import marcar_alteracao
+
+# Models whose writes bump the per-tenant version stamps.
+MODELOS_VERSIONADOS = (
+    'escolas.Escola',
+    'escolas.Turma',
+    'escolas.Aluno',
+    'itens.Competencia',
+    'itens.Habilidade',
+    'itens.Questao',
+    'avaliacoes.Avaliacao',
+    'avaliacoes.Caderno',
+    'avaliacoes.CadernoQuestao',
+    'avaliacoes.ProvaAluno',
+    'respostas.Gabarito',
+    'respostas.Resposta',
+    'relatorios.FatoResultado',
+)
+
+# A post_delete receiver disables Django's fast (signal-free) cascade deletes, so
+# high-volume tables are only tracked on save; their delete paths bump explicitly.
+SEM_SINAL_DE_EXCLUSAO = {'respostas.Resposta', 'relatorios.FatoResultado'}
+
+
+def resolver_secretaria_id(instance: models.Model) -> Optional[int]:
+    """Return the tenant of ``instance``, following one FK for models without one."""
+
+    if hasattr(instance, 'secretaria_id'):
+        return instance.secretaria_id
+    for field in instance._meta.concrete_fields:
+        if isinstance(field, models.ForeignKey) and hasattr(field.related_model, 'secretaria_id'):
+            relacionado = getattr(instance, field.name, None)
+            if relacionado is not None:
+                return relacionado.secretaria_id
+    return None
+
+
+def _registrar_alteracao(sender, instance, **kwargs):
+    marcar_alteracao(sender, resolver_secretaria_id(instance))
+
+
+def _registrar_alteracao_m2m(sender, instance, action, **kwargs):
+    if action in {'post_add', 'post_remove', 'post_clear'}:
+        marcar_alteracao(type(instance), resolver_secretaria_id(instance))
+
+
+def conectar_sinais() -> None:
+    for label in MODELOS_VERSIONADOS:
+        model = apps.get_model(label)
+        post_save.connect(_registrar_alteracao, sender=model, dispatch_uid=f'versao-save-{label}')
+        if label not in SEM_SINAL_DE_EXCLUSAO:
+            post_delete.connect(_registrar_alteracao, sender=model, dispatch_uid=f'versao-delete-{label}')
+        for m2m in model._meta.many_to_many:
+            through = m2m.remote_field.through
+            m2m_changed.connect(
+                _registrar_alteracao_m2m, sender=through, dispatch_uid=f'versao-m2m-{label}-{m2m.name}'
+            )
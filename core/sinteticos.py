@@ -0,0 +1,322 @@
+"""Deterministic synthetic datasets at production scale, for load and performance tests.
+
+Everything is written with ``bulk_create`` in batches, one transaction per batch, and
+every random choice comes from a single seeded generator, so the same parameters and
+seed always produce the same data. Answers follow a Rasch (one-parameter IRT) model:
+each aluno has an ability drawn around school and class effects, each questão a
+difficulty, and wrong answers favour one or two plausible distractors per item.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Optional
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from avaliacoes.emissao import emitir_provas
+from avaliacoes.models import Avaliacao, Caderno, CadernoQuestao, ProvaAluno
+from core.versioning import marcar_alteracao
+from escolas.models import Aluno, Escola, Turma
+from itens.models import Competencia, Habilidade, Questao
+from relatorios.services import atualizar_fatos
+from respostas.models import Gabarito, Resposta
+
+from .models import Secretaria
+
+ALTERNATIVAS = 'ABCDE'
+PRENOMES = (
+    'Ana', 'Beatriz', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriel', 'Helena', 'Igor',
+    'Isabela', 'João', 'Júlia', 'Kauã', 'Larissa', 'Lucas', 'Maria', 'Mateus', 'Natália', 'Pedro',
+    'Rafaela', 'Samuel', 'Sofia', 'Thiago', 'Vitória',
+)
+SOBRENOMES = (
+    'Almeida', 'Alves', 'Barbosa', 'Cardoso', 'Costa', 'Ferreira', 'Gomes', 'Lima', 'Melo', 'Oliveira',
+    'Pereira', 'Ribeiro', 'Rodrigues', 'Santos', 'Silva', 'Souza',
+)
+ANOS_ESCOLARES = ('2º Ano', '5º Ano', '9º Ano')
+
+
+@dataclass
+class ParametrosSinteticos:
+    secretarias: int = 1
+    escolas: int = 10
+    turmas_por_escola: int = 4
+    alunos_por_turma: int = 30
+    habilidades: int = 20
+    competencias: int = 5
+    questoes: int = 200
+    avaliacoes: int = 2
+    cadernos_por_avaliacao: int = 2
+    questoes_por_caderno: int = 20
+    taxa_omissao: float = 0.02
+    seed: int = 42
+    tamanho_lote: int = 5000
+    senha_usuarios: Optional[str] = None
+
+    def respostas_estimadas(self) -> int:
+        alunos = self.secretarias * self.escolas * self.turmas_por_escola * self.alunos_por_turma
+        return round(alunos * self.avaliacoes * self.questoes_por_caderno * (1 - self.taxa_omissao))
+
+
+@dataclass
+class ResultadoSintetico:
+    secretaria_ids: list[int] = field(default_factory=list)
+    contagens: dict[str, int] = field(default_factory=dict)
+    duracao_s: float = 0.0
+
+    def somar(self, nome: str, quantidade: int) -> None:
+        self.contagens[nome] = self.contagens.get(nome, 0) + quantidade
+
+
+def _cpf(numero: int) -> str:
+    """Return a CPF with valid check digits for a 9-digit base number."""
+
+    digitos = [int(digito) for digito in f'{numero % 10 ** 9:09d}']
+    for tamanho in (9, 10):
+        soma = sum(valor * peso for valor, peso in zip(digitos, range(tamanho + 1, 1, -1)))
+        digitos.append((soma * 10 % 11) % 10)
+    return ''.join(map(str, digitos))
+
+
+def _probabilidade_acerto(habilidade: float, dificuldade: float) -> float:
+    return 1 / (1 + math.exp(dificuldade - habilidade))
+
+
+class GeradorSintetico:
+    def __init__(self, parametros: ParametrosSinteticos,
+                 progresso: Optional[Callable[[str, int], None]] = None):
+        self.p = parametros
+        self.rng = random.Random(parametros.seed)
+        self.progresso = progresso
+        self.resultado = ResultadoSintetico()
+        self._sequencia_cpf = 0
+
+    def _inserir(self, model, objetos: list, nome: str, **opcoes) -> list:
+        criados = []
+        for inicio in range(0, len(objetos), self.p.tamanho_lote):
+            with transaction.atomic():
+                criados.extend(model.objects.bulk_create(objetos[inicio:inicio + self.p.tamanho_lote], **opcoes))
+        self.resultado.somar(nome, len(criados))
+        if self.progresso:
+            self.progresso(nome, len(criados))
+        return criados
+
+    def gerar(self) -> ResultadoSintetico:
+        inicio = time.perf_counter()
+        senha = make_password(self.p.senha_usuarios) if self.p.senha_usuarios else None
+        for indice in range(1, self.p.secretarias + 1):
+            secretaria = Secretaria.objects.create(nome=f'Secretaria Sintética {indice}')
+            self.resultado.secretaria_ids.append(secretaria.id)
+            self.resultado.somar('secretarias', 1)
+            if senha:
+                self._usuarios(secretaria, indice, senha)
+            self._secretaria(secretaria, indice)
+            for model in (Escola, Turma, Aluno, Competencia, Habilidade, Questao, Avaliacao, Caderno,
+                          CadernoQuestao, Gabarito, ProvaAluno, Resposta):
+                marcar_alteracao(model, secretaria.id)
+        self.resultado.duracao_s = time.perf_counter() - inicio
+        return self.resultado
+
+    def _usuarios(self, secretaria: Secretaria, indice: int, senha: str) -> None:
+        # Usernames only depend on seed and index, so a rerun moves the existing
+        # logins to the new secretaria instead of failing on the unique username.
+        User = get_user_model()
+        usuarios = [
+            User(username=f'sint{self.p.seed}_{indice}_{papel}', password=senha, secretaria=secretaria, role=papel)
+            for papel in ('admin', 'professor')
+        ]
+        self._inserir(
+            User, usuarios, 'usuarios',
+            update_conflicts=True, unique_fields=['username'], update_fields=['password', 'secretaria', 'role'],
+        )
+
+    def semear_rede(self, secretaria: Secretaria, indice: int) -> tuple[list[Escola], list[Turma], list[Aluno]]:
+        """Insert the escolas, turmas and alunos of ``secretaria``; also used by core.benchmarks."""
+
+        rng, p = self.rng, self.p
+        escolas = self._inserir(
+            Escola,
+            [
+                Escola(secretaria=secretaria, nome=f'Escola Sintética {indice}-{idx}',
+                       codigo_inep=f'{rng.randrange(10 ** 7, 10 ** 8)}')
+                for idx in range(1, p.escolas + 1)
+            ],
+            'escolas',
+        )
+        turmas = self._inserir(
+            Turma,
+            [
+                Turma(secretaria=secretaria, escola=escola, nome=f'Turma {chr(65 + idx % 26)}{idx // 26 or ""}',
+                      ano=ANOS_ESCOLARES[idx % len(ANOS_ESCOLARES)])
+                for escola in escolas
+                for idx in range(p.turmas_por_escola)
+            ],
+            'turmas',
+        )
+        alunos = []
+        for turma in turmas:
+            for _ in range(p.alunos_por_turma):
+                self._sequencia_cpf += 1
+                alunos.append(Aluno(
+                    secretaria=secretaria,
+                    turma=turma,
+                    nome=f'{rng.choice(PRENOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}',
+                    cpf=_cpf(self._sequencia_cpf),
+                ))
+        return escolas, turmas, self._inserir(Aluno, alunos, 'alunos')
+
+    def _secretaria(self, secretaria: Secretaria, indice: int) -> None:
+        rng, p = self.rng, self.p
+        escolas, turmas, alunos = self.semear_rede(secretaria, indice)
+        efeito_escola = {escola.id: rng.gauss(0, 0.5) for escola in escolas}
+        efeito_turma = {turma.id: efeito_escola[turma.escola_id] + rng.gauss(0, 0.3) for turma in turmas}
+        habilidade_aluno = {aluno.id: efeito_turma[aluno.turma_id] + rng.gauss(0, 0.8) for aluno in alunos}
+        turma_aluno = {aluno.id: (aluno.turma_id, aluno.turma.escola_id) for aluno in alunos}
+        del alunos
+
+        questoes = self._banco_de_questoes(secretaria)
+        for numero in range(1, p.avaliacoes + 1):
+            self._avaliacao(secretaria, numero, turmas, questoes, habilidade_aluno, turma_aluno)
+
+    def _banco_de_questoes(self, secretaria: Secretaria) -> list[dict]:
+        rng, p = self.rng, self.p
+        competencias = self._inserir(
+            Competencia,
+            [Competencia(secretaria=secretaria, codigo=f'C{idx:02d}', descricao=f'Competência {idx}')
+             for idx in range(1, p.competencias + 1)],
+            'competencias',
+        )
+        habilidades = self._inserir(
+            Habilidade,
+            [Habilidade(secretaria=secretaria, codigo=f'H{idx:03d}', descricao=f'Habilidade {idx}')
+             for idx in range(1, p.habilidades + 1)],
+            'habilidades',
+        )
+        objetos = [
+            Questao(
+                secretaria=secretaria,
+                enunciado=f'Questão sintética {idx}',
+                alternativa_a='Alternativa A', alternativa_b='Alternativa B', alternativa_c='Alternativa C',
+                alternativa_d='Alternativa D', alternativa_e='Alternativa E',
+                correta=rng.choice(ALTERNATIVAS),
+                competencia=rng.choice(competencias) if competencias else None,
+                habilidade=rng.choice(habilidades) if habilidades else None,
+                status=Questao.STATUS_APROVADA,
+            )
+            for idx in range(1, p.questoes + 1)
+        ]
+        questoes = []
+        for questao in self._inserir(Questao, objetos, 'questoes'):
+            distratores = [alternativa for alternativa in ALTERNATIVAS if alternativa != questao.correta]
+            # Squared weights make one or two distractors clearly more attractive.
+            pesos = [rng.random() ** 2 + 0.05 for _ in distratores]
+            acumulados = [sum(pesos[:idx + 1]) for idx in range(len(pesos))]
+            questoes.append({
+                'id': questao.id,
+                'correta': questao.correta,
+                'habilidade_id': questao.habilidade_id,
+                'competencia_id': questao.competencia_id,
+                'dificuldade': rng.gauss(0, 1),
+                'distratores': distratores,
+                'acumulados': acumulados,
+            })
+        return questoes
+
+    def _avaliacao(self, secretaria, indice, turmas, questoes, habilidade_aluno, turma_aluno) -> None:
+        rng, p = self.rng, self.p
+        avaliacao = Avaliacao.objects.create(
+            secretaria=secretaria,
+            titulo=f'Avaliação Sintética {indice}',
+            data_aplicacao=date(2024, 3, 1) + timedelta(days=rng.randrange(270)),
+            liberada_para_professores=True,
+        )
+        avaliacao.turmas.set(turmas)
+        self.resultado.somar('avaliacoes', 1)
+
+        cadernos = self._inserir(
+            Caderno,
+            [Caderno(secretaria=secretaria, avaliacao=avaliacao, codigo=chr(65 + idx))
+             for idx in range(p.cadernos_por_avaliacao)],
+            'cadernos',
+        )
+        itens_por_caderno = {}
+        caderno_questoes = []
+        for caderno in cadernos:
+            selecionadas = rng.sample(questoes, min(p.questoes_por_caderno, len(questoes)))
+            itens_por_caderno[caderno.id] = selecionadas
+            caderno_questoes.extend(
+                CadernoQuestao(caderno=caderno, questao_id=questao['id'], ordem=ordem)
+                for ordem, questao in enumerate(selecionadas, start=1)
+            )
+        caderno_questoes = self._inserir(CadernoQuestao, caderno_questoes, 'cadernos_questoes')
+        cq_por_caderno: dict[int, list[tuple[int, dict]]] = {}
+        questao_por_id = {questao['id']: questao for questao in questoes}
+        for cq in caderno_questoes:
+            cq_por_caderno.setdefault(cq.caderno_id, []).append((cq.id, questao_por_id[cq.questao_id]))
+        self._inserir(
+            Gabarito,
+            [Gabarito(secretaria=secretaria, caderno_questao_id=cq_id, alternativa_correta=questao['correta'])
+             for itens in cq_por_caderno.values() for cq_id, questao in itens],
+            'gabaritos',
+        )
+
+        emissao = emitir_provas(avaliacao, tamanho_lote=p.tamanho_lote)
+        self.resultado.somar('provas', emissao.criadas)
+        if self.progresso:
+            self.progresso('provas', emissao.criadas)
+        self._respostas(avaliacao, cq_por_caderno, habilidade_aluno, turma_aluno)
+        # Bulk inserts skip the write paths that keep the results cube current.
+        self.resultado.somar('fatos_resultado', atualizar_fatos(avaliacao.id))
+
+    def _respostas(self, avaliacao, cq_por_caderno, habilidade_aluno, turma_aluno) -> None:
+        rng, p = self.rng, self.p
+        provas = ProvaAluno.objects.filter(avaliacao=avaliacao).order_by('id').values_list(
+            'id', 'aluno_id', 'caderno_id'
+        )
+        ultimo_id, lote = 0, []
+        while True:
+            bloco = list(provas.filter(id__gt=ultimo_id)[:p.tamanho_lote])
+            if not bloco:
+                break
+            ultimo_id = bloco[-1][0]
+            for prova_id, aluno_id, caderno_id in bloco:
+                habilidade = habilidade_aluno[aluno_id]
+                turma_id, escola_id = turma_aluno[aluno_id]
+                for cq_id, questao in cq_por_caderno[caderno_id]:
+                    if rng.random() < p.taxa_omissao:
+                        continue
+                    acertou = rng.random() < _probabilidade_acerto(habilidade, questao['dificuldade'])
+                    if acertou:
+                        alternativa = questao['correta']
+                    else:
+                        alternativa = rng.choices(questao['distratores'], cum_weights=questao['acumulados'])[0]
+                    lote.append(Resposta(
+                        secretaria_id=avaliacao.secretaria_id,
+                        prova_aluno_id=prova_id,
+                        caderno_questao_id=cq_id,
+                        alternativa=alternativa,
+                        correta=acertou,
+                        avaliacao_id=avaliacao.id,
+                        turma_id=turma_id,
+                        escola_id=escola_id,
+                        habilidade_id=questao['habilidade_id'],
+                        competencia_id=questao['competencia_id'],
+                        data_aplicacao=avaliacao.data_aplicacao,
+                    ))
+                if len(lote) >= p.tamanho_lote:
+                    self._inserir(Resposta, lote, 'respostas')
+                    lote = []
+        if lote:
+            self._inserir(Resposta, lote, 'respostas')
+
+
+def gerar_dados_sinteticos(parametros: ParametrosSinteticos,
+                           progresso: Optional[Callable[[str, int], None]] = None) -> ResultadoSintetico:
+    return GeradorSintetico(parametros, progresso).gerar()
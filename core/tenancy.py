@@ -1,11 +1,21 @@
-from typing import Any, Iterable, Optional, Type
+import json
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional, Type
 
+from django.core.exceptions import FieldDoesNotExist
 from django.db import models
+from django.http import StreamingHttpResponse
 from rest_framework import exceptions, permissions
 from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import JSONRenderer
 from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer, ListSerializer
 from rest_framework.viewsets import ModelViewSet
 
+from .condicional import ConditionalGetMixin
+from .lote import ACOES_EQUIVALENTES, BulkWriteMixin
+
 
 class IsSameSecretaria(permissions.BasePermission):
     """Ensure the authenticated user matches the secretaria bound to the object."""
@@ -18,12 +28,28 @@ class IsSameSecretaria(permissions.BasePermission):
         return user_sec == obj_sec
 
 
-class TenantScopedViewSet(ModelViewSet):
-    """Base ViewSet enforcing secretaria scoping on list/create operations."""
+class TenantScopedViewSet(BulkWriteMixin, ConditionalGetMixin, ModelViewSet):
+    """Base ViewSet enforcing secretaria scoping on list/create operations.
+
+    ``list`` and ``retrieve`` answer conditional GETs from the version stamps of
+    ``conditional_models`` (default: the queryset model); set it when the
+    serializer embeds other models.
+
+    Both also accept sparse fieldsets: ``?fields=id,titulo`` keeps only those
+    serializer fields and ``?omit=enunciado`` drops some; the queryset is then
+    narrowed with ``.only()`` and loses the joins and prefetches no kept field uses.
+
+    Lists can be created, updated and deleted in one request on ``<recurso>/lote/``
+    (see :class:`core.lote.BulkWriteMixin`).
+    """
 
     tenant_field = 'secretaria'
     role_permissions: dict[str, Iterable[str]] = {}
     allow_superadmin_override: bool = True
+    # Rows fetched and serialized per step when an unpaginated list is streamed.
+    stream_chunk_size: int = 500
+    sparse_fields_param = 'fields'
+    sparse_omit_param = 'omit'
 
     def get_permissions(self):
         """Allow OPTIONS requests without authentication for CORS preflight."""
@@ -37,6 +63,9 @@ class TenantScopedViewSet(ModelViewSet):
 
     def get_queryset(self):
         queryset = super().get_queryset()
+        if not queryset.ordered:
+            # Stable order for pagination; served by the (secretaria, id) indexes.
+            queryset = queryset.order_by('pk')
         user = self.request.user
         user_sec = getattr(user, 'secretaria_id', None)
         if getattr(user, 'role', '') == 'superadmin':
@@ -45,14 +74,158 @@ class TenantScopedViewSet(ModelViewSet):
             return queryset.none()
         return queryset.filter(**{f"{self.tenant_field}_id": user_sec})
 
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        campos = self._sparse_fields()
+        if campos is None:
+            return queryset
+        return self._narrow_queryset(queryset, campos)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        campos = self._sparse_fields()
+        if campos is not None:
+            alvo = serializer.child if isinstance(serializer, ListSerializer) else serializer
+            for nome in [nome for nome in alvo.fields if nome not in campos]:
+                del alvo.fields[nome]
+        return serializer
+
+    def default_conditional_models(self):
+        queryset = self.queryset if self.queryset is not None else self.get_queryset()
+        return (queryset.model,)
+
+    def _conditional_scope(self) -> Optional[int]:
+        user = self.request.user
+        if getattr(user, 'role', '') == 'superadmin':
+            return None
+        return getattr(user, 'secretaria_id', None)
+
+    def retrieve(self, request, *args, **kwargs):
+        not_modified = self.conditional_response(request, self._conditional_scope())
+        if not_modified is not None:
+            return not_modified
+        return super().retrieve(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        not_modified = self.conditional_response(request, self._conditional_scope())
+        if not_modified is not None:
+            return not_modified
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        if isinstance(getattr(request, 'accepted_renderer', None), JSONRenderer):
+            return StreamingHttpResponse(self._stream_json(queryset), content_type='application/json')
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    def _stream_json(self, queryset: models.QuerySet) -> Iterator[bytes]:
+        """Yield the unpaginated list as a JSON array, one chunk of rows at a time."""
+
+        renderer = JSONRenderer()
+        separators = (',', ':') if renderer.compact else (', ', ': ')
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        yield b'['
+        first = True
+        while chunk := list(islice(rows, self.stream_chunk_size)):
+            data = self.get_serializer(chunk, many=True).data
+            body = json.dumps(
+                data, cls=renderer.encoder_class, ensure_ascii=renderer.ensure_ascii, separators=separators
+            )[1:-1]
+            if body:
+                yield (body if first else ',' + body).encode('utf-8')
+                first = False
+        yield b']'
+
     # Helpers -----------------------------------------------------------------
 
+    def _sparse_fields(self) -> Optional[dict[str, Any]]:
+        """Serializer fields kept by ``?fields=``/``?omit=``, or ``None`` for all."""
+
+        if hasattr(self, '_campos_esparsos'):
+            return self._campos_esparsos
+        self._campos_esparsos = None
+        params = self.request.query_params
+        pedidos = {
+            param: [nome.strip() for nome in params.get(param, '').split(',') if nome.strip()]
+            for param in (self.sparse_fields_param, self.sparse_omit_param)
+        }
+        if getattr(self, 'action', None) not in ('list', 'retrieve') or not any(pedidos.values()):
+            return None
+
+        disponiveis = self.get_serializer_class()(context=self.get_serializer_context()).fields
+        for param, nomes in pedidos.items():
+            desconhecidos = [nome for nome in nomes if nome not in disponiveis]
+            if desconhecidos:
+                raise exceptions.ValidationError({param: f"Campos desconhecidos: {', '.join(desconhecidos)}."})
+        incluidos = pedidos[self.sparse_fields_param] or list(disponiveis)
+        omitidos = set(pedidos[self.sparse_omit_param])
+        self._campos_esparsos = {nome: disponiveis[nome] for nome in incluidos if nome not in omitidos}
+        return self._campos_esparsos
+
+    def _narrow_queryset(self, queryset: models.QuerySet, campos: dict[str, Any]) -> models.QuerySet:
+        """Load only the columns, joins and prefetches the kept fields read.
+
+        A join survives only for fields reading through the relation (nested
+        serializers, dotted sources); a plain primary key comes from the column.
+        Fields backed by properties or methods (or ``source='*'``) may read anything,
+        so the queryset is then left untouched.
+        """
+
+        if queryset.query.select_related is True:
+            return queryset
+        opts = queryset.model._meta
+        colunas = {opts.pk.name}
+        try:
+            # Read by the object-level tenant check; some models are scoped through a FK.
+            colunas.add(opts.get_field(self.tenant_field).name)
+        except FieldDoesNotExist:
+            pass
+        raizes, atravessadas = set(), set()
+        for campo in campos.values():
+            if campo.source == '*':
+                return queryset
+            raiz = campo.source_attrs[0]
+            try:
+                field = opts.get_field(raiz)
+            except FieldDoesNotExist:
+                field = next((rel for rel in opts.related_objects if rel.get_accessor_name() == raiz), None)
+                if field is None:
+                    return queryset
+            if field.concrete:
+                colunas.add(field.name)
+            raizes.add(raiz)
+            if len(campo.source_attrs) > 1 or isinstance(campo, BaseSerializer):
+                atravessadas.add(raiz)
+
+        def caminhos(arvore: dict, prefixo: str = '') -> Iterator[str]:
+            for nome, filhos in arvore.items():
+                yield from (caminhos(filhos, f'{prefixo}{nome}__') if filhos else [f'{prefixo}{nome}'])
+
+        joins = [
+            caminho
+            for caminho in caminhos(queryset.query.select_related or {})
+            if caminho.split('__', 1)[0] in atravessadas
+        ]
+        prefetches = [
+            lookup
+            for lookup in queryset._prefetch_related_lookups
+            if getattr(lookup, 'prefetch_to', lookup).split('__', 1)[0] in raizes
+        ]
+        queryset = queryset.select_related(None)
+        if joins:
+            queryset = queryset.select_related(*joins)
+        return queryset.prefetch_related(None).prefetch_related(*prefetches).only(*colunas)
+
     def _resolve_allowed_roles(self, request: Request) -> Optional[set[str]]:
         mapping = getattr(self, 'role_permissions', None) or {}
         if not mapping:
             return None
 
         action = getattr(self, 'action', None)
+        if action == 'lote' and action not in mapping:
+            action = ACOES_EQUIVALENTES.get(request.method, action)
         allowed: Optional[Iterable[str]] = None
 
         if action and action in mapping:
@@ -92,7 +265,9 @@ class TenantScopedViewSet(ModelViewSet):
         field = self.get_queryset().model._meta.get_field(self.tenant_field)
         return getattr(field, 'null', False)
 
-    def _resolve_tenant(self, instance: Optional[models.Model] = None) -> Optional[models.Model]:
+    def _resolve_tenant(
+        self, instance: Optional[models.Model] = None, data: Optional[dict] = None
+    ) -> Optional[models.Model]:
         """Determina a secretaria que deve ser aplicada na operação atual."""
 
         field_name = self.tenant_field
@@ -100,7 +275,8 @@ class TenantScopedViewSet(ModelViewSet):
         user_role = getattr(user, 'role', '')
 
         if user_role == 'superadmin':
-            data = getattr(self.request, 'data', {}) or {}
+            if data is None:
+                data = getattr(self.request, 'data', {}) or {}
             raw_value = data.get(f'{field_name}_id') or data.get(field_name)
             if raw_value in (None, '', 'null'):
                 return getattr(instance, field_name, None) if instance is not None else None
@@ -0,0 +1,69 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_bakery import baker
+
+
+@pytest.mark.django_db
+def test_fields_narrows_payload_columns_and_joins(admin, cliente_api):
+    baker.make('itens.Questao', secretaria=admin.secretaria, habilidade=baker.make('itens.Habilidade'), _quantity=3)
+
+    with CaptureQueriesContext(connection) as consultas:
+        response = cliente_api(admin).get(reverse('questao-list'), {'fields': 'id,habilidade'})
+
+    assert response.status_code == 200
+    assert all(set(questao) == {'id', 'habilidade'} for questao in response.json()['results'])
+    sql = consultas.captured_queries[-1]['sql']
+    assert 'itens_questao' in sql and 'enunciado' not in sql and 'alternativa_a' not in sql
+    assert 'JOIN' not in sql.upper()
+
+
+@pytest.mark.django_db
+def test_omit_skips_unused_prefetch(admin, cliente_api):
+    avaliacao = baker.make('avaliacoes.Avaliacao', secretaria=admin.secretaria)
+    for caderno in baker.make('avaliacoes.Caderno', secretaria=admin.secretaria, avaliacao=avaliacao, _quantity=2):
+        baker.make('avaliacoes.CadernoQuestao', caderno=caderno, ordem=1)
+    client = cliente_api(admin)
+    url = reverse('caderno-list')
+
+    with CaptureQueriesContext(connection) as completas:
+        assert all(caderno['cadernoquestao_set'] for caderno in client.get(url).json()['results'])
+    with CaptureQueriesContext(connection) as esparsas:
+        dados = client.get(url, {'omit': 'cadernoquestao_set'}).json()['results']
+
+    assert [set(caderno) for caderno in dados] == [{'id', 'secretaria', 'avaliacao', 'codigo'}] * 2
+    assert len(esparsas.captured_queries) == len(completas.captured_queries) - 1
+    assert not any('avaliacoes_cadernoquestao' in consulta['sql'] for consulta in esparsas.captured_queries)
+
+
+@pytest.mark.django_db
+def test_retrieve_accepts_fields_and_keeps_tenant_check(admin, cliente_api):
+    aluno = baker.make('escolas.Aluno', secretaria=admin.secretaria, nome='Ana')
+    outro = baker.make('escolas.Aluno', secretaria=baker.make('core.Secretaria'))
+    client = cliente_api(admin)
+
+    response = client.get(reverse('aluno-detail', args=[aluno.id]), {'fields': 'nome'})
+    assert response.json() == {'nome': 'Ana'}
+    assert client.get(reverse('aluno-detail', args=[outro.id]), {'fields': 'nome'}).status_code == 404
+
+
+@pytest.mark.django_db
+def test_unknown_fields_are_rejected(admin, cliente_api):
+    response = cliente_api(admin).get(reverse('escola-list'), {'fields': 'id,inexistente'})
+
+    assert response.status_code == 400
+    assert 'inexistente' in response.json()['fields']
+
+
+@pytest.mark.django_db
+def test_fields_on_models_scoped_through_a_relation(admin, cliente_api):
+    caderno = baker.make('avaliacoes.Caderno', secretaria=admin.secretaria, avaliacao__secretaria=admin.secretaria)
+    baker.make('avaliacoes.CadernoQuestao', caderno=caderno, ordem=3)
+    baker.make('avaliacoes.CadernoQuestao', ordem=4)
+
+    response = cliente_api(admin).get(reverse('cadernoquestao-list'), {'fields': 'id,ordem'})
+
+    assert response.status_code == 200
+    assert [set(item) for item in response.json()['results']] == [{'id', 'ordem'}]
+    assert response.json()['results'][0]['ordem'] == 3
@@ -0,0 +1,85 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+from model_bakery import baker
+
+
+@pytest.mark.django_db
+def test_list_answers_304_from_stamps_until_a_write(admin, cliente_api):
+    baker.make('escolas.Escola', secretaria=admin.secretaria, _quantity=3)
+    client = cliente_api(admin)
+    url = reverse('escola-list')
+
+    primeira = client.get(url)
+    etag = primeira['ETag']
+    assert primeira.status_code == 200 and etag and primeira['Last-Modified']
+    assert primeira['Cache-Control'] == 'private, no-cache'
+
+    with CaptureQueriesContext(connection) as consultas:
+        repetida = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert repetida.status_code == 304
+    assert repetida['ETag'] == etag
+    assert not any('escolas_escola' in consulta['sql'] for consulta in consultas.captured_queries)
+
+    assert client.get(url, {'search': 'x'})['ETag'] != etag
+    assert cliente_api(baker.make('core.User', secretaria=baker.make('core.Secretaria'), role='admin')).get(
+        url, HTTP_IF_NONE_MATCH=etag
+    ).status_code == 200
+
+    baker.make('escolas.Escola', secretaria=admin.secretaria)
+    depois = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert depois.status_code == 200
+    assert depois['ETag'] != etag
+    assert depois.json()['count'] == 4
+
+
+@pytest.mark.django_db
+def test_retrieve_honours_if_modified_since_and_embedded_models(admin, cliente_api):
+    caderno = baker.make('avaliacoes.Caderno', secretaria=admin.secretaria, avaliacao__secretaria=admin.secretaria)
+    client = cliente_api(admin)
+    url = reverse('caderno-detail', args=[caderno.id])
+
+    primeira = client.get(url)
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=primeira['Last-Modified']).status_code == 304
+
+    # CadernoSerializer nests the questões, so their writes invalidate the caderno too.
+    baker.make('avaliacoes.CadernoQuestao', caderno=caderno, ordem=1)
+    assert client.get(url, HTTP_IF_NONE_MATCH=primeira['ETag']).status_code == 200
+
+
+@pytest.mark.django_db
+def test_models_without_stamps_are_never_answered_with_304(admin, cliente_api):
+    response = cliente_api(admin).get(reverse('loteimpressao-list'), HTTP_IF_MODIFIED_SINCE=http_date(4102444800))
+
+    assert response.status_code == 200
+    assert 'ETag' not in response
+
+
+@pytest.mark.django_db
+def test_report_views_use_resposta_stamps(admin, cliente_api):
+    client = cliente_api(admin)
+    url = reverse('relatorio-proficiencia-drilldown', args=[admin.secretaria_id])
+
+    primeira = client.get(url, {'nivel': 'escola'})
+    assert primeira.status_code == 200
+    assert client.get(url, {'nivel': 'escola'}, HTTP_IF_NONE_MATCH=primeira['ETag']).status_code == 304
+
+    baker.make('respostas.Resposta', secretaria=admin.secretaria, alternativa='A')
+    assert client.get(url, {'nivel': 'escola'}, HTTP_IF_NONE_MATCH=primeira['ETag']).status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+def test_poll_during_an_open_write_is_revalidated_after_commit(admin, cliente_api):
+    client = cliente_api(admin)
+    url = reverse('escola-list')
+
+    with transaction.atomic():
+        baker.make('escolas.Escola', secretaria=admin.secretaria)
+        # A poll while the writer is still open may see the pre-commit state.
+        durante = client.get(url)['ETag']
+
+    depois = client.get(url, HTTP_IF_NONE_MATCH=durante)
+    assert depois.status_code == 200
+    assert depois.json()['count'] == 1
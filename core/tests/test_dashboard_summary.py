@@ -1,9 +1,13 @@
 import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from model_bakery import baker
 from rest_framework.test import APIClient
 
-from avaliacoes.models import Avaliacao
+from avaliacoes.models import Avaliacao, ProvaAluno
+from core.versioning import marcar_alteracao, obter_versao
 from escolas.models import Aluno, Escola, Turma
 from itens.models import Questao
 
@@ -41,6 +45,9 @@ def test_dashboard_summary_returns_tenant_counts():
         'alunos': 5,
         'questoes': 6,
         'avaliacoes': 2,
+        'provas_emitidas': 0,
+        'provas_corrigidas': 0,
+        'media_acertos': None,
     }
 
 
@@ -77,4 +84,95 @@ def test_dashboard_summary_superadmin_sees_all():
         'alunos': Aluno.objects.count(),
         'questoes': Questao.objects.count(),
         'avaliacoes': Avaliacao.objects.count(),
+        'provas_emitidas': ProvaAluno.objects.count(),
+        'provas_corrigidas': 0,
+        'media_acertos': None,
     }
+
+
+@pytest.mark.django_db
+def test_dashboard_summary_is_cached_until_data_changes(django_assert_num_queries):
+    secretaria = baker.make('core.Secretaria')
+    user = baker.make('core.User', secretaria=secretaria, role='admin')
+    baker.make('escolas.Escola', secretaria=secretaria, _quantity=2)
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    with django_assert_num_queries(1):
+        assert client.get(reverse('dashboard-summary')).json()['escolas'] == 2
+    with django_assert_num_queries(0):
+        assert client.get(reverse('dashboard-summary')).json()['escolas'] == 2
+
+    baker.make('escolas.Escola', secretaria=secretaria)
+    assert client.get(reverse('dashboard-summary')).json()['escolas'] == 3
+
+
+@pytest.mark.django_db
+def test_dashboard_summary_reports_exam_day_figures():
+    secretaria = baker.make('core.Secretaria')
+    user = baker.make('core.User', secretaria=secretaria, role='admin')
+    avaliacao = baker.make('avaliacoes.Avaliacao', secretaria=secretaria)
+    caderno = baker.make('avaliacoes.Caderno', secretaria=secretaria, avaliacao=avaliacao)
+    cqs = baker.make('avaliacoes.CadernoQuestao', caderno=caderno, _quantity=2, ordem=1)
+    turma = baker.make('escolas.Turma', secretaria=secretaria, escola__secretaria=secretaria)
+    provas = [
+        baker.make(
+            'avaliacoes.ProvaAluno',
+            secretaria=secretaria,
+            avaliacao=avaliacao,
+            aluno=baker.make('escolas.Aluno', secretaria=secretaria, turma=turma),
+            caderno=caderno,
+        )
+        for _ in range(3)
+    ]
+    for cq, correta in zip(cqs, [True, False]):
+        baker.make(
+            'respostas.Resposta',
+            secretaria=secretaria,
+            prova_aluno=provas[0],
+            caderno_questao=cq,
+            alternativa='A',
+            correta=correta,
+        )
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    payload = client.get(reverse('dashboard-summary')).json()
+
+    assert payload['provas_emitidas'] == 3
+    assert payload['provas_corrigidas'] == 1
+    assert payload['media_acertos'] == 50.0
+
+
+@pytest.mark.django_db
+def test_stamp_is_bumped_again_when_the_transaction_commits(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        durante = marcar_alteracao(Escola, 1)
+        assert obter_versao(Escola, 1) == durante
+
+    # A reader that cached the uncommitted state under ``durante`` never hits it again.
+    assert obter_versao(Escola, 1) > durante
+
+
+@pytest.mark.django_db
+def test_answer_writes_keep_the_catalogue_counts_cached():
+    secretaria = baker.make('core.Secretaria')
+    user = baker.make('core.User', secretaria=secretaria, role='admin')
+    baker.make('escolas.Escola', secretaria=secretaria, _quantity=2)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    assert client.get(reverse('dashboard-summary')).json()['provas_corrigidas'] == 0
+
+    baker.make('respostas.Resposta', secretaria=secretaria, alternativa='A', correta=True)
+    with CaptureQueriesContext(connection) as consultas:
+        # Answer figures are served from their short-lived cache entry.
+        assert client.get(reverse('dashboard-summary')).json()['provas_corrigidas'] == 0
+    assert len(consultas) == 0
+
+    cache.delete(f'dashboard:{secretaria.id}:respostas')
+    with CaptureQueriesContext(connection) as consultas:
+        payload = client.get(reverse('dashboard-summary')).json()
+    assert (payload['escolas'], payload['provas_corrigidas'], payload['media_acertos']) == (2, 1, 100.0)
+    assert len(consultas) == 1
+    assert Escola._meta.db_table not in consultas[0]['sql']
@@ -0,0 +1,35 @@
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from core.benchmarks import CONSULTAS_QUENTES, executar_consulta, semear_volume
+
+
+@pytest.fixture
+def volume(db):
+    return semear_volume(escolas=2, turmas_por_escola=2, alunos_por_turma=5, questoes=4)
+
+
+@pytest.mark.parametrize('consulta', CONSULTAS_QUENTES, ids=lambda consulta: consulta.nome)
+def test_hot_query_uses_expected_index(consulta, volume):
+    resultado = executar_consulta(consulta, volume, repeticoes=1)
+
+    assert resultado.usa_indice, resultado.plano
+    assert resultado.consultas == 1
+
+
+@pytest.mark.parametrize(
+    'url_name',
+    ['escola-list', 'turma-list', 'aluno-list', 'caderno-list', 'provaaluno-list', 'resposta-list'],
+)
+def test_tenant_lists_run_a_constant_number_of_queries(url_name, volume, django_assert_num_queries):
+    user = baker.make('core.User', secretaria_id=volume.secretaria_id, role='admin')
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    # COUNT(*) for the page metadata plus the page itself (and one prefetch for cadernos).
+    expected = 3 if url_name == 'caderno-list' else 2
+    with django_assert_num_queries(expected):
+        response = client.get(reverse(url_name))
+    assert response.status_code == 200
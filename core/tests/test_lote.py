@@ -0,0 +1,157 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from avaliacoes.qr import ler_token
+from core.versioning import obter_versao
+from relatorios.models import FatoResultado
+from respostas.models import Gabarito, Resposta
+
+
+@pytest.mark.django_db
+def test_bulk_create_answer_key_in_one_request(admin, cliente_api, montar_avaliacao):
+    itens = montar_avaliacao(admin.secretaria, habilidades=baker.make('itens.Habilidade', _quantity=40)).cqs
+    versao = obter_versao(Gabarito, admin.secretaria_id)
+    payload = [{'caderno_questao': cq.id, 'alternativa_correta': 'abcde'[cq.ordem % 5]} for cq in itens]
+
+    with CaptureQueriesContext(connection) as consultas:
+        response = cliente_api(admin).post(reverse('gabarito-lote'), payload, format='json')
+
+    assert response.status_code == 201
+    assert [gabarito['caderno_questao'] for gabarito in response.json()] == [cq.id for cq in itens]
+    assert Gabarito.objects.filter(secretaria=admin.secretaria).count() == 40
+    assert Gabarito.objects.get(caderno_questao=itens[0]).alternativa_correta == 'B'
+    # Relations, uniqueness, insert and re-read are each a single query, not one per row.
+    assert len(consultas.captured_queries) < 12
+    assert obter_versao(Gabarito, admin.secretaria_id) > versao
+
+
+@pytest.mark.django_db
+def test_bulk_validation_reports_each_item_and_writes_nothing(admin, cliente_api, montar_avaliacao):
+    itens = montar_avaliacao(admin.secretaria, habilidades=baker.make('itens.Habilidade', _quantity=3)).cqs
+    baker.make('respostas.Gabarito', secretaria=admin.secretaria, caderno_questao=itens[0], alternativa_correta='A')
+    alheios = montar_avaliacao(baker.make('core.Secretaria'), habilidades=[baker.make('itens.Habilidade')]).cqs
+    payload = [
+        {'caderno_questao': itens[1].id, 'alternativa_correta': 'A'},
+        {'caderno_questao': itens[0].id, 'alternativa_correta': 'B'},
+        {'caderno_questao': itens[1].id, 'alternativa_correta': 'C'},
+        {'caderno_questao': alheios[0].id, 'alternativa_correta': 'D'},
+        {'caderno_questao': itens[2].id, 'alternativa_correta': 'Z'},
+    ]
+
+    response = cliente_api(admin).post(reverse('gabarito-lote'), payload, format='json')
+
+    assert response.status_code == 400
+    assert set(response.json()) == {'1', '2', '3', '4'}
+    assert 'caderno_questao' in response.json()['3']
+    assert 'alternativa_correta' in response.json()['4']
+    assert Gabarito.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_bulk_update_and_delete_stay_within_the_tenant(admin, cliente_api):
+    turma = baker.make('escolas.Turma', secretaria=admin.secretaria)
+    outra_turma = baker.make('escolas.Turma', secretaria=admin.secretaria)
+    alunos = baker.make('escolas.Aluno', secretaria=admin.secretaria, turma=turma, _quantity=3)
+    alheio = baker.make('escolas.Aluno')
+    client = cliente_api(admin)
+    url = reverse('aluno-lote')
+
+    response = client.patch(
+        url, [{'id': alunos[0].id, 'nome': 'Ana'}, {'id': alunos[1].id, 'turma': outra_turma.id}], format='json'
+    )
+    assert response.status_code == 200
+    alunos[0].refresh_from_db()
+    alunos[1].refresh_from_db()
+    assert (alunos[0].nome, alunos[1].turma_id) == ('Ana', outra_turma.id)
+
+    assert client.patch(url, [{'id': alheio.id, 'nome': 'X'}], format='json').status_code == 404
+    assert client.delete(url, [alunos[2].id, alheio.id], format='json').status_code == 404
+    assert client.delete(url, [alunos[1].id, alunos[2].id], format='json').status_code == 204
+    assert list(admin.secretaria.aluno_set.values_list('id', flat=True)) == [alunos[0].id]
+    assert client.patch(url, [{'nome': 'sem id'}], format='json').json() == {'0': {'id': ['Informe o id do registro.']}}
+
+
+@pytest.mark.django_db
+def test_bulk_roles_follow_single_object_actions(admin, cliente_api):
+    professor = baker.make('core.User', secretaria=admin.secretaria, role='professor')
+    questao = baker.make('itens.Questao', secretaria=admin.secretaria)
+    client = cliente_api(professor)
+    url = reverse('questao-lote')
+
+    assert client.delete(url, [questao.id], format='json').status_code == 403
+    dados = {'enunciado': 'E', 'correta': 'A', 'status': 'aprovada'}
+    dados.update({f'alternativa_{letra}': letra for letra in 'abcde'})
+    response = client.post(url, [dados], format='json')
+    assert response.status_code == 201
+    # Professors still cannot approve their own questões.
+    assert response.json()[0]['status'] == 'pendente'
+
+    assert cliente_api(admin).post(reverse('loteimpressao-lote'), [{}], format='json').status_code == 405
+
+
+@pytest.mark.django_db
+def test_bulk_hooks_fill_analytics_qr_payloads_and_m2m(admin, cliente_api, montar_avaliacao):
+    montada = montar_avaliacao(admin.secretaria, habilidades=baker.make('itens.Habilidade', _quantity=2))
+    caderno, itens = montada.caderno, montada.cqs
+    turma = baker.make('escolas.Turma', secretaria=admin.secretaria)
+    aluno = baker.make('escolas.Aluno', secretaria=admin.secretaria, turma=turma)
+    client = cliente_api(admin)
+
+    prova = client.post(
+        reverse('provaaluno-lote'),
+        [{'avaliacao': caderno.avaliacao_id, 'aluno': aluno.id, 'caderno': caderno.id}],
+        format='json',
+    ).json()[0]
+    assert ler_token(prova['qr_payload']['qr_token']).prova_id == prova['id']
+
+    response = client.post(
+        reverse('resposta-lote'),
+        [{'prova_aluno': prova['id'], 'caderno_questao': cq.id, 'alternativa': 'a'} for cq in itens],
+        format='json',
+    )
+    assert response.status_code == 201
+    resposta = Resposta.objects.get(caderno_questao=itens[0])
+    assert (resposta.avaliacao_id, resposta.turma_id, resposta.escola_id) == (
+        caderno.avaliacao_id, turma.id, turma.escola_id
+    )
+    assert resposta.habilidade_id == itens[0].questao.habilidade_id
+
+    avaliacoes = client.post(
+        reverse('avaliacao-lote'),
+        [{'titulo': 'A', 'data_aplicacao': '2026-05-01', 'turmas': [turma.id]}],
+        format='json',
+    ).json()
+    assert avaliacoes[0]['turmas'] == [turma.id]
+
+
+@pytest.mark.django_db
+def test_bulk_answers_refuse_a_closed_avaliacao_and_refresh_facts(
+    admin, cliente_api, montar_avaliacao, django_capture_on_commit_callbacks
+):
+    montada = montar_avaliacao(admin.secretaria, habilidades=baker.make('itens.Habilidade', _quantity=2))
+    caderno, itens = montada.caderno, montada.cqs
+    turma = baker.make('escolas.Turma', secretaria=admin.secretaria)
+    aluno = baker.make('escolas.Aluno', secretaria=admin.secretaria, turma=turma)
+    prova = baker.make(
+        'avaliacoes.ProvaAluno', secretaria=admin.secretaria, avaliacao=caderno.avaliacao, aluno=aluno, caderno=caderno
+    )
+    client = cliente_api(admin)
+    url = reverse('resposta-lote')
+    payload = [{'prova_aluno': prova.id, 'caderno_questao': cq.id, 'alternativa': 'A', 'correta': True} for cq in itens]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert client.post(url, payload, format='json').status_code == 201
+    fatos = FatoResultado.objects.filter(avaliacao=caderno.avaliacao, turma=turma)
+    assert sum(fatos.values_list('acertos', flat=True)) == 2
+
+    caderno.avaliacao.encerrada_em = timezone.now()
+    caderno.avaliacao.save()
+    ids = list(Resposta.objects.values_list('id', flat=True))
+    response = client.patch(url, [{'id': ids[0], 'alternativa': 'B'}], format='json')
+    assert response.status_code == 409
+    assert client.delete(url, ids, format='json').status_code == 409
+    assert list(Resposta.objects.values_list('alternativa', flat=True)) == ['A', 'A']
@@ -0,0 +1,72 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from core import pagination
+
+
+@pytest.fixture
+def client_admin():
+    secretaria = baker.make('core.Secretaria')
+    turma = baker.make('escolas.Turma', secretaria=secretaria)
+    baker.make('escolas.Aluno', secretaria=secretaria, turma=turma, _quantity=25)
+    baker.make('escolas.Aluno', _quantity=3)
+    client = APIClient()
+    client.force_authenticate(user=baker.make('core.User', secretaria=secretaria, role='admin'))
+    return client
+
+
+@pytest.mark.django_db
+def test_cursor_mode_walks_every_row_without_count_or_offset(client_admin):
+    url = reverse('aluno-list')
+    vistos = []
+    pagina = client_admin.get(url, {'paginacao': 'cursor', 'page_size': 10})
+    while True:
+        assert pagina.status_code == 200
+        dados = pagina.json()
+        assert 'count' not in dados
+        vistos.extend(aluno['id'] for aluno in dados['results'])
+        if not dados['next']:
+            break
+        with CaptureQueriesContext(connection) as consultas:
+            pagina = client_admin.get(dados['next'])
+        sql = ' '.join(consulta['sql'] for consulta in consultas.captured_queries).upper()
+        assert 'COUNT(' not in sql and 'OFFSET' not in sql
+
+    assert len(vistos) == 25
+    assert vistos == sorted(vistos)
+
+
+@pytest.mark.django_db
+def test_cursor_mode_respects_ordering_param(client_admin):
+    response = client_admin.get(reverse('aluno-list'), {'paginacao': 'cursor', 'ordering': '-id'})
+
+    ids = [aluno['id'] for aluno in response.json()['results']]
+    assert ids == sorted(ids, reverse=True)
+
+
+@pytest.mark.django_db
+def test_estimated_count_uses_planner_estimate_for_large_tables(client_admin, monkeypatch):
+    url = reverse('aluno-list')
+
+    # Without a planner estimate (SQLite) the exact count is kept and not flagged.
+    exata = client_admin.get(url, {'contagem': 'estimada'}).json()
+    assert exata['count'] == 25
+    assert 'count_estimado' not in exata
+
+    # Below the threshold the estimate is replaced by the exact count too.
+    monkeypatch.setattr(pagination, 'linhas_estimadas', lambda queryset: pagination.LIMIAR_CONTAGEM_EXATA - 1)
+    pequena = client_admin.get(url, {'contagem': 'estimada'}).json()
+    assert pequena['count'] == 25
+    assert 'count_estimado' not in pequena
+
+    monkeypatch.setattr(pagination, 'linhas_estimadas', lambda queryset: 2_000_000)
+    with CaptureQueriesContext(connection) as consultas:
+        estimada = client_admin.get(url, {'contagem': 'estimada'}).json()
+    assert (estimada['count'], estimada['count_estimado']) == (2_000_000, True)
+    assert not any('COUNT(' in consulta['sql'].upper() for consulta in consultas.captured_queries)
+
+    assert client_admin.get(url).json()['count'] == 25
@@ -0,0 +1,73 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Sum
+
+from core.sinteticos import ParametrosSinteticos, _cpf, gerar_dados_sinteticos
+from escolas.importacao import normalizar_cpf
+from relatorios.models import FatoResultado
+from respostas.models import Gabarito, Resposta
+
+PEQUENO = dict(
+    escolas=2, turmas_por_escola=2, alunos_por_turma=5, habilidades=3, competencias=2, questoes=12,
+    avaliacoes=2, cadernos_por_avaliacao=2, questoes_por_caderno=6, taxa_omissao=0.1, tamanho_lote=7,
+)
+
+
+def _assinatura(secretaria_id):
+    respostas = Resposta.objects.filter(secretaria_id=secretaria_id).order_by('id')
+    return [
+        (resposta.prova_aluno.aluno.nome, resposta.caderno_questao.ordem, resposta.alternativa, resposta.correta)
+        for resposta in respostas.select_related('prova_aluno__aluno', 'caderno_questao')
+    ]
+
+
+@pytest.mark.django_db
+def test_generator_is_deterministic_and_consistent():
+    primeiro = gerar_dados_sinteticos(ParametrosSinteticos(**PEQUENO, seed=7))
+    segundo = gerar_dados_sinteticos(ParametrosSinteticos(**PEQUENO, seed=7))
+
+    contagens = primeiro.contagens
+    assert (contagens['alunos'], contagens['provas'], contagens['gabaritos']) == (20, 40, 24)
+    assert 0 < contagens['respostas'] <= 40 * 6
+    assert _assinatura(primeiro.secretaria_ids[0]) == _assinatura(segundo.secretaria_ids[0])
+
+    respostas = Resposta.objects.filter(secretaria_id=primeiro.secretaria_ids[0]).select_related(
+        'caderno_questao__gabarito'
+    )
+    for resposta in respostas:
+        assert resposta.correta == (resposta.alternativa == resposta.caderno_questao.gabarito.alternativa_correta)
+        assert resposta.avaliacao_id and resposta.turma_id and resposta.escola_id
+    assert Gabarito.objects.filter(secretaria_id=primeiro.secretaria_ids[0]).count() == 24
+
+    fatos = FatoResultado.objects.filter(secretaria_id=primeiro.secretaria_ids[0])
+    assert fatos.count() == contagens['fatos_resultado'] > 0
+    assert fatos.aggregate(total=Sum('total'))['total'] == respostas.count()
+    assert fatos.aggregate(acertos=Sum('acertos'))['acertos'] == respostas.filter(correta=True).count()
+
+
+@pytest.mark.django_db
+def test_cpfs_are_valid():
+    for numero in (1, 123456789, 987654321):
+        cpf = _cpf(numero)
+        assert normalizar_cpf(cpf) == cpf
+        corpo = [int(digito) for digito in cpf]
+        for tamanho in (9, 10):
+            soma = sum(valor * peso for valor, peso in zip(corpo, range(tamanho + 1, 1, -1)))
+            assert corpo[tamanho] == soma * 10 % 11 % 10
+
+
+@pytest.mark.django_db
+def test_command_generates_dataset_with_users():
+    opcoes = dict(escolas=1, turmas_por_escola=1, alunos_por_turma=3, questoes=5, questoes_por_caderno=5,
+                  avaliacoes=1, seed=3)
+    call_command('gerar_dados_sinteticos', senha_usuarios='senha-teste', **opcoes)
+    primeira = get_user_model().objects.get(username='sint3_1_admin').secretaria_id
+
+    # Rerunning with the same seed moves the logins to the new dataset.
+    call_command('gerar_dados_sinteticos', senha_usuarios='outra-senha', **opcoes)
+
+    admin = get_user_model().objects.get(username='sint3_1_admin')
+    assert admin.check_password('outra-senha')
+    assert admin.secretaria_id != primeira
+    assert Resposta.objects.filter(secretaria_id=admin.secretaria_id).exists()
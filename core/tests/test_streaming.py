@@ -0,0 +1,48 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from avaliacoes.views import CadernoViewSet
+
+
+@pytest.mark.django_db
+def test_unpaginated_list_streams_chunks_with_prefetches(monkeypatch):
+    secretaria = baker.make('core.Secretaria')
+    avaliacao = baker.make('avaliacoes.Avaliacao', secretaria=secretaria)
+    cadernos = baker.make('avaliacoes.Caderno', secretaria=secretaria, avaliacao=avaliacao, _quantity=7)
+    for caderno in cadernos:
+        baker.make('avaliacoes.CadernoQuestao', caderno=caderno, ordem=1)
+    baker.make('avaliacoes.Caderno', _quantity=2)
+    client = APIClient()
+    client.force_authenticate(user=baker.make('core.User', secretaria=secretaria, role='admin'))
+    monkeypatch.setattr(CadernoViewSet, 'stream_chunk_size', 3)
+
+    response = client.get(reverse('caderno-list'), {'page_size': 0})
+    assert response.status_code == 200
+    assert response.streaming
+    assert response['Content-Type'] == 'application/json'
+
+    with CaptureQueriesContext(connection) as consultas:
+        pedacos = list(response.streaming_content)
+    dados = json.loads(b''.join(pedacos))
+
+    assert [caderno['id'] for caderno in dados] == [caderno.id for caderno in cadernos]
+    assert all(len(caderno['cadernoquestao_set']) == 1 for caderno in dados)
+    # One cursor read in chunks for the rows, plus one prefetch query per chunk of three.
+    assert len(pedacos) == 5
+    assert len(consultas.captured_queries) == 4
+
+
+@pytest.mark.django_db
+def test_empty_unpaginated_list_is_valid_json():
+    client = APIClient()
+    client.force_authenticate(user=baker.make('core.User', secretaria=baker.make('core.Secretaria'), role='admin'))
+
+    response = client.get(reverse('escola-list'), {'page_size': 0})
+
+    assert json.loads(b''.join(response.streaming_content)) == []
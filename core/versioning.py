@@ -0,0 +1,72 @@
+"""Per-tenant, per-model change stamps used to key caches of derived data.
+
+Every write to a tracked model bumps the stamp of its secretaria and the global
+stamp (used for superadmin views). Stamps are nanosecond timestamps, so they also
+work as ``Last-Modified`` values. Writes that bypass model signals (``bulk_create``,
+``bulk_update``, ``QuerySet.update``) must call :func:`marcar_alteracao` themselves.
+
+Inside a transaction the stamp is bumped twice: at once, so caches keyed by the
+old stamp stop being served, and again on commit, so anything a concurrent reader
+cached from the still-uncommitted state is keyed by a stamp that is never reused.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Iterable, Optional, Type, Union
+
+from django.core.cache import cache
+from django.db import models, transaction
+
+GLOBAL = '*'
+
+ModelRef = Union[Type[models.Model], models.Model, str]
+
+
+def _label(model: ModelRef) -> str:
+    if isinstance(model, str):
+        return model.lower()
+    return model._meta.label_lower
+
+
+def _key(model: ModelRef, secretaria_id: Optional[int]) -> str:
+    escopo = GLOBAL if secretaria_id is None else secretaria_id
+    return f'versao:{_label(model)}:{escopo}'
+
+
+def obter_versao(model: ModelRef, secretaria_id: Optional[int] = None) -> int:
+    """Return the current stamp, initialising it when the cache has none."""
+
+    chave = _key(model, secretaria_id)
+    versao = cache.get(chave)
+    if versao is None:
+        versao = time.time_ns()
+        # add() keeps a stamp written concurrently by another process.
+        if not cache.add(chave, versao, timeout=None):
+            versao = cache.get(chave, versao)
+    return versao
+
+
+def obter_versoes(modelos: Iterable[ModelRef], secretaria_id: Optional[int] = None) -> tuple[int, ...]:
+    return tuple(obter_versao(model, secretaria_id) for model in modelos)
+
+
+def marcar_alteracao(model: ModelRef, secretaria_id: Optional[int] = None) -> int:
+    """Bump the stamp of ``model`` for the secretaria and globally.
+
+    Within an atomic block the bump is repeated once the transaction commits.
+    """
+
+    versao = _gravar_versao(model, secretaria_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _gravar_versao(model, secretaria_id, depois_de=versao))
+    return versao
+
+
+def _gravar_versao(model: ModelRef, secretaria_id: Optional[int], depois_de: int = 0) -> int:
+    versao = max(time.time_ns(), depois_de + 1)
+    valores = {_key(model, None): versao}
+    if secretaria_id is not None:
+        valores[_key(model, secretaria_id)] = versao
+    cache.set_many(valores, timeout=None)
+    return versao
@@ -3,10 +3,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from avaliacoes.models import Avaliacao
-from escolas.models import Escola, Turma, Aluno
-from itens.models import Questao
-
+from .dashboard import resumo_dashboard
 from .models import Secretaria
 from .serializers import SecretariaSerializer
 
@@ -19,19 +16,8 @@ class DashboardSummaryView(APIView):
         secretaria_id = getattr(user, 'secretaria_id', None)
         is_superadmin = getattr(user, 'role', '') == 'superadmin'
 
-        filters = {}
-        if not is_superadmin and secretaria_id:
-            filters['secretaria_id'] = secretaria_id
-
-        summary = {
-            'escolas': Escola.objects.filter(**filters).count(),
-            'turmas': Turma.objects.filter(**filters).count(),
-            'alunos': Aluno.objects.filter(**filters).count(),
-            'questoes': Questao.objects.filter(**filters).count(),
-            'avaliacoes': Avaliacao.objects.filter(**filters).count(),
-        }
-
-        return Response(summary)
+        escopo = secretaria_id if not is_superadmin and secretaria_id else None
+        return Response(resumo_dashboard(escopo))
 
 
 class IsSuperAdmin(permissions.BasePermission):
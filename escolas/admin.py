@@ -1,7 +1,8 @@
 from django.contrib import admin
 
-from .models import Aluno, Escola, Turma
+from .models import Aluno, Escola, ImportacaoCadastro, Turma
 
 admin.site.register(Escola)
 admin.site.register(Turma)
 admin.site.register(Aluno)
+admin.site.register(ImportacaoCadastro)
@@ -0,0 +1,527 @@
+"""Streaming bulk import of student rosters.
+
+Rows are validated in chunks against the secretaria's turma ids (fetched once) and
+written with ``bulk_create``/``bulk_update`` inside one transaction per chunk, so a
+bad row is reported instead of aborting the whole file. Students are matched by
+CPF within the secretaria: a known CPF updates the existing aluno.
+
+``importar_cadastro`` does the same for full rosters (escola, turma, aluno per row,
+from CSV or XLSX), resolving schools and classes in memory and creating the missing
+ones in bulk; uploads run it as a background ``ImportacaoCadastro`` job.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import re
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import timedelta
+from itertools import count, islice
+from pathlib import Path
+from typing import IO, Any, Callable, Iterable, Iterator, Optional
+
+import openpyxl
+from django.db import transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.jobs import disparar
+from core.versioning import marcar_alteracao
+from respostas.services import sincronizar_analiticos
+
+from .models import Aluno, Escola, ImportacaoCadastro, Turma
+
+TAMANHO_LOTE_PADRAO = 2000
+CAMPOS_REJEITADOS = ('linha', 'motivo', 'turma_id', 'nome', 'cpf')
+COLUNAS_CADASTRO = ('escola', 'codigo_inep', 'turma', 'ano', 'aluno', 'cpf')
+COLUNAS_CADASTRO_OBRIGATORIAS = ('escola',)
+FORMATOS_CADASTRO = ('csv', 'xlsx')
+# Rejected rows kept on the job; the counter still reports the full number.
+LIMITE_REJEITADAS_REGISTRADAS = 1000
+# An import still running but not updated for this long lost its worker.
+IMPORTACAO_INATIVA_APOS = timedelta(minutes=15)
+
+_CPF_RE = re.compile(r'(\d{11}|\d{3}\.\d{3}\.\d{3}-\d{2})')
+
+
+class LinhaInvalida(ValueError):
+    pass
+
+
+@dataclass
+class ResultadoImportacao:
+    simulacao: bool = False
+    lidas: int = 0
+    criadas: int = 0
+    atualizadas: int = 0
+    escolas_criadas: int = 0
+    turmas_criadas: int = 0
+    rejeitadas: list[dict[str, Any]] = field(default_factory=list)
+    # Rejected rows of a resumed run that were not kept on the job.
+    rejeitadas_omitidas: int = 0
+    duracao_s: float = 0.0
+
+    @property
+    def linhas_por_segundo(self) -> Optional[float]:
+        return round(self.lidas / self.duracao_s, 1) if self.duracao_s else None
+
+    @property
+    def total_rejeitadas(self) -> int:
+        return len(self.rejeitadas) + self.rejeitadas_omitidas
+
+    def rejeitar(self, linha: int, motivo: str, dados: dict[str, Any]) -> None:
+        valores = {str(chave): '' if valor is None else str(valor) for chave, valor in dados.items() if chave}
+        self.rejeitadas.append({'linha': linha, 'motivo': motivo, **valores})
+
+    def resumo(self) -> dict[str, Any]:
+        return {
+            'simulacao': self.simulacao,
+            'lidas': self.lidas,
+            'criadas': self.criadas,
+            'atualizadas': self.atualizadas,
+            'escolas_criadas': self.escolas_criadas,
+            'turmas_criadas': self.turmas_criadas,
+            'rejeitadas': self.total_rejeitadas,
+            'duracao_s': round(self.duracao_s, 3),
+            'linhas_por_segundo': self.linhas_por_segundo,
+        }
+
+
+def normalizar_cpf(valor: Optional[str]) -> str:
+    """Return the CPF digits, ``''`` when blank; raise for anything else."""
+
+    cpf = (valor or '').strip()
+    if not cpf:
+        return ''
+    if not _CPF_RE.fullmatch(cpf):
+        raise LinhaInvalida('CPF inválido: informe 11 dígitos (com ou sem pontuação).')
+    return re.sub(r'\D', '', cpf)
+
+
+def _formatar_cpf(digitos: str) -> str:
+    return f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'
+
+
+def _validar(dados: dict[str, Any], turmas_validas: set[int]) -> tuple[int, str, str]:
+    try:
+        turma_id = int(str(dados.get('turma_id') or '').strip())
+    except ValueError:
+        raise LinhaInvalida('turma_id ausente ou não numérico.') from None
+    if turma_id not in turmas_validas:
+        raise LinhaInvalida('Turma não encontrada nesta secretaria.')
+    nome = str(dados.get('nome') or '').strip()
+    if not nome:
+        raise LinhaInvalida('Nome do aluno não pode ser vazio.')
+    if len(nome) > Aluno._meta.get_field('nome').max_length:
+        raise LinhaInvalida('Nome do aluno excede 255 caracteres.')
+    return turma_id, nome, normalizar_cpf(dados.get('cpf'))
+
+
+def _blocos(linhas: Iterable[dict[str, Any]], tamanho: int,
+            pular: int = 0) -> Iterator[list[tuple[int, dict[str, Any]]]]:
+    # Line 1 is the CSV header, so data rows start at 2.
+    numeradas = enumerate(islice(linhas, pular, None), start=2 + pular)
+    while bloco := list(islice(numeradas, tamanho)):
+        yield bloco
+
+
+def _existentes_por_cpf(secretaria_id: int, cpfs: set[str]) -> dict[str, Aluno]:
+    if not cpfs:
+        return {}
+    # Stored CPFs may be bare digits or punctuated; match both spellings.
+    variantes = [cpf for digitos in cpfs for cpf in (digitos, _formatar_cpf(digitos))]
+    existentes = {}
+    for aluno in Aluno.objects.filter(secretaria_id=secretaria_id, cpf__in=variantes).only(
+        'id', 'secretaria_id', 'turma_id', 'nome', 'cpf'
+    ).order_by('id'):
+        existentes.setdefault(re.sub(r'\D', '', aluno.cpf), aluno)
+    return existentes
+
+
+def _gravar_alunos(
+    bloco: list[tuple[int, dict[str, Any]]],
+    secretaria_id: int,
+    turmas_validas: set[int],
+    cpfs_vistos: set[str],
+    resultado: ResultadoImportacao,
+    simular: bool,
+    originais: Optional[dict[int, dict[str, Any]]] = None,
+) -> None:
+    originais = originais or {}
+    validas = []
+    for numero, dados in bloco:
+        try:
+            turma_id, nome, cpf = _validar(dados, turmas_validas)
+        except LinhaInvalida as exc:
+            resultado.rejeitar(numero, str(exc), originais.get(numero, dados))
+            continue
+        if cpf and cpf in cpfs_vistos:
+            resultado.rejeitar(numero, 'CPF repetido no arquivo.', originais.get(numero, dados))
+            continue
+        if cpf:
+            cpfs_vistos.add(cpf)
+        validas.append((turma_id, nome, cpf, str(dados.get('cpf') or '').strip()))
+
+    existentes = _existentes_por_cpf(secretaria_id, {cpf for _, _, cpf, _ in validas if cpf})
+    novos, alterados = [], []
+    for turma_id, nome, cpf, cpf_original in validas:
+        aluno = existentes.get(cpf) if cpf else None
+        if aluno is None:
+            novos.append(Aluno(secretaria_id=secretaria_id, turma_id=turma_id, nome=nome, cpf=cpf_original))
+        elif (aluno.turma_id, aluno.nome) != (turma_id, nome):
+            aluno.turma_id, aluno.nome = turma_id, nome
+            alterados.append(aluno)
+
+    if not simular and (novos or alterados):
+        with transaction.atomic():
+            Aluno.objects.bulk_create(novos, batch_size=len(bloco))
+            Aluno.objects.bulk_update(alterados, ['turma_id', 'nome'], batch_size=len(bloco))
+            sincronizar_analiticos(alterados)
+    resultado.criadas += len(novos)
+    resultado.atualizadas += len(alterados)
+
+
+def _finalizar(resultado: ResultadoImportacao, secretaria_id: int, inicio: float) -> ResultadoImportacao:
+    if not resultado.simulacao:
+        if resultado.escolas_criadas:
+            marcar_alteracao(Escola, secretaria_id)
+        if resultado.turmas_criadas:
+            marcar_alteracao(Turma, secretaria_id)
+        if resultado.criadas or resultado.atualizadas:
+            marcar_alteracao(Aluno, secretaria_id)
+    resultado.duracao_s = time.perf_counter() - inicio
+    return resultado
+
+
+def importar_alunos(
+    linhas: Iterable[dict[str, Any]],
+    secretaria_id: int,
+    tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+    simular: bool = False,
+) -> ResultadoImportacao:
+    """Import ``turma_id``/``nome``/``cpf`` rows for a secretaria.
+
+    ``linhas`` is consumed lazily (e.g. a ``csv.DictReader``), so memory stays bounded
+    by ``tamanho_lote``. With ``simular`` nothing is written but the counts and the
+    rejected rows are the same as a real run.
+    """
+
+    resultado = ResultadoImportacao(simulacao=simular)
+    inicio = time.perf_counter()
+    turmas_validas = set(Turma.objects.filter(secretaria_id=secretaria_id).values_list('id', flat=True))
+    cpfs_vistos: set[str] = set()
+    for bloco in _blocos(linhas, max(1, tamanho_lote)):
+        resultado.lidas += len(bloco)
+        _gravar_alunos(bloco, secretaria_id, turmas_validas, cpfs_vistos, resultado, simular)
+    return _finalizar(resultado, secretaria_id, inicio)
+
+
+# Roster files (escola/turma/aluno per row) ------------------------------------------
+
+
+def _normalizar_coluna(nome: Any) -> str:
+    texto = unicodedata.normalize('NFKD', str(nome or '')).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'\W+', '_', texto.strip().lower()).strip('_')
+
+
+def _texto_celula(valor: Any, coluna: str) -> str:
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    if isinstance(valor, int) and coluna == 'cpf':
+        # Spreadsheets store CPFs as numbers and drop the leading zeros.
+        return str(valor).zfill(11)
+    return str(valor).strip()
+
+
+def _linhas_csv(arquivo: IO[bytes]) -> Iterator[list[str]]:
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    try:
+        primeira = texto.readline()
+        delimitador = ';' if primeira.count(';') >= primeira.count(',') else ','
+        yield from csv.reader([primeira], delimiter=delimitador)
+        yield from csv.reader(texto, delimiter=delimitador)
+    finally:
+        # Leave the caller's file open.
+        texto.detach()
+
+
+def _linhas_xlsx(arquivo: IO[bytes]) -> Iterator[tuple]:
+    planilha = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        yield from planilha.worksheets[0].iter_rows(values_only=True)
+    finally:
+        planilha.close()
+
+
+def ler_planilha(arquivo: IO[bytes], formato: str) -> Iterator[dict[str, str]]:
+    """Yield each data row as a dict keyed by normalised header names.
+
+    Both readers stream: XLSX files are opened in openpyxl's read-only mode.
+    """
+
+    linhas = _linhas_xlsx(arquivo) if formato == 'xlsx' else _linhas_csv(arquivo)
+    cabecalho = [_normalizar_coluna(coluna) for coluna in next(linhas, None) or []]
+    for valores in linhas:
+        linha = {
+            coluna: _texto_celula(valor, coluna) for coluna, valor in zip(cabecalho, valores) if coluna
+        }
+        if any(linha.values()):
+            yield linha
+
+
+def formato_do_arquivo(nome: str) -> Optional[str]:
+    extensao = Path(nome or '').suffix.lower().lstrip('.')
+    return extensao if extensao in FORMATOS_CADASTRO else None
+
+
+def validar_cabecalho(arquivo: IO[bytes], formato: str) -> list[str]:
+    """Return the missing required columns of an uploaded roster (rewinds the file)."""
+
+    try:
+        linhas = _linhas_xlsx(arquivo) if formato == 'xlsx' else _linhas_csv(arquivo)
+        cabecalho = {_normalizar_coluna(coluna) for coluna in next(linhas, None) or []}
+        linhas.close()
+    finally:
+        arquivo.seek(0)
+    return [coluna for coluna in COLUNAS_CADASTRO_OBRIGATORIAS if coluna not in cabecalho]
+
+
+class _Hierarquia:
+    """In-memory index of the secretaria's escolas and turmas, grown as rows create them."""
+
+    def __init__(self, secretaria_id: int, simular: bool):
+        self.secretaria_id = secretaria_id
+        self.simular = simular
+        # Simulated inserts get negative ids so they never clash with real rows.
+        self._ids_simulados = count(-1, -1)
+        self.escolas: dict[tuple[str, str], int] = {}
+        for escola_id, nome, codigo_inep in Escola.objects.filter(secretaria_id=secretaria_id).values_list(
+            'id', 'nome', 'codigo_inep'
+        ).order_by('id'):
+            self.escolas.setdefault(('nome', nome.casefold()), escola_id)
+            if codigo_inep:
+                self.escolas.setdefault(('inep', codigo_inep), escola_id)
+        self.turmas: dict[tuple[int, str, str], int] = {}
+        for turma_id, escola_id, nome, ano in Turma.objects.filter(secretaria_id=secretaria_id).values_list(
+            'id', 'escola_id', 'nome', 'ano'
+        ).order_by('id'):
+            self.turmas.setdefault((escola_id, nome.casefold(), ano.casefold()), turma_id)
+        self.turmas_validas = set(self.turmas.values())
+
+    @staticmethod
+    def chaves_escola(nome: str, codigo_inep: str) -> list[tuple[str, str]]:
+        chaves = [('inep', codigo_inep)] if codigo_inep else []
+        return chaves + [('nome', nome.casefold())] if nome else chaves
+
+    def escola_id(self, nome: str, codigo_inep: str) -> Optional[int]:
+        for chave in self.chaves_escola(nome, codigo_inep):
+            if chave in self.escolas:
+                return self.escolas[chave]
+        return None
+
+    def criar_escolas(self, novas: dict[tuple[str, str], Escola]) -> int:
+        objetos = list({id(escola): escola for escola in novas.values()}.values())
+        if self.simular:
+            for escola in objetos:
+                escola.id = next(self._ids_simulados)
+        else:
+            Escola.objects.bulk_create(objetos)
+        for escola in objetos:
+            for chave in self.chaves_escola(escola.nome, escola.codigo_inep):
+                self.escolas.setdefault(chave, escola.id)
+        return len(objetos)
+
+    def criar_turmas(self, novas: dict[tuple[int, str, str], Turma]) -> int:
+        objetos = list(novas.values())
+        if self.simular:
+            for turma in objetos:
+                turma.id = next(self._ids_simulados)
+        else:
+            Turma.objects.bulk_create(objetos)
+        for chave, turma in novas.items():
+            self.turmas[chave] = turma.id
+            self.turmas_validas.add(turma.id)
+        return len(objetos)
+
+
+def _validar_hierarquia(dados: dict[str, str]) -> tuple[str, str, str, str]:
+    escola, codigo_inep = dados.get('escola', ''), dados.get('codigo_inep', '')
+    turma, ano, aluno = dados.get('turma', ''), dados.get('ano', ''), dados.get('aluno', '')
+    if not escola and not codigo_inep:
+        raise LinhaInvalida('Informe o nome ou o código INEP da escola.')
+    if codigo_inep and not re.fullmatch(r'\d{8}', codigo_inep):
+        raise LinhaInvalida('Informe um código INEP com 8 dígitos numéricos.')
+    if len(escola) > Escola._meta.get_field('nome').max_length:
+        raise LinhaInvalida('Nome da escola excede 255 caracteres.')
+    if (aluno or dados.get('cpf')) and not (turma and ano):
+        raise LinhaInvalida('Informe turma e ano para cadastrar o aluno.')
+    if bool(turma) != bool(ano):
+        raise LinhaInvalida('Turma e ano devem ser informados juntos.')
+    if len(turma) > Turma._meta.get_field('nome').max_length or len(ano) > Turma._meta.get_field('ano').max_length:
+        raise LinhaInvalida('Turma ou ano excede o tamanho permitido.')
+    return escola, codigo_inep, turma, ano
+
+
+def _gravar_cadastro(
+    bloco: list[tuple[int, dict[str, str]]],
+    hierarquia: _Hierarquia,
+    cpfs_vistos: set[str],
+    resultado: ResultadoImportacao,
+) -> None:
+    validas = []
+    for numero, dados in bloco:
+        try:
+            validas.append((numero, dados, *_validar_hierarquia(dados)))
+        except LinhaInvalida as exc:
+            resultado.rejeitar(numero, str(exc), dados)
+
+    secretaria_id = hierarquia.secretaria_id
+    novas_escolas: dict[tuple[str, str], Escola] = {}
+    for _, _, escola, codigo_inep, _, _ in validas:
+        if hierarquia.escola_id(escola, codigo_inep) is not None:
+            continue
+        chaves = hierarquia.chaves_escola(escola, codigo_inep)
+        nova = next((novas_escolas[chave] for chave in chaves if chave in novas_escolas), None)
+        if nova is None:
+            # A school known only by its INEP code is named after it until renamed.
+            nova = Escola(secretaria_id=secretaria_id, nome=escola or codigo_inep, codigo_inep=codigo_inep)
+        for chave in chaves:
+            novas_escolas.setdefault(chave, nova)
+    resultado.escolas_criadas += hierarquia.criar_escolas(novas_escolas)
+
+    novas_turmas: dict[tuple[int, str, str], Turma] = {}
+    alunos, originais = [], {}
+    for numero, dados, escola, codigo_inep, turma, ano in validas:
+        if not turma:
+            continue
+        escola_id = hierarquia.escola_id(escola, codigo_inep)
+        chave = (escola_id, turma.casefold(), ano.casefold())
+        if chave not in hierarquia.turmas and chave not in novas_turmas:
+            novas_turmas[chave] = Turma(secretaria_id=secretaria_id, escola_id=escola_id, nome=turma, ano=ano)
+        if dados.get('aluno') or dados.get('cpf'):
+            alunos.append((numero, chave, dados.get('aluno', ''), dados.get('cpf', '')))
+            originais[numero] = dados
+    resultado.turmas_criadas += hierarquia.criar_turmas(novas_turmas)
+
+    bloco_alunos = [
+        (numero, {'turma_id': hierarquia.turmas[chave], 'nome': nome, 'cpf': cpf})
+        for numero, chave, nome, cpf in alunos
+    ]
+    _gravar_alunos(
+        bloco_alunos, secretaria_id, hierarquia.turmas_validas, cpfs_vistos, resultado, hierarquia.simular,
+        originais=originais,
+    )
+
+
+def importar_cadastro(
+    linhas: Iterable[dict[str, str]],
+    secretaria_id: int,
+    tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+    simular: bool = False,
+    progresso: Optional[Callable[[ResultadoImportacao], None]] = None,
+    retomar: Optional[ResultadoImportacao] = None,
+) -> ResultadoImportacao:
+    """Import roster rows (``escola``, ``codigo_inep``, ``turma``, ``ano``, ``aluno``, ``cpf``).
+
+    Escolas are matched by INEP code or name and turmas by escola, name and ano; the
+    missing ones are created in bulk before the chunk's alunos. Each chunk commits in
+    one transaction together with ``progresso``, so the counts it saves are a resume
+    point: ``retomar`` continues from them, skipping the ``lidas`` rows already done.
+    """
+
+    resultado = retomar or ResultadoImportacao(simulacao=simular)
+    inicio = time.perf_counter()
+    hierarquia = _Hierarquia(secretaria_id, simular)
+    cpfs_vistos: set[str] = set()
+    for bloco in _blocos(linhas, max(1, tamanho_lote), pular=resultado.lidas):
+        with transaction.atomic():
+            resultado.lidas += len(bloco)
+            _gravar_cadastro(bloco, hierarquia, cpfs_vistos, resultado)
+            if progresso is not None:
+                progresso(resultado)
+    return _finalizar(resultado, secretaria_id, inicio)
+
+
+def iniciar_importacao(secretaria_id: int, arquivo, formato: str, simular: bool = False) -> ImportacaoCadastro:
+    importacao = ImportacaoCadastro.objects.create(
+        secretaria_id=secretaria_id, arquivo=arquivo, formato=formato, simulacao=simular
+    )
+    disparar(processar_importacao, importacao.id)
+    importacao.refresh_from_db()
+    return importacao
+
+
+def _registrar_progresso(importacao: ImportacaoCadastro, resultado: ResultadoImportacao) -> None:
+    importacao.lidas = resultado.lidas
+    importacao.escolas_criadas = resultado.escolas_criadas
+    importacao.turmas_criadas = resultado.turmas_criadas
+    importacao.alunos_criados = resultado.criadas
+    importacao.alunos_atualizados = resultado.atualizadas
+    importacao.total_rejeitadas = resultado.total_rejeitadas
+    importacao.rejeitadas = resultado.rejeitadas[:LIMITE_REJEITADAS_REGISTRADAS]
+    importacao.save()
+
+
+def _resultado_salvo(importacao: ImportacaoCadastro) -> ResultadoImportacao:
+    return ResultadoImportacao(
+        simulacao=importacao.simulacao,
+        lidas=importacao.lidas,
+        criadas=importacao.alunos_criados,
+        atualizadas=importacao.alunos_atualizados,
+        escolas_criadas=importacao.escolas_criadas,
+        turmas_criadas=importacao.turmas_criadas,
+        rejeitadas=list(importacao.rejeitadas),
+        rejeitadas_omitidas=importacao.total_rejeitadas - len(importacao.rejeitadas),
+    )
+
+
+def processar_importacao(importacao_id: int) -> bool:
+    """Run (or resume) an import; return False when another worker owns it or it is done.
+
+    A job still ``executando`` but silent for ``IMPORTACAO_INATIVA_APOS`` lost its
+    worker and is claimed again; it resumes after the last committed chunk, so no
+    row (in particular alunos without CPF, which cannot be matched) is imported twice.
+    """
+
+    agora = timezone.now()
+    reivindicada = (
+        ImportacaoCadastro.objects.filter(pk=importacao_id)
+        .filter(
+            Q(status=ImportacaoCadastro.STATUS_PENDENTE)
+            | Q(status=ImportacaoCadastro.STATUS_EXECUTANDO, atualizado_em__lt=agora - IMPORTACAO_INATIVA_APOS)
+        )
+        .update(
+            status=ImportacaoCadastro.STATUS_EXECUTANDO,
+            iniciado_em=Coalesce('iniciado_em', Value(agora)),
+            atualizado_em=agora,
+        )
+    )
+    if not reivindicada:
+        return False
+
+    importacao = ImportacaoCadastro.objects.get(pk=importacao_id)
+    try:
+        with importacao.arquivo.open('rb') as arquivo:
+            resultado = importar_cadastro(
+                ler_planilha(arquivo, importacao.formato),
+                importacao.secretaria_id,
+                simular=importacao.simulacao,
+                progresso=lambda parcial: _registrar_progresso(importacao, parcial),
+                retomar=_resultado_salvo(importacao) if importacao.lidas else None,
+            )
+    except Exception as exc:
+        importacao.status = ImportacaoCadastro.STATUS_FALHOU
+        importacao.erro = str(exc)
+        importacao.save()
+        raise
+    importacao.status = ImportacaoCadastro.STATUS_CONCLUIDO
+    importacao.duracao_s = round(resultado.duracao_s, 3)
+    importacao.concluido_em = timezone.now()
+    _registrar_progresso(importacao, resultado)
+    return True
@@ -1,31 +1,62 @@
 import csv
 
 from django.contrib.auth import get_user_model
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
-from escolas.models import Aluno, Turma
+from escolas.importacao import CAMPOS_REJEITADOS, TAMANHO_LOTE_PADRAO, importar_alunos
 
 User = get_user_model()
 
 
 class Command(BaseCommand):
-    help = 'Importa alunos de um CSV com colunas: turma_id;nome;cpf'
+    help = (
+        'Importa alunos de um CSV com colunas: turma_id;nome;cpf. Alunos com CPF já cadastrado '
+        'na secretaria são atualizados; linhas inválidas são relatadas sem interromper a importação.'
+    )
 
     def add_arguments(self, parser):
         parser.add_argument('csv_path')
         parser.add_argument('--username', required=True, help='Usuário cujo secretaria_id será usado')
+        parser.add_argument(
+            '--batch-size', type=int, default=TAMANHO_LOTE_PADRAO,
+            help=f'Linhas por lote/transação (padrão: {TAMANHO_LOTE_PADRAO}).',
+        )
+        parser.add_argument('--delimitador', default=';', help='Separador de colunas (padrão: ;).')
+        parser.add_argument('--encoding', default='utf-8-sig', help='Codificação do arquivo (padrão: utf-8-sig).')
+        parser.add_argument('--rejeitados', help='Grava as linhas rejeitadas e o motivo neste CSV.')
+        parser.add_argument('--dry-run', action='store_true', help='Valida e contabiliza sem gravar nada.')
 
     def handle(self, *args, **options):
         user = User.objects.get(username=options['username'])
-        secretaria = user.secretaria
-        with open(options['csv_path'], newline='') as csvfile:
-            reader = csv.DictReader(csvfile, delimiter=';')
-            for row in reader:
-                turma = Turma.objects.get(id=row['turma_id'])
-                Aluno.objects.create(
-                    secretaria=secretaria,
-                    turma=turma,
-                    nome=row['nome'],
-                    cpf=row.get('cpf', ''),
+        if user.secretaria_id is None:
+            raise CommandError('O usuário informado não está vinculado a uma secretaria.')
+
+        with open(options['csv_path'], newline='', encoding=options['encoding']) as csvfile:
+            reader = csv.DictReader(csvfile, delimiter=options['delimitador'])
+            faltando = {'turma_id', 'nome'} - set(reader.fieldnames or [])
+            if faltando:
+                raise CommandError(f"Colunas obrigatórias ausentes: {', '.join(sorted(faltando))}")
+            resultado = importar_alunos(
+                reader, user.secretaria_id, tamanho_lote=options['batch_size'], simular=options['dry_run']
+            )
+
+        if options['rejeitados']:
+            with open(options['rejeitados'], 'w', newline='', encoding='utf-8') as saida:
+                writer = csv.DictWriter(
+                    saida, fieldnames=CAMPOS_REJEITADOS, delimiter=options['delimitador'], extrasaction='ignore'
                 )
-        self.stdout.write(self.style.SUCCESS('Importação concluída'))
+                writer.writeheader()
+                writer.writerows(resultado.rejeitadas)
+
+        for rejeitada in resultado.rejeitadas[:20]:
+            self.stderr.write(f"Linha {rejeitada['linha']}: {rejeitada['motivo']}")
+        if len(resultado.rejeitadas) > 20:
+            self.stderr.write(f'... e mais {len(resultado.rejeitadas) - 20} linhas rejeitadas.')
+
+        resumo = resultado.resumo()
+        prefixo = 'Simulação concluída' if options['dry_run'] else 'Importação concluída'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefixo}: {resumo['lidas']} linhas lidas, {resumo['criadas']} criados, "
+            f"{resumo['atualizadas']} atualizados, {resumo['rejeitadas']} rejeitadas "
+            f"em {resumo['duracao_s']}s ({resumo['linhas_por_segundo'] or 0} linhas/s)."
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from escolas.importacao import IMPORTACAO_INATIVA_APOS, processar_importacao
+from escolas.models import ImportacaoCadastro
+
+
+class Command(BaseCommand):
+    help = 'Retoma importações de cadastro interrompidas (ex.: após reinício do servidor) a partir do último bloco salvo.'
+
+    def handle(self, *args, **options):
+        interrompidas = Q(status=ImportacaoCadastro.STATUS_PENDENTE) | Q(
+            status=ImportacaoCadastro.STATUS_EXECUTANDO,
+            atualizado_em__lt=timezone.now() - IMPORTACAO_INATIVA_APOS,
+        )
+
+        retomadas = 0
+        for importacao_id in (
+            ImportacaoCadastro.objects.filter(interrompidas).order_by('id').values_list('id', flat=True)
+        ):
+            try:
+                if processar_importacao(importacao_id):
+                    retomadas += 1
+            except Exception as exc:  # recorded on the job; keep going with the others
+                self.stderr.write(f'Importação {importacao_id} falhou novamente: {exc}')
+        self.stdout.write(self.style.SUCCESS(f'{retomadas} importação(ões) de cadastro retomada(s).'))
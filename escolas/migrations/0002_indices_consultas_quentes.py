@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('escolas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aluno',
+            index=models.Index(fields=['secretaria', 'id'], name='aluno_sec_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turma',
+            index=models.Index(fields=['escola', 'ano'], name='turma_escola_ano_idx'),
+        ),
+    ]
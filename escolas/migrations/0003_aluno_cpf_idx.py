@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('escolas', '0002_indices_consultas_quentes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aluno',
+            index=models.Index(fields=['secretaria', 'cpf'], name='aluno_sec_cpf_idx'),
+        ),
+    ]
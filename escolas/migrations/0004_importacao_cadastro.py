@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('escolas', '0003_aluno_cpf_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoCadastro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('arquivo', models.FileField(upload_to='importacoes/%Y/%m/')),
+                ('formato', models.CharField(max_length=10)),
+                ('simulacao', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluido', 'Concluído'), ('falhou', 'Falhou')], default='pendente', max_length=20)),
+                ('lidas', models.PositiveIntegerField(default=0)),
+                ('escolas_criadas', models.PositiveIntegerField(default=0)),
+                ('turmas_criadas', models.PositiveIntegerField(default=0)),
+                ('alunos_criados', models.PositiveIntegerField(default=0)),
+                ('alunos_atualizados', models.PositiveIntegerField(default=0)),
+                ('total_rejeitadas', models.PositiveIntegerField(default=0)),
+                ('rejeitadas', models.JSONField(blank=True, default=list)),
+                ('duracao_s', models.FloatField(blank=True, null=True)),
+                ('erro', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('secretaria', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='core.secretaria')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['secretaria', 'id'], name='importacao_sec_id_idx')],
+            },
+        ),
+    ]
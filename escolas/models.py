@@ -18,6 +18,11 @@ class Turma(models.Model):
     nome = models.CharField(max_length=100)
     ano = models.CharField(max_length=20)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['escola', 'ano'], name='turma_escola_ano_idx'),
+        ]
+
     def __str__(self) -> str:
         return f"{self.nome} ({self.ano})"
 
@@ -28,5 +33,55 @@ class Aluno(models.Model):
     nome = models.CharField(max_length=255)
     cpf = models.CharField(max_length=14, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['secretaria', 'id'], name='aluno_sec_id_idx'),
+            models.Index(fields=['secretaria', 'cpf'], name='aluno_sec_cpf_idx'),
+        ]
+
     def __str__(self) -> str:
         return self.nome
+
+
+class ImportacaoCadastro(models.Model):
+    """Background import of a roster file (escolas, turmas and alunos)."""
+
+    STATUS_PENDENTE = 'pendente'
+    STATUS_EXECUTANDO = 'executando'
+    STATUS_CONCLUIDO = 'concluido'
+    STATUS_FALHOU = 'falhou'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_EXECUTANDO, 'Executando'),
+        (STATUS_CONCLUIDO, 'Concluído'),
+        (STATUS_FALHOU, 'Falhou'),
+    )
+
+    secretaria = models.ForeignKey(Secretaria, on_delete=models.PROTECT)
+    arquivo = models.FileField(upload_to='importacoes/%Y/%m/')
+    formato = models.CharField(max_length=10)
+    simulacao = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDENTE)
+    lidas = models.PositiveIntegerField(default=0)
+    escolas_criadas = models.PositiveIntegerField(default=0)
+    turmas_criadas = models.PositiveIntegerField(default=0)
+    alunos_criados = models.PositiveIntegerField(default=0)
+    alunos_atualizados = models.PositiveIntegerField(default=0)
+    total_rejeitadas = models.PositiveIntegerField(default=0)
+    rejeitadas = models.JSONField(default=list, blank=True)
+    duracao_s = models.FloatField(null=True, blank=True)
+    erro = models.TextField(blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['secretaria', 'id'], name='importacao_sec_id_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"ImportacaoCadastro {self.id} ({self.status})"
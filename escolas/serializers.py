@@ -2,7 +2,8 @@ import re
 
 from rest_framework import serializers
 
-from .models import Aluno, Escola, Turma
+from .importacao import FORMATOS_CADASTRO, formato_do_arquivo, validar_cabecalho
+from .models import Aluno, Escola, ImportacaoCadastro, Turma
 
 
 class EscolaSerializer(serializers.ModelSerializer):
@@ -45,3 +46,46 @@ class AlunoSerializer(serializers.ModelSerializer):
         model = Aluno
         fields = '__all__'
         read_only_fields = ['secretaria']
+
+
+class ImportacaoCadastroSerializer(serializers.ModelSerializer):
+    arquivo = serializers.FileField(write_only=True)
+
+    def validate_arquivo(self, value):
+        """Aceita CSV ou XLSX com ao menos a coluna escola no cabeçalho."""
+        formato = formato_do_arquivo(value.name)
+        if formato is None:
+            raise serializers.ValidationError(
+                f"Envie um arquivo {' ou '.join(extensao.upper() for extensao in FORMATOS_CADASTRO)}."
+            )
+        try:
+            faltando = validar_cabecalho(value, formato)
+        except Exception:
+            raise serializers.ValidationError('Não foi possível ler o arquivo enviado.') from None
+        if faltando:
+            raise serializers.ValidationError(f"Colunas obrigatórias ausentes: {', '.join(faltando)}.")
+        return value
+
+    class Meta:
+        model = ImportacaoCadastro
+        fields = [
+            'id',
+            'secretaria',
+            'arquivo',
+            'formato',
+            'simulacao',
+            'status',
+            'lidas',
+            'escolas_criadas',
+            'turmas_criadas',
+            'alunos_criados',
+            'alunos_atualizados',
+            'total_rejeitadas',
+            'rejeitadas',
+            'duracao_s',
+            'erro',
+            'criado_em',
+            'iniciado_em',
+            'concluido_em',
+        ]
+        read_only_fields = [campo for campo in fields if campo not in {'arquivo', 'simulacao'}]
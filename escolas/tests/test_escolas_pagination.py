@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from django.urls import reverse
 from model_bakery import baker
@@ -31,6 +33,7 @@ def test_escolas_list_can_disable_pagination():
 
     response = client.get(reverse('escola-list'), {'page_size': 0})
     assert response.status_code == 200
-    data = response.json()
+    assert response.streaming
+    data = json.loads(b''.join(response.streaming_content))
     assert isinstance(data, list)
     assert len(data) == 12
@@ -0,0 +1,77 @@
+import csv
+
+import pytest
+from django.core.management import call_command
+from model_bakery import baker
+
+from escolas.importacao import importar_alunos
+from escolas.models import Aluno
+
+
+@pytest.fixture
+def turma():
+    return baker.make('escolas.Turma', secretaria=baker.make('core.Secretaria'))
+
+
+@pytest.mark.django_db
+def test_importar_alunos_creates_in_chunks_and_rejects_bad_rows(turma, django_assert_max_num_queries):
+    outra_turma = baker.make('escolas.Turma')
+    linhas = [
+        {'turma_id': str(turma.id), 'nome': f'Aluno {idx}', 'cpf': f'{idx:011d}'} for idx in range(1, 8)
+    ] + [
+        {'turma_id': str(outra_turma.id), 'nome': 'Outra rede', 'cpf': ''},
+        {'turma_id': 'x', 'nome': 'Sem turma', 'cpf': ''},
+        {'turma_id': str(turma.id), 'nome': ' ', 'cpf': ''},
+        {'turma_id': str(turma.id), 'nome': 'CPF ruim', 'cpf': '123'},
+        {'turma_id': str(turma.id), 'nome': 'Repetido', 'cpf': '000.000.000-01'},
+    ]
+
+    # One turma prefetch plus a lookup and an insert transaction per chunk.
+    with django_assert_max_num_queries(1 + 4 * 4):
+        resultado = importar_alunos(linhas, turma.secretaria_id, tamanho_lote=3)
+
+    assert (resultado.lidas, resultado.criadas, resultado.atualizadas) == (12, 7, 0)
+    assert [rejeitada['linha'] for rejeitada in resultado.rejeitadas] == [9, 10, 11, 12, 13]
+    assert resultado.rejeitadas[-1]['motivo'] == 'CPF repetido no arquivo.'
+    assert Aluno.objects.filter(secretaria_id=turma.secretaria_id).count() == 7
+
+
+@pytest.mark.django_db
+def test_importar_alunos_upserts_by_cpf_and_dry_run_writes_nothing(turma):
+    existente = baker.make(
+        'escolas.Aluno', secretaria=turma.secretaria, turma=turma, nome='Nome antigo', cpf='123.456.789-01'
+    )
+    nova_turma = baker.make('escolas.Turma', secretaria=turma.secretaria)
+    linhas = [
+        {'turma_id': str(nova_turma.id), 'nome': 'Nome novo', 'cpf': '12345678901'},
+        {'turma_id': str(turma.id), 'nome': 'Sem CPF', 'cpf': ''},
+    ]
+
+    simulacao = importar_alunos(linhas, turma.secretaria_id, simular=True)
+    assert (simulacao.criadas, simulacao.atualizadas) == (1, 1)
+    existente.refresh_from_db()
+    assert existente.nome == 'Nome antigo'
+    assert Aluno.objects.count() == 1
+
+    resultado = importar_alunos(linhas, turma.secretaria_id)
+    assert (resultado.criadas, resultado.atualizadas) == (1, 1)
+    existente.refresh_from_db()
+    assert (existente.nome, existente.turma_id) == ('Nome novo', nova_turma.id)
+
+    repetida = importar_alunos(linhas[:1], turma.secretaria_id)
+    assert (repetida.criadas, repetida.atualizadas) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_importar_alunos_command_writes_rejected_report(turma, tmp_path):
+    user = baker.make('core.User', secretaria=turma.secretaria, username='importador')
+    arquivo = tmp_path / 'alunos.csv'
+    arquivo.write_text(f'turma_id;nome;cpf\n{turma.id};Ana;\n999999;Bia;\n', encoding='utf-8')
+    rejeitados = tmp_path / 'rejeitados.csv'
+
+    call_command('importar_alunos', str(arquivo), username=user.username, rejeitados=str(rejeitados))
+
+    assert list(Aluno.objects.values_list('nome', flat=True)) == ['Ana']
+    with open(rejeitados, newline='', encoding='utf-8') as report:
+        linhas = list(csv.DictReader(report, delimiter=';'))
+    assert [(linha['linha'], linha['nome']) for linha in linhas] == [('3', 'Bia')]
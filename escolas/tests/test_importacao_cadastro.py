@@ -0,0 +1,129 @@
+import io
+from datetime import timedelta
+
+import openpyxl
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from escolas.importacao import IMPORTACAO_INATIVA_APOS, importar_cadastro, ler_planilha, processar_importacao
+from escolas.models import Aluno, Escola, ImportacaoCadastro, Turma
+
+ROSTER_CSV = (
+    'Escola;Código INEP;Turma;Ano;Aluno;CPF\n'
+    'Escola Central;12345678;A;5º Ano;Ana;111.111.111-11\n'
+    'Escola Central;12345678;A;5º Ano;Bia;\n'
+    'escola central;;B;6º Ano;Caio;22222222222\n'
+    'Escola Nova;;C;5º Ano;Davi;\n'
+    ';;A;5º Ano;Sem escola;\n'
+    'Escola Nova;;;;Sem turma;\n'
+)
+
+
+def _upload(nome, conteudo):
+    return SimpleUploadedFile(nome, conteudo, content_type='application/octet-stream')
+
+
+@pytest.mark.django_db
+def test_importar_cadastro_resolves_hierarchy_in_memory(admin, django_assert_max_num_queries):
+    secretaria_id = admin.secretaria_id
+    existente = baker.make('escolas.Escola', secretaria_id=secretaria_id, nome='Escola Central', codigo_inep='')
+    linhas = list(ler_planilha(io.BytesIO(ROSTER_CSV.encode()), 'csv'))
+
+    with django_assert_max_num_queries(20):
+        resultado = importar_cadastro(linhas, secretaria_id)
+
+    assert (resultado.escolas_criadas, resultado.turmas_criadas, resultado.criadas) == (1, 3, 4)
+    assert [(rejeitada['linha'], rejeitada['aluno']) for rejeitada in resultado.rejeitadas] == [
+        (6, 'Sem escola'), (7, 'Sem turma'),
+    ]
+    assert Escola.objects.filter(secretaria_id=secretaria_id).count() == 2
+    assert set(Turma.objects.filter(escola=existente).values_list('nome', flat=True)) == {'A', 'B'}
+    assert Aluno.objects.get(nome='Caio').turma.escola_id == existente.id
+
+    # Re-importing matches everything that already exists.
+    repetido = importar_cadastro(linhas, secretaria_id)
+    assert (repetido.escolas_criadas, repetido.turmas_criadas) == (0, 0)
+    assert Aluno.objects.filter(secretaria_id=secretaria_id).count() == 6
+
+
+@pytest.mark.django_db
+def test_importar_cadastro_dry_run_counts_without_writing(admin):
+    linhas = list(ler_planilha(io.BytesIO(ROSTER_CSV.encode()), 'csv'))
+
+    resultado = importar_cadastro(linhas, admin.secretaria_id, tamanho_lote=2, simular=True)
+
+    assert (resultado.escolas_criadas, resultado.turmas_criadas, resultado.criadas) == (2, 3, 4)
+    assert not Escola.objects.exists() and not Aluno.objects.exists()
+
+
+@pytest.mark.django_db
+def test_upload_xlsx_runs_import_job(admin, cliente_api):
+    planilha = openpyxl.Workbook()
+    folha = planilha.active
+    folha.append(['escola', 'turma', 'ano', 'aluno', 'cpf'])
+    folha.append(['Escola XLSX', 'A', '9º Ano', 'Eva', 1234567890])
+    conteudo = io.BytesIO()
+    planilha.save(conteudo)
+    client = cliente_api(admin)
+
+    response = client.post(
+        reverse('importacaocadastro-list'),
+        {'arquivo': _upload('alunos.xlsx', conteudo.getvalue())},
+        format='multipart',
+    )
+
+    assert response.status_code == 202
+    assert response['Location'].endswith(reverse('importacaocadastro-detail', args=[response.data['id']]))
+    assert response.data['status'] == ImportacaoCadastro.STATUS_CONCLUIDO
+    assert (response.data['escolas_criadas'], response.data['alunos_criados']) == (1, 1)
+    assert Aluno.objects.get().cpf == '01234567890'
+    detalhe = client.get(reverse('importacaocadastro-detail', args=[response.data['id']]))
+    assert detalhe.data['lidas'] == 1
+
+
+@pytest.mark.django_db
+def test_upload_rejects_unknown_format_and_missing_columns(admin, cliente_api):
+    client = cliente_api(admin)
+    url = reverse('importacaocadastro-list')
+
+    response = client.post(url, {'arquivo': _upload('alunos.txt', b'escola\n')}, format='multipart')
+    assert response.status_code == 400
+
+    response = client.post(url, {'arquivo': _upload('alunos.csv', b'turma;ano\nA;5\n')}, format='multipart')
+    assert response.status_code == 400
+    assert 'escola' in response.data['arquivo'][0]
+
+    professor = baker.make('core.User', secretaria=admin.secretaria, role='professor')
+    client.force_authenticate(user=professor)
+    assert client.post(url, {'arquivo': _upload('alunos.csv', b'escola\nX\n')}, format='multipart').status_code == 403
+    assert not ImportacaoCadastro.objects.exists()
+
+
+@pytest.mark.django_db
+def test_stale_import_is_reclaimed_and_resumes_after_the_last_chunk(admin):
+    importacao = ImportacaoCadastro.objects.create(
+        secretaria_id=admin.secretaria_id, arquivo=_upload('alunos.csv', ROSTER_CSV.encode()), formato='csv'
+    )
+    linhas = list(ler_planilha(io.BytesIO(ROSTER_CSV.encode()), 'csv'))
+    # A worker committed the first two rows (Ana and Bia, no CPF for Bia) and died.
+    importar_cadastro(linhas[:2], admin.secretaria_id)
+    ImportacaoCadastro.objects.filter(pk=importacao.pk).update(
+        status=ImportacaoCadastro.STATUS_EXECUTANDO, lidas=2, alunos_criados=2, escolas_criadas=1, turmas_criadas=1
+    )
+
+    assert not processar_importacao(importacao.id)
+
+    ImportacaoCadastro.objects.filter(pk=importacao.pk).update(
+        atualizado_em=timezone.now() - IMPORTACAO_INATIVA_APOS - timedelta(minutes=1)
+    )
+    call_command('retomar_importacoes', stdout=io.StringIO())
+
+    importacao.refresh_from_db()
+    assert importacao.status == ImportacaoCadastro.STATUS_CONCLUIDO
+    assert (importacao.lidas, importacao.alunos_criados, importacao.total_rejeitadas) == (6, 4, 2)
+    assert Aluno.objects.filter(nome='Bia').count() == 1
+    assert [rejeitada['linha'] for rejeitada in importacao.rejeitadas] == [6, 7]
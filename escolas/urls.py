@@ -1,10 +1,11 @@
 from rest_framework.routers import DefaultRouter
 
-from .views import AlunoViewSet, EscolaViewSet, TurmaViewSet
+from .views import AlunoViewSet, EscolaViewSet, ImportacaoCadastroViewSet, TurmaViewSet
 
 router = DefaultRouter()
 router.register('escolas', EscolaViewSet)
 router.register('turmas', TurmaViewSet)
 router.register('alunos', AlunoViewSet)
+router.register('importacoes', ImportacaoCadastroViewSet)
 
 urlpatterns = router.urls
@@ -1,7 +1,14 @@
+from rest_framework import status
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+
 from core.tenancy import TenantScopedViewSet
+from respostas.services import sincronizar_analiticos
 
-from .models import Aluno, Escola, Turma
-from .serializers import AlunoSerializer, EscolaSerializer, TurmaSerializer
+from .importacao import formato_do_arquivo, iniciar_importacao
+from .models import Aluno, Escola, ImportacaoCadastro, Turma
+from .serializers import AlunoSerializer, EscolaSerializer, ImportacaoCadastroSerializer, TurmaSerializer
 
 
 class EscolaViewSet(TenantScopedViewSet):
@@ -31,6 +38,10 @@ class TurmaViewSet(TenantScopedViewSet):
         'destroy': ['admin'],
     }
 
+    def finish_bulk_instances(self, instances):
+        # bulk_update skips the post_save copy into the Resposta analytics columns.
+        sincronizar_analiticos(instances)
+
 
 class AlunoViewSet(TenantScopedViewSet):
     queryset = Aluno.objects.select_related('turma', 'turma__escola')
@@ -45,3 +56,43 @@ class AlunoViewSet(TenantScopedViewSet):
         'partial_update': ['admin'],
         'destroy': ['admin'],
     }
+
+    def finish_bulk_instances(self, instances):
+        # bulk_update skips the post_save copy into the Resposta analytics columns.
+        sincronizar_analiticos(instances)
+
+
+class ImportacaoCadastroViewSet(TenantScopedViewSet):
+    """Upload a roster (CSV/XLSX) and follow its background import."""
+
+    queryset = ImportacaoCadastro.objects.all()
+    serializer_class = ImportacaoCadastroSerializer
+    parser_classes = [MultiPartParser, FormParser]
+    filterset_fields = ['status']
+    http_method_names = ['get', 'post', 'head', 'options']
+    bulk_write = False
+    role_permissions = {
+        'list': ['admin'],
+        'retrieve': ['admin'],
+        'create': ['admin'],
+    }
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tenant = self._resolve_tenant()
+        if tenant is None:
+            return Response(
+                {'secretaria': 'Informe a secretaria da importação.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        arquivo = serializer.validated_data['arquivo']
+        importacao = iniciar_importacao(
+            tenant.id,
+            arquivo,
+            formato_do_arquivo(arquivo.name),
+            simular=serializer.validated_data.get('simulacao', False),
+        )
+        response = Response(self.get_serializer(importacao).data, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = reverse('importacaocadastro-detail', args=[importacao.id], request=request)
+        return response
@@ -89,18 +89,11 @@ async function fetchCadernoQuestoes(cadernoId: number): Promise<CadernoQuestao[]
   return Array.isArray(data) ? data : data.results;
 }
 
-function parseProvaId(rawValue: string): number | null {
-  let parsed: unknown;
-  try {
-    parsed = JSON.parse(rawValue);
-  } catch (err) {
-    console.error(err);
-    return null;
-  }
-  if (typeof parsed !== 'object' || parsed === null) {
-    return null;
-  }
-  const payload = parsed as Record<string, unknown>;
+// Compact tokens ("AV" + base32). The browser never decodes them: the server
+// checks the HMAC in /avaliacoes/provas/qr/<token>/ and returns the prova.
+const QR_TOKEN_PATTERN = /^AV[A-Z2-7]+$/;
+
+function parseLegacyProvaId(payload: Record<string, unknown>): number | null {
   const provaIdRaw =
     payload.prova_id ?? payload.provaId ?? payload.id ?? payload.prova ?? payload['provaId'];
   const provaId = Number(provaIdRaw);
@@ -110,6 +103,41 @@ function parseProvaId(rawValue: string): number | null {
   return provaId;
 }
 
+// Resolves scanned content to a prova. Signed tokens (bare or inside a JSON
+// payload's qr_token) go through the verifying endpoint; unsigned legacy JSON
+// payloads from before the token migration fall back to the prova id.
+async function resolveProva(rawValue: string): Promise<ProvaAluno | null> {
+  const value = rawValue.trim();
+  let token = value.toUpperCase();
+  let legacyId: number | null = null;
+  if (!QR_TOKEN_PATTERN.test(token)) {
+    let parsed: unknown;
+    try {
+      parsed = JSON.parse(value);
+    } catch (err) {
+      console.error(err);
+      return null;
+    }
+    if (typeof parsed !== 'object' || parsed === null) {
+      return null;
+    }
+    const payload = parsed as Record<string, unknown>;
+    token = typeof payload.qr_token === 'string' ? payload.qr_token.toUpperCase() : '';
+    legacyId = parseLegacyProvaId(payload);
+  }
+  if (QR_TOKEN_PATTERN.test(token)) {
+    const { data } = await apiClient.get<ProvaAluno>(
+      `/avaliacoes/provas/qr/${encodeURIComponent(token)}/`
+    );
+    return data;
+  }
+  if (!legacyId) {
+    return null;
+  }
+  const { data } = await apiClient.get<ProvaAluno>(`/avaliacoes/provas/${legacyId}/`);
+  return data;
+}
+
 export function ProfessorGabaritoReaderPage() {
   const videoRef = useRef<HTMLVideoElement | null>(null);
   const analysisCanvasRef = useRef<HTMLCanvasElement | null>(null);
@@ -493,43 +521,51 @@ export function ProfessorGabaritoReaderPage() {
 
   const [scannerManualText, setScannerManualText] = useState('');
 
-  const handleScanManual = () => {
-    const prova = parseProvaId(scannerManualText.trim());
-    if (!prova) {
+  const identificarProva = async (rawValue: string): Promise<ProvaAluno | null> => {
+    try {
+      const prova = await resolveProva(rawValue);
+      if (!prova) {
+        setAlert({
+          type: 'error',
+          message: 'Conteúdo inválido. Informe um QR Code com identificador de prova.',
+        });
+      }
+      return prova;
+    } catch (err) {
+      console.error(err);
       setAlert({
         type: 'error',
-        message: 'Conteúdo inválido. Informe um QR Code com identificador de prova.',
+        message: 'QR Code não reconhecido pelo servidor. Confira se ele pertence a uma prova válida.',
       });
+      return null;
+    }
+  };
+
+  const handleScanManual = async () => {
+    const prova = await identificarProva(scannerManualText);
+    if (!prova) {
       return;
     }
-    setProvaId(prova);
+    setProvaId(prova.id);
+    setProvaInfo(prova);
     setAlert({
       type: 'success',
-      message: `Identificação carregada manualmente: prova #${prova}.`,
+      message: `Identificação carregada manualmente: prova #${prova.id}.`,
     });
   };
 
   const handleQrDetected = async (rawValue: string) => {
-    const prova = parseProvaId(rawValue);
+    const prova = await identificarProva(rawValue);
     if (!prova) {
-      setAlert({
-        type: 'error',
-        message: 'O QR Code lido não contém o identificador da prova.',
-      });
+      setProvaInfo(null);
       return;
     }
-    setProvaId(prova);
+    setProvaId(prova.id);
+    setProvaInfo(prova);
     setAlert({
       type: 'success',
-      message: `Prova identificada: #${prova}. Você já pode enviar as respostas.`,
+      message: `Prova identificada: #${prova.id}. Você já pode enviar as respostas.`,
     });
-    try {
-      const { data } = await apiClient.get<ProvaAluno>(`/avaliacoes/provas/${prova}/`);
-      setProvaInfo(data);
-    } catch (err) {
-      console.error(err);
-      setProvaInfo(null);
-    }
   };
 
   const enviarMutation = useMutation({
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('itens', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='questao',
+            index=models.Index(fields=['secretaria', 'status'], name='questao_sec_status_idx'),
+        ),
+    ]
@@ -41,5 +41,10 @@ class Questao(models.Model):
     habilidade = models.ForeignKey(Habilidade, on_delete=models.SET_NULL, null=True, blank=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDENTE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['secretaria', 'status'], name='questao_sec_status_idx'),
+        ]
+
     def __str__(self) -> str:
         return f"Questão {self.id}"
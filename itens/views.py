@@ -1,4 +1,5 @@
 from core.tenancy import TenantScopedViewSet
+from respostas.services import sincronizar_analiticos
 
 from .models import Competencia, Habilidade, Questao
 from .serializers import CompetenciaSerializer, HabilidadeSerializer, QuestaoSerializer
@@ -45,3 +46,7 @@ class QuestaoViewSet(TenantScopedViewSet):
         'partial_update': ['admin', 'professor'],
         'destroy': ['admin'],
     }
+
+    def finish_bulk_instances(self, instances):
+        # bulk_update skips the post_save copy into the Resposta analytics columns.
+        sincronizar_analiticos(instances)
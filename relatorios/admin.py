@@ -1 +1,6 @@
-# Relatórios tipicamente expostos via API; nenhum modelo para registrar aqui ainda.
+from django.contrib import admin
+
+from .models import FatoResultado, RelatorioSnapshot
+
+admin.site.register(FatoResultado)
+admin.site.register(RelatorioSnapshot)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from avaliacoes.models import Avaliacao
+from relatorios.services import atualizar_fatos
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os fatos agregados do cubo de resultados por avaliação.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--avaliacao',
+            type=int,
+            action='append',
+            dest='avaliacoes',
+            help='ID da avaliação a recalcular (pode ser repetido). Padrão: todas.',
+        )
+
+    def handle(self, *args, **options):
+        avaliacao_ids = options.get('avaliacoes') or list(
+            Avaliacao.objects.order_by('id').values_list('id', flat=True)
+        )
+        for avaliacao_id in avaliacao_ids:
+            total = atualizar_fatos(avaliacao_id)
+            self.stdout.write(f'Avaliação {avaliacao_id}: {total} fatos gerados.')
+        self.stdout.write(self.style.SUCCESS('Fatos atualizados.'))
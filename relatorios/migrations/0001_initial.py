@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('avaliacoes', '0004_update_qr_payload'),
+        ('core', '0001_initial'),
+        ('escolas', '0001_initial'),
+        ('itens', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FatoResultado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_aplicacao', models.DateField()),
+                ('acertos', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('avaliacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='avaliacoes.avaliacao')),
+                ('caderno', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='avaliacoes.caderno')),
+                ('competencia', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='itens.competencia')),
+                ('escola', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='escolas.escola')),
+                ('habilidade', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='itens.habilidade')),
+                ('secretaria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.secretaria')),
+                ('turma', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='escolas.turma')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['secretaria', 'avaliacao'], name='fato_sec_avaliacao_idx'), models.Index(fields=['secretaria', 'data_aplicacao'], name='fato_sec_data_idx'), models.Index(fields=['avaliacao', 'turma'], name='fato_avaliacao_turma_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('avaliacoes', '0006_avaliacao_encerrada_em'),
+        ('core', '0001_initial'),
+        ('relatorios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatorioSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dados', models.JSONField(default=dict)),
+                ('etag', models.CharField(max_length=64)),
+                ('gerado_em', models.DateTimeField(auto_now_add=True)),
+                ('avaliacao', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='snapshot', to='avaliacoes.avaliacao')),
+                ('secretaria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.secretaria')),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import models
+
+from avaliacoes.models import Avaliacao, Caderno
+from core.models import Secretaria
+from escolas.models import Escola, Turma
+from itens.models import Competencia, Habilidade
+
+
+class FatoResultado(models.Model):
+    """Pre-aggregated answer counts at the finest grain exposed by the results cube."""
+
+    secretaria = models.ForeignKey(Secretaria, on_delete=models.CASCADE)
+    avaliacao = models.ForeignKey(Avaliacao, on_delete=models.CASCADE)
+    caderno = models.ForeignKey(Caderno, on_delete=models.CASCADE, null=True, blank=True)
+    escola = models.ForeignKey(Escola, on_delete=models.CASCADE, null=True, blank=True)
+    turma = models.ForeignKey(Turma, on_delete=models.CASCADE, null=True, blank=True)
+    habilidade = models.ForeignKey(Habilidade, on_delete=models.SET_NULL, null=True, blank=True)
+    competencia = models.ForeignKey(Competencia, on_delete=models.SET_NULL, null=True, blank=True)
+    data_aplicacao = models.DateField()
+    acertos = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['secretaria', 'avaliacao'], name='fato_sec_avaliacao_idx'),
+            models.Index(fields=['secretaria', 'data_aplicacao'], name='fato_sec_data_idx'),
+            models.Index(fields=['avaliacao', 'turma'], name='fato_avaliacao_turma_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"Fato {self.avaliacao_id}-{self.turma_id}-{self.habilidade_id}"
+
+
+class RelatorioSnapshot(models.Model):
+    """Immutable aggregates of a closed avaliação, served instead of re-aggregating."""
+
+    secretaria = models.ForeignKey(Secretaria, on_delete=models.CASCADE)
+    avaliacao = models.OneToOneField(Avaliacao, on_delete=models.CASCADE, related_name='snapshot')
+    dados = models.JSONField(default=dict)
+    etag = models.CharField(max_length=64)
+    gerado_em = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"Snapshot {self.avaliacao_id}"
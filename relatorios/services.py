@@ -0,0 +1,481 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import date
+from functools import partial
+from typing import Any, Iterable, Optional
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, F, Q, QuerySet, Sum
+from django.utils import timezone
+
+from avaliacoes.models import Avaliacao
+from core.versioning import marcar_alteracao
+from respostas.models import Resposta
+
+from .models import FatoResultado, RelatorioSnapshot
+
+
+@dataclass(frozen=True)
+class NivelDrillDown:
+    """Describes one level of the secretaria → escola → turma → aluno hierarchy."""
+
+    nome: str
+    chave: Optional[str]
+    rotulo: Optional[str]
+    filho: Optional[str]
+
+
+NIVEIS: dict[str, NivelDrillDown] = {
+    'secretaria': NivelDrillDown('secretaria', None, None, 'escola'),
+    'escola': NivelDrillDown('escola', 'escola_id', 'escola__nome', 'turma'),
+    'turma': NivelDrillDown('turma', 'turma_id', 'turma__nome', 'aluno'),
+    'aluno': NivelDrillDown(
+        'aluno',
+        'prova_aluno__aluno_id',
+        'prova_aluno__aluno__nome',
+        None,
+    ),
+}
+
+# Parent filters accepted while drilling down, mapped to the Resposta lookup they restrict.
+FILTROS_PAI = {
+    'escola_id': 'escola_id',
+    'turma_id': 'turma_id',
+    'avaliacao_id': 'avaliacao_id',
+}
+
+
+def _percentual(acertos: int, total: int) -> float:
+    if not total:
+        return 0.0
+    return round(acertos * 100 / total, 2)
+
+
+def _medidas() -> dict[str, Any]:
+    return {
+        'total': Count('id', filter=Q(correta__isnull=False)),
+        'acertos': Count('id', filter=Q(correta=True)),
+    }
+
+
+def proficiencia_drilldown(
+    queryset: QuerySet[Resposta],
+    nivel: str,
+    *,
+    after: Optional[int] = None,
+    limit: int = 50,
+) -> dict[str, Any]:
+    """Aggregate answers at ``nivel`` with one grouped query and keyset pagination.
+
+    Groups are ordered by their primary key so the next page is fetched with
+    ``key > after`` instead of an ``OFFSET``; ``limit + 1`` rows are read to
+    know whether another page exists without a ``COUNT(*)``.
+    """
+
+    definicao = NIVEIS[nivel]
+    if definicao.chave is None:
+        totais = queryset.aggregate(**_medidas())
+        resultados = [
+            {
+                'id': None,
+                'nome': None,
+                'total': totais['total'],
+                'acertos': totais['acertos'],
+                'percentual': _percentual(totais['acertos'], totais['total']),
+            }
+        ]
+        return {'nivel': nivel, 'proximo_nivel': definicao.filho, 'results': resultados, 'next': None}
+
+    agrupado = queryset.filter(**{f'{definicao.chave}__isnull': False})
+    if after is not None:
+        agrupado = agrupado.filter(**{f'{definicao.chave}__gt': after})
+    linhas = list(
+        agrupado.values(grupo_id=F(definicao.chave), grupo_nome=F(definicao.rotulo))
+        .annotate(**_medidas())
+        .order_by('grupo_id')[: limit + 1]
+    )
+
+    proximo = None
+    if len(linhas) > limit:
+        linhas = linhas[:limit]
+        proximo = linhas[-1]['grupo_id']
+
+    resultados = [
+        {
+            'id': linha['grupo_id'],
+            'nome': linha['grupo_nome'],
+            'total': linha['total'],
+            'acertos': linha['acertos'],
+            'percentual': _percentual(linha['acertos'], linha['total']),
+        }
+        for linha in linhas
+    ]
+    return {'nivel': nivel, 'proximo_nivel': definicao.filho, 'results': resultados, 'next': proximo}
+
+
+# Results cube -----------------------------------------------------------------
+
+# Resposta columns that define the grain of FatoResultado.
+_GRAO_FATOS = {
+    'secretaria_id': F('secretaria_id'),
+    'avaliacao_id': F('avaliacao_id'),
+    'caderno_id': F('caderno_questao__caderno_id'),
+    'escola_id': F('escola_id'),
+    'turma_id': F('turma_id'),
+    'habilidade_id': F('habilidade_id'),
+    'competencia_id': F('competencia_id'),
+    'data_aplicacao': F('data_aplicacao'),
+}
+
+
+@transaction.atomic
+def atualizar_fatos(avaliacao_id: int, turma_ids: Optional[Iterable[int]] = None) -> int:
+    """Rebuild the FatoResultado rows of an avaliação (optionally only some turmas).
+
+    The slice is deleted and re-inserted from one grouped query over Resposta, so
+    refreshing after a prova is graded only touches that prova's turma. Refreshes
+    of one avaliação are serialized on its row, otherwise two of them could each
+    delete the slice and then both insert it.
+    """
+
+    secretaria_id = (
+        Avaliacao.objects.select_for_update().filter(pk=avaliacao_id).values_list('secretaria_id', flat=True).first()
+    )
+    respostas = Resposta.objects.filter(avaliacao_id=avaliacao_id)
+    fatos = FatoResultado.objects.filter(avaliacao_id=avaliacao_id)
+    if turma_ids is not None:
+        turma_ids = list(turma_ids)
+        respostas = respostas.filter(turma_id__in=turma_ids)
+        fatos = fatos.filter(turma_id__in=turma_ids)
+
+    # Aliases must not clash with Resposta field names, hence the prefix.
+    linhas = (
+        respostas.values(**{f'grao_{campo}': expr for campo, expr in _GRAO_FATOS.items()})
+        .annotate(**_medidas())
+        .order_by()
+    )
+    novos = [
+        FatoResultado(
+            acertos=linha.pop('acertos'),
+            total=linha.pop('total'),
+            **{campo.removeprefix('grao_'): valor for campo, valor in linha.items()},
+        )
+        for linha in linhas
+    ]
+    fatos.delete()
+    FatoResultado.objects.bulk_create(novos, batch_size=1000)
+    marcar_alteracao(FatoResultado, secretaria_id)
+    return len(novos)
+
+
+def agendar_atualizacao_fatos(fatias: Iterable[tuple[Optional[int], Optional[int]]]) -> None:
+    """Refresh the ``(avaliacao_id, turma_id)`` slices once the current transaction commits.
+
+    Used by the Resposta write paths; a slice without turma refreshes the whole avaliação.
+    """
+
+    por_avaliacao: dict[int, Optional[set[int]]] = {}
+    for avaliacao_id, turma_id in fatias:
+        if avaliacao_id is None:
+            continue
+        turmas = por_avaliacao.setdefault(avaliacao_id, set())
+        if turma_id is None or turmas is None:
+            por_avaliacao[avaliacao_id] = None
+        else:
+            turmas.add(turma_id)
+    for avaliacao_id, turmas in por_avaliacao.items():
+        transaction.on_commit(
+            partial(atualizar_fatos, avaliacao_id, turma_ids=None if turmas is None else sorted(turmas))
+        )
+
+
+@dataclass(frozen=True)
+class DimensaoCubo:
+    chave: str
+    rotulo: Optional[str]
+    custo: int
+
+
+DIMENSOES_CUBO: dict[str, DimensaoCubo] = {
+    'secretaria': DimensaoCubo('secretaria_id', 'secretaria__nome', 1),
+    'avaliacao': DimensaoCubo('avaliacao_id', 'avaliacao__titulo', 2),
+    'caderno': DimensaoCubo('caderno_id', 'caderno__codigo', 2),
+    'competencia': DimensaoCubo('competencia_id', 'competencia__codigo', 2),
+    'habilidade': DimensaoCubo('habilidade_id', 'habilidade__codigo', 3),
+    'data_aplicacao': DimensaoCubo('data_aplicacao', None, 2),
+    'escola': DimensaoCubo('escola_id', 'escola__nome', 3),
+    'turma': DimensaoCubo('turma_id', 'turma__nome', 4),
+}
+MEDIDAS_CUBO = ('acertos', 'total', 'percent')
+
+# Upper bounds protecting the database from cartesian-sized group-bys.
+CUBO_MAX_DIMENSOES = 4
+CUBO_CUSTO_MAXIMO = 10
+CUBO_MAX_CELULAS = 5000
+
+
+class ConsultaCuboInvalida(ValueError):
+    """Raised when a cube query asks for unknown dimensions or exceeds the cost limit."""
+
+
+def consultar_cubo(
+    secretaria_id: int,
+    dimensoes: list[str],
+    medidas: list[str],
+    filtros: Optional[dict[str, list[int]]] = None,
+    data_inicial: Optional[date] = None,
+    data_final: Optional[date] = None,
+) -> list[dict[str, Any]]:
+    """Run a single GROUP BY over FatoResultado for the requested dimensions."""
+
+    desconhecidas = [nome for nome in dimensoes if nome not in DIMENSOES_CUBO]
+    if desconhecidas:
+        raise ConsultaCuboInvalida(f"Dimensões não permitidas: {', '.join(desconhecidas)}.")
+    medidas_invalidas = [nome for nome in medidas if nome not in MEDIDAS_CUBO]
+    if medidas_invalidas:
+        raise ConsultaCuboInvalida(f"Medidas não permitidas: {', '.join(medidas_invalidas)}.")
+    if len(dimensoes) > CUBO_MAX_DIMENSOES:
+        raise ConsultaCuboInvalida(f'Use no máximo {CUBO_MAX_DIMENSOES} dimensões.')
+
+    filtros = filtros or {}
+    queryset = FatoResultado.objects.filter(secretaria_id=secretaria_id)
+    for nome, valores in filtros.items():
+        if nome not in DIMENSOES_CUBO or nome == 'data_aplicacao':
+            raise ConsultaCuboInvalida(f'Filtro não permitido: {nome}.')
+        queryset = queryset.filter(**{f'{DIMENSOES_CUBO[nome].chave}__in': valores})
+    if data_inicial:
+        queryset = queryset.filter(data_aplicacao__gte=data_inicial)
+    if data_final:
+        queryset = queryset.filter(data_aplicacao__lte=data_final)
+
+    # A dimension pinned to a single value by a filter costs nothing to group by.
+    custo = sum(
+        DIMENSOES_CUBO[nome].custo
+        for nome in dimensoes
+        if len(filtros.get(nome, ())) != 1
+    )
+    if custo > CUBO_CUSTO_MAXIMO:
+        raise ConsultaCuboInvalida(
+            'Consulta muito ampla: reduza as dimensões ou filtre por escola, turma ou avaliação.'
+        )
+
+    # Aliases are prefixed so they never clash with FatoResultado field names.
+    agrupamento: dict[str, Any] = {}
+    for nome in dimensoes:
+        definicao = DIMENSOES_CUBO[nome]
+        agrupamento[f'dim_{nome}'] = F(definicao.chave)
+        if definicao.rotulo:
+            agrupamento[f'rot_{nome}'] = F(definicao.rotulo)
+
+    linhas = list(
+        queryset.values(**agrupamento)
+        .annotate(acertos_sum=Sum('acertos'), total_sum=Sum('total'))
+        .order_by(*[f'dim_{nome}' for nome in dimensoes])[: CUBO_MAX_CELULAS + 1]
+    )
+    if len(linhas) > CUBO_MAX_CELULAS:
+        raise ConsultaCuboInvalida(
+            f'A consulta excede {CUBO_MAX_CELULAS} células; aplique filtros adicionais.'
+        )
+
+    resultado = []
+    for linha in linhas:
+        acertos = linha.pop('acertos_sum') or 0
+        total = linha.pop('total_sum') or 0
+        celula: dict[str, Any] = {}
+        for nome in dimensoes:
+            celula[nome] = linha[f'dim_{nome}']
+            if f'rot_{nome}' in linha:
+                celula[f'{nome}_rotulo'] = linha[f'rot_{nome}']
+        if 'acertos' in medidas:
+            celula['acertos'] = acertos
+        if 'total' in medidas:
+            celula['total'] = total
+        if 'percent' in medidas:
+            celula['percent'] = _percentual(acertos, total)
+        resultado.append(celula)
+    return resultado
+
+
+# Longitudinal series -----------------------------------------------------------
+
+
+def serie_historica(
+    secretaria_id: int,
+    *,
+    escola_id: Optional[int] = None,
+    turma_id: Optional[int] = None,
+    habilidade_ids: Optional[list[int]] = None,
+    data_inicial: Optional[date] = None,
+    data_final: Optional[date] = None,
+) -> dict[str, Any]:
+    """Per-avaliação, per-habilidade proficiency read from FatoResultado.
+
+    Facts are already aggregated per avaliação, so the query cost depends on the
+    number of avaliações and habilidades in range, not on the answers behind them.
+    """
+
+    fatos = FatoResultado.objects.filter(secretaria_id=secretaria_id)
+    if escola_id is not None:
+        fatos = fatos.filter(escola_id=escola_id)
+    if turma_id is not None:
+        fatos = fatos.filter(turma_id=turma_id)
+    if habilidade_ids:
+        fatos = fatos.filter(habilidade_id__in=habilidade_ids)
+    if data_inicial:
+        fatos = fatos.filter(data_aplicacao__gte=data_inicial)
+    if data_final:
+        fatos = fatos.filter(data_aplicacao__lte=data_final)
+
+    linhas = (
+        fatos.values(
+            'data_aplicacao',
+            dim_avaliacao=F('avaliacao_id'),
+            titulo=F('avaliacao__titulo'),
+            dim_habilidade=F('habilidade_id'),
+            codigo=F('habilidade__codigo'),
+        )
+        .annotate(acertos_sum=Sum('acertos'), total_sum=Sum('total'))
+        .order_by('data_aplicacao', 'dim_avaliacao', 'codigo')
+    )
+
+    avaliacoes: dict[int, dict[str, Any]] = {}
+    series: dict[Optional[int], dict[str, Any]] = {}
+    for linha in linhas:
+        avaliacao_id = linha['dim_avaliacao']
+        avaliacoes.setdefault(
+            avaliacao_id,
+            {'id': avaliacao_id, 'titulo': linha['titulo'], 'data_aplicacao': linha['data_aplicacao']},
+        )
+        serie = series.setdefault(
+            linha['dim_habilidade'],
+            {'habilidade_id': linha['dim_habilidade'], 'codigo': linha['codigo'], 'pontos': []},
+        )
+        serie['pontos'].append(
+            {
+                'avaliacao_id': avaliacao_id,
+                'data_aplicacao': linha['data_aplicacao'],
+                'acertos': linha['acertos_sum'],
+                'total': linha['total_sum'],
+                'percentual': _percentual(linha['acertos_sum'], linha['total_sum']),
+            }
+        )
+
+    return {
+        'avaliacoes': list(avaliacoes.values()),
+        'series': sorted(series.values(), key=lambda serie: serie['codigo'] or ''),
+    }
+
+
+# Closed avaliação snapshots ---------------------------------------------------
+
+# Snapshots only change through encerrar/reabrir, so the cache entry can live long.
+SNAPSHOT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _snapshot_cache_key(avaliacao_id: int) -> str:
+    return f'relatorios:snapshot:{avaliacao_id}'
+
+
+def _agrupar(queryset: QuerySet[Resposta], **grupo: Any) -> list[dict[str, Any]]:
+    # ``<x>_ref`` aliases avoid clashing with Resposta columns and become ``<x>_id``.
+    alias = next(iter(grupo))
+    linhas = queryset.values(**grupo).annotate(**_medidas()).order_by(alias)
+    return [
+        {
+            **{
+                (chave[: -len('_ref')] + '_id' if chave.endswith('_ref') else chave): valor
+                for chave, valor in linha.items()
+            },
+            'percentual': _percentual(linha['acertos'], linha['total']),
+        }
+        for linha in linhas
+    ]
+
+
+def calcular_agregados_avaliacao(avaliacao: Avaliacao) -> dict[str, Any]:
+    """Aggregate an avaliação per habilidade, escola, turma and aluno."""
+
+    respostas = Resposta.objects.filter(avaliacao_id=avaliacao.id)
+    resumo = respostas.aggregate(provas=Count('prova_aluno_id', distinct=True), **_medidas())
+    resumo['percentual'] = _percentual(resumo['acertos'], resumo['total'])
+    return {
+        'avaliacao': {
+            'id': avaliacao.id,
+            'titulo': avaliacao.titulo,
+            'data_aplicacao': avaliacao.data_aplicacao,
+        },
+        'resumo': resumo,
+        'habilidades': _agrupar(
+            respostas, habilidade_ref=F('habilidade_id'), codigo=F('habilidade__codigo')
+        ),
+        'escolas': _agrupar(respostas, escola_ref=F('escola_id'), nome=F('escola__nome')),
+        'turmas': _agrupar(
+            respostas, turma_ref=F('turma_id'), nome=F('turma__nome'), escola_ref=F('escola_id')
+        ),
+        'alunos': _agrupar(
+            respostas,
+            aluno_ref=F('prova_aluno__aluno_id'),
+            nome=F('prova_aluno__aluno__nome'),
+            turma_ref=F('turma_id'),
+        ),
+    }
+
+
+@transaction.atomic
+def encerrar_avaliacao(avaliacao: Avaliacao) -> RelatorioSnapshot:
+    """Close an avaliação and freeze its aggregates into a snapshot."""
+
+    if avaliacao.encerrada_em is None:
+        avaliacao.encerrada_em = timezone.now()
+        avaliacao.save(update_fields=['encerrada_em'])
+    existente = RelatorioSnapshot.objects.filter(avaliacao=avaliacao).first()
+    if existente is not None:
+        return existente
+
+    atualizar_fatos(avaliacao.id)
+    dados = json.loads(json.dumps(calcular_agregados_avaliacao(avaliacao), cls=DjangoJSONEncoder))
+    conteudo = json.dumps(dados, sort_keys=True).encode('utf-8')
+    snapshot = RelatorioSnapshot.objects.create(
+        secretaria_id=avaliacao.secretaria_id,
+        avaliacao=avaliacao,
+        dados=dados,
+        etag=hashlib.sha256(conteudo).hexdigest(),
+    )
+    # After commit, so a reader cannot re-cache the old state in between.
+    transaction.on_commit(partial(cache.delete, _snapshot_cache_key(avaliacao.id)))
+    return snapshot
+
+
+@transaction.atomic
+def reabrir_avaliacao(avaliacao: Avaliacao) -> None:
+    """Reopen an avaliação, discarding its snapshot so the next close recomputes it."""
+
+    RelatorioSnapshot.objects.filter(avaliacao=avaliacao).delete()
+    avaliacao.encerrada_em = None
+    avaliacao.save(update_fields=['encerrada_em'])
+    transaction.on_commit(partial(cache.delete, _snapshot_cache_key(avaliacao.id)))
+
+
+def obter_snapshot(avaliacao_id: int) -> Optional[dict[str, Any]]:
+    """Return ``{'etag', 'dados', 'secretaria_id', 'gerado_em'}`` from cache or database."""
+
+    chave = _snapshot_cache_key(avaliacao_id)
+    em_cache = cache.get(chave)
+    if em_cache is not None:
+        return em_cache
+    snapshot = RelatorioSnapshot.objects.filter(avaliacao_id=avaliacao_id).first()
+    if snapshot is None:
+        return None
+    valor = {
+        'etag': snapshot.etag,
+        'dados': snapshot.dados,
+        'secretaria_id': snapshot.secretaria_id,
+        'gerado_em': snapshot.gerado_em,
+    }
+    cache.set(chave, valor, SNAPSHOT_CACHE_TIMEOUT)
+    return valor
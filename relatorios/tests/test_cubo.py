@@ -0,0 +1,98 @@
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+
+from relatorios.models import FatoResultado
+from relatorios.services import atualizar_fatos
+from respostas.models import Resposta
+
+
+@pytest.fixture
+def cenario(admin, montar_avaliacao):
+    secretaria = admin.secretaria
+    hab1 = baker.make('itens.Habilidade', secretaria=secretaria, codigo='H1')
+    hab2 = baker.make('itens.Habilidade', secretaria=secretaria, codigo='H2')
+    escola = baker.make('escolas.Escola', secretaria=secretaria)
+    turmas = baker.make('escolas.Turma', secretaria=secretaria, escola=escola, _quantity=2)
+    montada = montar_avaliacao(
+        secretaria,
+        habilidades=(hab1, hab2),
+        provas=zip(turmas, [(True, True), (True, False)]),
+        data_aplicacao='2024-05-10',
+    )
+    return montada.avaliacao, turmas, hab1, hab2
+
+
+@pytest.mark.django_db
+def test_atualizar_fatos_replaces_only_requested_turmas(cenario):
+    avaliacao, turmas, _, _ = cenario
+
+    assert atualizar_fatos(avaliacao.id) == 4
+    assert atualizar_fatos(avaliacao.id, turma_ids=[turmas[0].id]) == 2
+    assert FatoResultado.objects.filter(avaliacao=avaliacao).count() == 4
+
+
+@pytest.mark.django_db
+def test_resposta_writes_refresh_facts_after_commit(
+    admin, cliente_api, cenario, django_capture_on_commit_callbacks
+):
+    avaliacao, turmas, _, _ = cenario
+    atualizar_fatos(avaliacao.id)
+    client = cliente_api(admin)
+
+    def acertos():
+        return sum(FatoResultado.objects.filter(avaliacao=avaliacao).values_list('acertos', flat=True))
+
+    resposta = Resposta.objects.filter(turma=turmas[1], correta=False).get()
+    with django_capture_on_commit_callbacks(execute=True):
+        client.patch(reverse('resposta-detail', args=[resposta.id]), {'correta': True}, format='json')
+    assert acertos() == 4
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.delete(reverse('resposta-lote'), [resposta.id], format='json')
+    assert acertos() == 3
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.delete(reverse('resposta-detail', args=[Resposta.objects.filter(turma=turmas[0]).first().id]))
+    assert acertos() == 2
+
+
+@pytest.mark.django_db
+def test_cubo_groups_by_requested_dimensions(admin, cliente_api, cenario, django_assert_num_queries):
+    avaliacao, turmas, hab1, hab2 = cenario
+    atualizar_fatos(avaliacao.id)
+
+    client = cliente_api(admin)
+    url = reverse('relatorio-cubo', kwargs={'secretaria_id': admin.secretaria_id})
+
+    with django_assert_num_queries(1):
+        response = client.get(url, {'dimensoes': 'habilidade', 'medidas': 'acertos,percent'})
+    assert response.status_code == 200
+    assert response.json()['results'] == [
+        {'habilidade': hab1.id, 'habilidade_rotulo': 'H1', 'acertos': 2, 'percent': 100.0},
+        {'habilidade': hab2.id, 'habilidade_rotulo': 'H2', 'acertos': 1, 'percent': 50.0},
+    ]
+
+    response = client.get(url, {'dimensoes': 'turma,data_aplicacao', 'turma': str(turmas[1].id)})
+    assert response.json()['results'] == [
+        {
+            'turma': turmas[1].id,
+            'turma_rotulo': turmas[1].nome,
+            'data_aplicacao': '2024-05-10',
+            'acertos': 1,
+            'total': 2,
+            'percent': 50.0,
+        }
+    ]
+
+
+@pytest.mark.django_db
+def test_cubo_rejects_unknown_dimensions_and_expensive_queries(admin, cliente_api):
+    client = cliente_api(admin)
+    url = reverse('relatorio-cubo', kwargs={'secretaria_id': admin.secretaria_id})
+
+    assert client.get(url, {'dimensoes': 'aluno'}).status_code == 400
+    assert client.get(url, {'dimensoes': 'escola', 'medidas': 'media'}).status_code == 400
+    response = client.get(url, {'dimensoes': 'turma,habilidade,escola,competencia'})
+    assert response.status_code == 400
+    assert 'ampla' in response.json()['detail']
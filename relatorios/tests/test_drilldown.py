@@ -0,0 +1,75 @@
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+
+
+@pytest.fixture
+def rede(admin, montar_avaliacao):
+    secretaria = admin.secretaria
+    escolas = baker.make('escolas.Escola', secretaria=secretaria, _quantity=3)
+    turmas = [baker.make('escolas.Turma', secretaria=secretaria, escola=escola) for escola in escolas]
+    # escola 0: 2/2 corretas, escola 1: 1/2, escola 2: 0/2
+    montada = montar_avaliacao(
+        secretaria, habilidades=(None, None), provas=zip(turmas, [(True, True), (True, False), (False, False)])
+    )
+    return escolas, turmas, [prova.aluno for prova in montada.provas]
+
+
+@pytest.mark.django_db
+def test_drilldown_secretaria_returns_totals(admin, cliente_api, rede):
+    client = cliente_api(admin)
+    url = reverse('relatorio-proficiencia-drilldown', kwargs={'secretaria_id': admin.secretaria_id})
+    response = client.get(url)
+
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload['nivel'] == 'secretaria'
+    assert payload['proximo_nivel'] == 'escola'
+    assert payload['results'] == [
+        {'id': None, 'nome': None, 'total': 6, 'acertos': 3, 'percentual': 50.0}
+    ]
+
+
+@pytest.mark.django_db
+def test_drilldown_escolas_uses_keyset_pagination(admin, cliente_api, rede, django_assert_num_queries):
+    escolas, _, _ = rede
+
+    client = cliente_api(admin)
+    url = reverse('relatorio-proficiencia-drilldown', kwargs={'secretaria_id': admin.secretaria_id})
+
+    with django_assert_num_queries(1):
+        first = client.get(url, {'nivel': 'escola', 'limit': 2}).json()
+    assert [row['id'] for row in first['results']] == [escolas[0].id, escolas[1].id]
+    assert [row['percentual'] for row in first['results']] == [100.0, 50.0]
+    assert first['next'] == escolas[1].id
+
+    second = client.get(url, {'nivel': 'escola', 'limit': 2, 'after': first['next']}).json()
+    assert [row['id'] for row in second['results']] == [escolas[2].id]
+    assert second['results'][0]['acertos'] == 0
+    assert second['next'] is None
+
+
+@pytest.mark.django_db
+def test_drilldown_filters_by_parent_level(admin, cliente_api, rede):
+    _, turmas, alunos = rede
+
+    client = cliente_api(admin)
+    url = reverse('relatorio-proficiencia-drilldown', kwargs={'secretaria_id': admin.secretaria_id})
+    response = client.get(url, {'nivel': 'aluno', 'turma_id': turmas[1].id})
+
+    assert response.status_code == 200
+    assert response.json()['results'] == [
+        {'id': alunos[1].id, 'nome': alunos[1].nome, 'total': 2, 'acertos': 1, 'percentual': 50.0}
+    ]
+
+
+@pytest.mark.django_db
+def test_drilldown_rejects_other_secretaria_and_invalid_level(admin, cliente_api):
+    outra = baker.make('core.Secretaria')
+    client = cliente_api(admin)
+
+    url_outra = reverse('relatorio-proficiencia-drilldown', kwargs={'secretaria_id': outra.id})
+    assert client.get(url_outra).status_code == 403
+
+    url = reverse('relatorio-proficiencia-drilldown', kwargs={'secretaria_id': admin.secretaria_id})
+    assert client.get(url, {'nivel': 'estado'}).status_code == 400
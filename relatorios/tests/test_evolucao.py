@@ -0,0 +1,44 @@
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+
+from relatorios.services import atualizar_fatos
+
+
+@pytest.mark.django_db
+def test_evolucao_returns_series_per_habilidade(
+    admin, cliente_api, montar_avaliacao, django_assert_num_queries
+):
+    secretaria = admin.secretaria
+    turma = baker.make('escolas.Turma', secretaria=secretaria, escola__secretaria=secretaria)
+    outra_turma = baker.make('escolas.Turma', secretaria=secretaria, escola__secretaria=secretaria)
+    habilidade = baker.make('itens.Habilidade', secretaria=secretaria, codigo='EF05')
+
+    def aplicar(turma, data, corretas):
+        provas = [(turma, (correta,)) for correta in corretas]
+        avaliacao = montar_avaliacao(secretaria, (habilidade,), provas, data_aplicacao=data).avaliacao
+        atualizar_fatos(avaliacao.id)
+        return avaliacao
+
+    diagnostica = aplicar(turma, '2023-03-01', [True, False])
+    final = aplicar(turma, '2024-11-01', [True, True])
+    aplicar(outra_turma, '2024-05-01', [False])
+
+    client = cliente_api(admin)
+    url = reverse('relatorio-evolucao', kwargs={'secretaria_id': secretaria.id})
+
+    with django_assert_num_queries(1):
+        response = client.get(url, {'turma_id': turma.id})
+    assert response.status_code == 200
+    payload = response.json()
+    assert [item['id'] for item in payload['avaliacoes']] == [diagnostica.id, final.id]
+    assert len(payload['series']) == 1
+    serie = payload['series'][0]
+    assert serie['codigo'] == 'EF05'
+    assert [ponto['percentual'] for ponto in serie['pontos']] == [50.0, 100.0]
+
+    response = client.get(url, {'data_inicial': '2024-01-01'})
+    assert [ponto['data_aplicacao'] for ponto in response.json()['series'][0]['pontos']] == [
+        '2024-05-01',
+        '2024-11-01',
+    ]
@@ -0,0 +1,105 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from relatorios.models import RelatorioSnapshot
+from relatorios.services import _snapshot_cache_key, obter_snapshot, reabrir_avaliacao
+
+
+@pytest.fixture
+def cenario(admin, montar_avaliacao):
+    secretaria = admin.secretaria
+    habilidade = baker.make('itens.Habilidade', secretaria=secretaria, codigo='HS1')
+    turma = baker.make('escolas.Turma', secretaria=secretaria, escola__secretaria=secretaria)
+    montada = montar_avaliacao(
+        secretaria,
+        habilidades=(habilidade,),
+        provas=[(turma, (True,)), (turma, (False,))],
+        data_aplicacao='2024-08-20',
+    )
+    return montada.avaliacao, turma, montada.provas[-1]
+
+
+@pytest.mark.django_db
+def test_encerrar_creates_snapshot_served_with_etag(admin, cliente_api, cenario, django_assert_num_queries):
+    avaliacao, turma, _ = cenario
+
+    client = cliente_api(admin)
+    snapshot_url = reverse('relatorio-snapshot', kwargs={'avaliacao_id': avaliacao.id})
+    assert client.get(snapshot_url).status_code == 404
+
+    response = client.post(reverse('avaliacao-encerrar', args=[avaliacao.id]))
+    assert response.status_code == 200
+    etag = response.json()['snapshot']['etag']
+
+    response = client.get(snapshot_url)
+    assert response.status_code == 200
+    assert response['ETag'] == f'"{etag}"'
+    assert 'max-age' in response['Cache-Control']
+    payload = response.json()
+    assert payload['resumo'] == {'provas': 2, 'total': 2, 'acertos': 1, 'percentual': 50.0}
+    assert payload['habilidades'][0]['codigo'] == 'HS1'
+    assert payload['turmas'][0]['turma_id'] == turma.id
+    assert len(payload['alunos']) == 2
+
+    with django_assert_num_queries(0):
+        cached = client.get(snapshot_url, HTTP_IF_NONE_MATCH=f'"{etag}"')
+    assert cached.status_code == 304
+
+
+@pytest.mark.django_db
+def test_encerrada_blocks_coleta_until_reopened(admin, cliente_api, cenario):
+    avaliacao, _, prova = cenario
+
+    client = cliente_api(admin)
+    client.post(reverse('avaliacao-encerrar', args=[avaliacao.id]))
+
+    coleta = {'prova_aluno_id': prova.id, 'respostas': ['A']}
+    assert client.post(reverse('coleta-respostas'), coleta, format='json').status_code == 409
+
+    assert client.post(reverse('avaliacao-reabrir', args=[avaliacao.id])).status_code == 200
+    assert not RelatorioSnapshot.objects.filter(avaliacao=avaliacao).exists()
+    assert client.post(reverse('coleta-respostas'), coleta, format='json').status_code == 200
+    assert client.get(reverse('relatorio-snapshot', kwargs={'avaliacao_id': avaliacao.id})).status_code == 404
+
+
+@pytest.mark.django_db
+def test_snapshot_hidden_from_other_secretaria(admin, cenario):
+    avaliacao, _, _ = cenario
+    intruso = baker.make('core.User', secretaria=baker.make('core.Secretaria'), role='admin')
+
+    url = reverse('relatorio-snapshot', kwargs={'avaliacao_id': avaliacao.id})
+    inexistente = reverse('relatorio-snapshot', kwargs={'avaliacao_id': avaliacao.id + 1000})
+    client = APIClient()
+    client.force_authenticate(user=intruso)
+    # Before and after closing, a foreign avaliação answers like a missing one.
+    assert client.get(url).status_code == 404
+    assert client.get(url).content == client.get(inexistente).content
+
+    client.force_authenticate(user=admin)
+    client.post(reverse('avaliacao-encerrar', args=[avaliacao.id]))
+
+    client.force_authenticate(user=intruso)
+    response = client.get(url)
+    assert response.status_code == 404
+    assert response.content == client.get(inexistente).content
+
+
+@pytest.mark.django_db
+def test_reabrir_drops_the_cached_snapshot_after_commit(
+    admin, cliente_api, cenario, django_capture_on_commit_callbacks
+):
+    avaliacao, _, _ = cenario
+    cliente_api(admin).post(reverse('avaliacao-encerrar', args=[avaliacao.id]))
+    antigo = obter_snapshot(avaliacao.id)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        avaliacao.refresh_from_db()
+        reabrir_avaliacao(avaliacao)
+        # A concurrent reader that still saw the committed snapshot re-caches it.
+        cache.set(_snapshot_cache_key(avaliacao.id), antigo)
+
+    assert cache.get(_snapshot_cache_key(avaliacao.id)) is None
+    assert obter_snapshot(avaliacao.id) is None
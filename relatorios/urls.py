@@ -1,7 +1,17 @@
 from django.urls import path
 
-from .views import ProfPorHabilidadeView
+from .views import (
+    EvolucaoProficienciaView,
+    ProfPorHabilidadeView,
+    ProficienciaDrillDownView,
+    RelatorioSnapshotView,
+    ResultadosCuboView,
+)
 
 urlpatterns = [
     path('rede/<int:secretaria_id>/proficiencia-por-habilidade/', ProfPorHabilidadeView.as_view(), name='relatorio-proficiencia-habilidade'),
+    path('rede/<int:secretaria_id>/proficiencia/', ProficienciaDrillDownView.as_view(), name='relatorio-proficiencia-drilldown'),
+    path('rede/<int:secretaria_id>/cubo/', ResultadosCuboView.as_view(), name='relatorio-cubo'),
+    path('rede/<int:secretaria_id>/evolucao/', EvolucaoProficienciaView.as_view(), name='relatorio-evolucao'),
+    path('avaliacoes/<int:avaliacao_id>/snapshot/', RelatorioSnapshotView.as_view(), name='relatorio-snapshot'),
 ]
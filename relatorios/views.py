@@ -1,41 +1,239 @@
-from django.db.models import Count
+from django.conf import settings
+from django.db.models import Count, F
 from django.utils.dateparse import parse_date
+from django.utils.http import quote_etag
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from avaliacoes.models import Avaliacao
+from core.condicional import ConditionalGetMixin
 from core.tenancy import IsSameSecretaria
 from respostas.models import Resposta
 
+from .services import (
+    DIMENSOES_CUBO,
+    FILTROS_PAI,
+    MEDIDAS_CUBO,
+    NIVEIS,
+    ConsultaCuboInvalida,
+    consultar_cubo,
+    obter_snapshot,
+    proficiencia_drilldown,
+    serie_historica,
+)
 
-class ProfPorHabilidadeView(APIView):
+DRILLDOWN_LIMIT_PADRAO = 50
+DRILLDOWN_LIMIT_MAXIMO = 500
+
+
+def _parse_int_list(raw):
+    return [int(value) for value in raw.split(',') if value.strip().isdigit()]
+
+
+def _parse_int(raw):
+    if raw in (None, ''):
+        return None
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+class ProfPorHabilidadeView(ConditionalGetMixin, APIView):
     permission_classes = [IsSameSecretaria]
+    conditional_models = ('respostas.Resposta', 'itens.Habilidade')
 
     def get(self, request, secretaria_id: int):
         if getattr(request.user, 'role', None) not in {'admin', 'superadmin'}:
             return Response(status=403)
+        nao_modificado = self.conditional_response(request, secretaria_id)
+        if nao_modificado is not None:
+            return nao_modificado
         queryset = Resposta.objects.filter(secretaria_id=secretaria_id, correta=True)
 
         avaliacao_ids = request.query_params.get('avaliacao_id')
         if avaliacao_ids:
             ids = [int(value) for value in avaliacao_ids.split(',') if value.strip().isdigit()]
             if ids:
-                queryset = queryset.filter(prova_aluno__avaliacao_id__in=ids)
+                queryset = queryset.filter(avaliacao_id__in=ids)
 
         data_inicial = request.query_params.get('data_inicial')
         if data_inicial:
             parsed = parse_date(data_inicial)
             if parsed:
-                queryset = queryset.filter(prova_aluno__avaliacao__data_aplicacao__gte=parsed)
+                queryset = queryset.filter(data_aplicacao__gte=parsed)
 
         data_final = request.query_params.get('data_final')
         if data_final:
             parsed = parse_date(data_final)
             if parsed:
-                queryset = queryset.filter(prova_aluno__avaliacao__data_aplicacao__lte=parsed)
+                queryset = queryset.filter(data_aplicacao__lte=parsed)
 
+        # The response key predates the denormalized column and is kept for clients.
+        chave = 'caderno_questao__questao__habilidade__codigo'
         queryset = (
-            queryset.values('caderno_questao__questao__habilidade__codigo')
+            queryset.values(**{chave: F('habilidade__codigo')})
             .annotate(acertos=Count('id'))
-            .order_by('caderno_questao__questao__habilidade__codigo')
+            .order_by(chave)
         )
         return Response(list(queryset))
+
+
+class ProficienciaDrillDownView(ConditionalGetMixin, APIView):
+    """Proficiência agregada por nível (secretaria → escola → turma → aluno)."""
+
+    permission_classes = [IsSameSecretaria]
+    conditional_models = ('respostas.Resposta', 'escolas.Escola', 'escolas.Turma', 'escolas.Aluno')
+
+    def get(self, request, secretaria_id: int):
+        role = getattr(request.user, 'role', None)
+        if role not in {'admin', 'superadmin'}:
+            return Response(status=403)
+        if role != 'superadmin' and request.user.secretaria_id != secretaria_id:
+            return Response(status=403)
+        nao_modificado = self.conditional_response(request, secretaria_id)
+        if nao_modificado is not None:
+            return nao_modificado
+
+        nivel = request.query_params.get('nivel', 'secretaria')
+        if nivel not in NIVEIS:
+            return Response(
+                {'detail': f"Nível inválido. Use um de: {', '.join(NIVEIS)}."},
+                status=400,
+            )
+
+        queryset = Resposta.objects.filter(secretaria_id=secretaria_id)
+        for param, lookup in FILTROS_PAI.items():
+            raw = request.query_params.get(param)
+            if raw in (None, ''):
+                continue
+            valor = _parse_int(raw)
+            if valor is None:
+                return Response({param: 'Informe um identificador numérico.'}, status=400)
+            queryset = queryset.filter(**{lookup: valor})
+
+        after = _parse_int(request.query_params.get('after'))
+        limit = _parse_int(request.query_params.get('limit')) or DRILLDOWN_LIMIT_PADRAO
+        limit = max(1, min(limit, DRILLDOWN_LIMIT_MAXIMO))
+
+        return Response(proficiencia_drilldown(queryset, nivel, after=after, limit=limit))
+
+
+class ResultadosCuboView(ConditionalGetMixin, APIView):
+    """Cubo de resultados com dimensões e medidas escolhidas pelo cliente."""
+
+    permission_classes = [IsSameSecretaria]
+    conditional_models = (
+        'relatorios.FatoResultado', 'avaliacoes.Avaliacao', 'avaliacoes.Caderno', 'itens.Competencia',
+        'itens.Habilidade', 'escolas.Escola', 'escolas.Turma',
+    )
+
+    def get(self, request, secretaria_id: int):
+        role = getattr(request.user, 'role', None)
+        if role not in {'admin', 'superadmin'}:
+            return Response(status=403)
+        if role != 'superadmin' and request.user.secretaria_id != secretaria_id:
+            return Response(status=403)
+        nao_modificado = self.conditional_response(request, secretaria_id)
+        if nao_modificado is not None:
+            return nao_modificado
+
+        params = request.query_params
+        dimensoes = [nome.strip() for nome in params.get('dimensoes', '').split(',') if nome.strip()]
+        medidas = [nome.strip() for nome in params.get('medidas', '').split(',') if nome.strip()]
+        if not medidas:
+            medidas = list(MEDIDAS_CUBO)
+
+        filtros = {}
+        for nome in DIMENSOES_CUBO:
+            raw = params.get(nome)
+            if raw and nome != 'data_aplicacao':
+                filtros[nome] = _parse_int_list(raw)
+
+        try:
+            linhas = consultar_cubo(
+                secretaria_id,
+                dimensoes,
+                medidas,
+                filtros=filtros,
+                data_inicial=parse_date(params.get('data_inicial') or ''),
+                data_final=parse_date(params.get('data_final') or ''),
+            )
+        except ConsultaCuboInvalida as exc:
+            return Response({'detail': str(exc)}, status=400)
+        return Response({'dimensoes': dimensoes, 'medidas': medidas, 'results': linhas})
+
+
+class EvolucaoProficienciaView(ConditionalGetMixin, APIView):
+    """Série histórica de proficiência por habilidade ao longo das avaliações."""
+
+    permission_classes = [IsSameSecretaria]
+    conditional_models = ('relatorios.FatoResultado', 'avaliacoes.Avaliacao', 'itens.Habilidade')
+
+    def get(self, request, secretaria_id: int):
+        role = getattr(request.user, 'role', None)
+        if role not in {'admin', 'superadmin'}:
+            return Response(status=403)
+        if role != 'superadmin' and request.user.secretaria_id != secretaria_id:
+            return Response(status=403)
+        nao_modificado = self.conditional_response(request, secretaria_id)
+        if nao_modificado is not None:
+            return nao_modificado
+
+        params = request.query_params
+        filtros = {}
+        for param in ('escola_id', 'turma_id'):
+            raw = params.get(param)
+            if raw in (None, ''):
+                continue
+            valor = _parse_int(raw)
+            if valor is None:
+                return Response({param: 'Informe um identificador numérico.'}, status=400)
+            filtros[param] = valor
+
+        return Response(
+            serie_historica(
+                secretaria_id,
+                habilidade_ids=_parse_int_list(params.get('habilidade_id', '')),
+                data_inicial=parse_date(params.get('data_inicial') or ''),
+                data_final=parse_date(params.get('data_final') or ''),
+                **filtros,
+            )
+        )
+
+
+class RelatorioSnapshotView(APIView):
+    """Agregados congelados de uma avaliação encerrada, com ETag e cache HTTP."""
+
+    permission_classes = [IsSameSecretaria]
+
+    def get(self, request, avaliacao_id: int):
+        role = getattr(request.user, 'role', None)
+        if role not in {'admin', 'superadmin'}:
+            return Response(status=403)
+
+        snapshot = obter_snapshot(avaliacao_id)
+        if snapshot is not None:
+            secretaria_id = snapshot['secretaria_id']
+        else:
+            secretaria_id = (
+                Avaliacao.objects.filter(pk=avaliacao_id).values_list('secretaria_id', flat=True).first()
+            )
+        # Avaliações of other secretarias look exactly like ids that do not exist.
+        if secretaria_id is None or (role != 'superadmin' and request.user.secretaria_id != secretaria_id):
+            return Response(status=404)
+        if snapshot is None:
+            return Response(
+                {'detail': 'Avaliação sem snapshot: encerre-a para publicar os resultados.'},
+                status=404,
+            )
+
+        etag = quote_etag(snapshot['etag'])
+        cache_control = f"private, max-age={getattr(settings, 'RELATORIO_SNAPSHOT_MAX_AGE', 3600)}"
+        if etag in [valor.strip() for valor in request.headers.get('If-None-Match', '').split(',')]:
+            response = Response(status=304)
+        else:
+            response = Response({**snapshot['dados'], 'gerado_em': snapshot['gerado_em']})
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        return response
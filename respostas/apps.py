@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class RespostasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'respostas'
+
+    def ready(self):
+        from .signals import conectar_sinais
+
+        conectar_sinais()
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.versioning import marcar_alteracao
+from respostas.models import CAMPOS_ANALITICOS, Resposta
+
+
+class Command(BaseCommand):
+    help = 'Preenche as colunas analíticas desnormalizadas de Resposta em lotes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Respostas por lote (padrão: 2000).')
+        parser.add_argument(
+            '--recalcular',
+            action='store_true',
+            help='Recalcula também respostas já preenchidas (ex.: após mudar turma ou habilidade).',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        queryset = Resposta.objects.select_related(
+            'prova_aluno__avaliacao', 'prova_aluno__aluno__turma', 'caderno_questao__questao'
+        ).order_by('id')
+        if not options['recalcular']:
+            queryset = queryset.filter(avaliacao__isnull=True)
+
+        ultimo_id = 0
+        total = 0
+        while True:
+            lote = list(queryset.filter(id__gt=ultimo_id)[:batch_size])
+            if not lote:
+                break
+            for resposta in lote:
+                resposta.preencher_analiticos()
+            with transaction.atomic():
+                Resposta.objects.bulk_update(lote, CAMPOS_ANALITICOS)
+            for secretaria_id in {resposta.secretaria_id for resposta in lote}:
+                marcar_alteracao(Resposta, secretaria_id)
+            ultimo_id = lote[-1].id
+            total += len(lote)
+            self.stdout.write(f'{total} respostas processadas (até id {ultimo_id}).')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfill concluído: {total} respostas atualizadas.'))
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+LOTE_BACKFILL = 5000
+
+
+def preencher_analiticos(apps, schema_editor):
+    """Copy the reporting keys into existing answers, one id range per UPDATE."""
+
+    Resposta = apps.get_model('respostas', 'Resposta')
+    ProvaAluno = apps.get_model('avaliacoes', 'ProvaAluno')
+    CadernoQuestao = apps.get_model('avaliacoes', 'CadernoQuestao')
+    prova = ProvaAluno.objects.filter(pk=OuterRef('prova_aluno_id'))
+    questao = CadernoQuestao.objects.filter(pk=OuterRef('caderno_questao_id'))
+    copias = {
+        'avaliacao_id': Subquery(prova.values('avaliacao_id')[:1]),
+        'data_aplicacao': Subquery(prova.values('avaliacao__data_aplicacao')[:1]),
+        'turma_id': Subquery(prova.values('aluno__turma_id')[:1]),
+        'escola_id': Subquery(prova.values('aluno__turma__escola_id')[:1]),
+        'habilidade_id': Subquery(questao.values('questao__habilidade_id')[:1]),
+        'competencia_id': Subquery(questao.values('questao__competencia_id')[:1]),
+    }
+    ultimo_id = 0
+    while True:
+        ids = list(
+            Resposta.objects.filter(pk__gt=ultimo_id).order_by('pk').values_list('pk', flat=True)[:LOTE_BACKFILL]
+        )
+        if not ids:
+            break
+        Resposta.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]).update(**copias)
+        ultimo_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('avaliacoes', '0004_update_qr_payload'),
+        ('core', '0001_initial'),
+        ('escolas', '0001_initial'),
+        ('itens', '0001_initial'),
+        ('respostas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resposta',
+            name='avaliacao',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='avaliacoes.avaliacao'),
+        ),
+        migrations.AddField(
+            model_name='resposta',
+            name='competencia',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='itens.competencia'),
+        ),
+        migrations.AddField(
+            model_name='resposta',
+            name='data_aplicacao',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='resposta',
+            name='escola',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='escolas.escola'),
+        ),
+        migrations.AddField(
+            model_name='resposta',
+            name='habilidade',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='itens.habilidade'),
+        ),
+        migrations.AddField(
+            model_name='resposta',
+            name='turma',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='escolas.turma'),
+        ),
+        # Before the indexes, so the backfill does not maintain them row by row.
+        migrations.RunPython(preencher_analiticos, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='resposta',
+            index=models.Index(fields=['avaliacao', 'habilidade'], name='resp_avaliacao_hab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resposta',
+            index=models.Index(fields=['avaliacao', 'turma'], name='resp_avaliacao_turma_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resposta',
+            index=models.Index(fields=['escola', 'avaliacao'], name='resp_escola_avaliacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resposta',
+            index=models.Index(fields=['turma', 'avaliacao'], name='resp_turma_avaliacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resposta',
+            index=models.Index(fields=['secretaria', 'data_aplicacao'], name='resp_sec_data_idx'),
+        ),
+    ]
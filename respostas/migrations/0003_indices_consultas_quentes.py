@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('avaliacoes', '0005_indices_consultas_quentes'),
+        ('core', '0001_initial'),
+        ('escolas', '0002_indices_consultas_quentes'),
+        ('itens', '0002_indices_consultas_quentes'),
+        ('respostas', '0002_resposta_campos_analiticos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resposta',
+            index=models.Index(fields=['secretaria', 'correta'], name='resp_sec_correta_idx'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
 
-from avaliacoes.models import CadernoQuestao, ProvaAluno
+from avaliacoes.models import Avaliacao, CadernoQuestao, ProvaAluno
 from core.models import Secretaria
+from escolas.models import Escola, Turma
+from itens.models import Competencia, Habilidade
 
 
 class Resposta(models.Model):
@@ -11,12 +13,76 @@ class Resposta(models.Model):
     alternativa = models.CharField(max_length=1, choices=[(alt, alt) for alt in 'ABCDE'])
     correta = models.BooleanField(null=True)
 
+    # Denormalized reporting keys, copied from prova_aluno/caderno_questao at write
+    # time so aggregations can group and filter without joining; edits to their
+    # sources are copied over by respostas.signals. The composite indexes below
+    # cover the single-column lookups, hence db_index=False.
+    avaliacao = models.ForeignKey(
+        Avaliacao, on_delete=models.CASCADE, null=True, blank=True, db_index=False, related_name='+'
+    )
+    turma = models.ForeignKey(
+        Turma, on_delete=models.SET_NULL, null=True, blank=True, db_index=False, related_name='+'
+    )
+    escola = models.ForeignKey(
+        Escola, on_delete=models.SET_NULL, null=True, blank=True, db_index=False, related_name='+'
+    )
+    habilidade = models.ForeignKey(
+        Habilidade, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    competencia = models.ForeignKey(
+        Competencia, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    data_aplicacao = models.DateField(null=True, blank=True)
+
     class Meta:
         unique_together = ('prova_aluno', 'caderno_questao')
+        indexes = [
+            models.Index(fields=['avaliacao', 'habilidade'], name='resp_avaliacao_hab_idx'),
+            models.Index(fields=['avaliacao', 'turma'], name='resp_avaliacao_turma_idx'),
+            models.Index(fields=['escola', 'avaliacao'], name='resp_escola_avaliacao_idx'),
+            models.Index(fields=['turma', 'avaliacao'], name='resp_turma_avaliacao_idx'),
+            models.Index(fields=['secretaria', 'data_aplicacao'], name='resp_sec_data_idx'),
+            models.Index(fields=['secretaria', 'correta'], name='resp_sec_correta_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"Resp {self.prova_aluno_id}-{self.caderno_questao_id}"
 
+    def preencher_analiticos(self) -> None:
+        """Copy the reporting keys from the related prova and caderno question."""
+        prova = self.prova_aluno
+        turma = prova.aluno.turma
+        questao = self.caderno_questao.questao
+        self.avaliacao_id = prova.avaliacao_id
+        self.data_aplicacao = prova.avaliacao.data_aplicacao
+        self.turma_id = turma.id
+        self.escola_id = turma.escola_id
+        self.habilidade_id = questao.habilidade_id
+        self.competencia_id = questao.competencia_id
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._origem_analiticos = instance._chaves_de_origem()
+        return instance
+
+    def _chaves_de_origem(self) -> tuple:
+        return self.__dict__.get('prova_aluno_id'), self.__dict__.get('caderno_questao_id')
+
+    def save(self, *args, **kwargs):
+        # Refill when the keys are missing or their sources changed (new row, PATCH).
+        origem = getattr(self, '_origem_analiticos', None)
+        if self.avaliacao_id is None or origem != self._chaves_de_origem():
+            self.preencher_analiticos()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *CAMPOS_ANALITICOS}
+        super().save(*args, **kwargs)
+        self._origem_analiticos = self._chaves_de_origem()
+
+
+CAMPOS_ANALITICOS = ('avaliacao', 'turma', 'escola', 'habilidade', 'competencia', 'data_aplicacao')
+
 
 class Gabarito(models.Model):
     secretaria = models.ForeignKey(Secretaria, on_delete=models.PROTECT)
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from .models import Gabarito, Resposta
+from .models import CAMPOS_ANALITICOS, Gabarito, Resposta
 
 
 _ALT_VALIDAS = {'A', 'B', 'C', 'D', 'E'}
@@ -18,7 +18,8 @@ class RespostaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Resposta
         fields = '__all__'
-        read_only_fields = ['secretaria']
+        # Report keys are derived from prova_aluno/caderno_questao by Resposta.save().
+        read_only_fields = ['secretaria', *CAMPOS_ANALITICOS]
 
 
 class GabaritoSerializer(serializers.ModelSerializer):
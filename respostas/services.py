@@ -1,5 +1,25 @@
+from collections import defaultdict
+from typing import Iterable
+
+from django.db import models
+
+from avaliacoes.models import Avaliacao
+from core.versioning import marcar_alteracao
+from escolas.models import Aluno, Turma
+from itens.models import Questao
+from relatorios.services import agendar_atualizacao_fatos
+
 from .models import Gabarito, Resposta
 
+# Sources of the denormalized Resposta columns: the path from Resposta to the
+# source row and the source fields whose change must be copied over.
+FONTES_ANALITICAS = {
+    Avaliacao: ('avaliacao_id', {'data_aplicacao'}),
+    Turma: ('turma_id', {'escola'}),
+    Aluno: ('prova_aluno__aluno_id', {'turma'}),
+    Questao: ('caderno_questao__questao_id', {'habilidade', 'competencia'}),
+}
+
 
 def corrigir_prova(prova_aluno):
     respostas = list(
@@ -29,4 +49,57 @@ def corrigir_prova(prova_aluno):
             acertos += 1
 
     Resposta.objects.bulk_update(respostas, ['correta'])
+    marcar_alteracao(Resposta, prova_aluno.secretaria_id)
     return acertos
+
+
+def _copias(model, objetos: list) -> dict:
+    """Resposta column values implied by each source row, keyed by its pk."""
+
+    if model is Avaliacao:
+        return {obj.pk: {'data_aplicacao': obj.data_aplicacao} for obj in objetos}
+    if model is Turma:
+        return {obj.pk: {'escola_id': obj.escola_id} for obj in objetos}
+    if model is Aluno:
+        escolas = dict(
+            Turma.objects.filter(id__in={obj.turma_id for obj in objetos}).values_list('id', 'escola_id')
+        )
+        return {obj.pk: {'turma_id': obj.turma_id, 'escola_id': escolas.get(obj.turma_id)} for obj in objetos}
+    return {obj.pk: {'habilidade_id': obj.habilidade_id, 'competencia_id': obj.competencia_id} for obj in objetos}
+
+
+def sincronizar_analiticos(objetos: Iterable[models.Model]) -> int:
+    """Copy changed source fields into the Resposta analytics columns.
+
+    ``objetos`` are saved rows of one model of :data:`FONTES_ANALITICAS`. Only
+    answers whose copies differ are rewritten, one UPDATE per distinct value set,
+    and the result facts of the slices they leave and enter are refreshed.
+    """
+
+    objetos = [obj for obj in objetos if obj.pk is not None]
+    if not objetos:
+        return 0
+    caminho, _ = FONTES_ANALITICAS[type(objetos[0])]
+    grupos = defaultdict(list)
+    for pk, valores in _copias(type(objetos[0]), objetos).items():
+        grupos[tuple(sorted(valores.items()))].append(pk)
+
+    total = 0
+    for chave, ids in grupos.items():
+        valores = dict(chave)
+        respostas = Resposta.objects.filter(**{f'{caminho}__in': ids}).exclude(**valores)
+        afetadas = set(respostas.values_list('secretaria_id', 'avaliacao_id', 'turma_id').distinct())
+        if not afetadas:
+            continue
+        total += respostas.update(**valores)
+        fatias = set()
+        for _, avaliacao_id, turma_id in afetadas:
+            if 'data_aplicacao' in valores:
+                # The fact grain carries the date, so the whole avaliação is rebuilt.
+                fatias.add((avaliacao_id, None))
+            else:
+                fatias.update({(avaliacao_id, turma_id), (avaliacao_id, valores.get('turma_id', turma_id))})
+        for secretaria_id in {secretaria_id for secretaria_id, _, _ in afetadas}:
+            marcar_alteracao(Resposta, secretaria_id)
+        agendar_atualizacao_fatos(fatias)
+    return total
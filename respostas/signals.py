@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save
+
+from .services import FONTES_ANALITICAS, sincronizar_analiticos
+
+
+def _sincronizar_analiticos(sender, instance, created, raw, update_fields, **kwargs):
+    # A new source row has no answers yet; fixtures are loaded as they are.
+    if created or raw:
+        return
+    _, campos = FONTES_ANALITICAS[sender]
+    if update_fields is not None and not {nome.removesuffix('_id') for nome in update_fields} & campos:
+        return
+    sincronizar_analiticos([instance])
+
+
+def conectar_sinais() -> None:
+    for model in FONTES_ANALITICAS:
+        post_save.connect(
+            _sincronizar_analiticos,
+            sender=model,
+            dispatch_uid=f'analiticos-save-{model._meta.label}',
+        )
@@ -0,0 +1,282 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from relatorios.models import FatoResultado
+from respostas.models import Resposta
+
+
+@pytest.fixture
+def montar_prova(admin, montar_avaliacao):
+    """Factory for a prova of the admin's secretaria over two unanswered questions."""
+
+    def montar():
+        secretaria = admin.secretaria
+        habilidade = baker.make('itens.Habilidade', secretaria=secretaria)
+        turma = baker.make('escolas.Turma', secretaria=secretaria, escola__secretaria=secretaria)
+        montada = montar_avaliacao(
+            secretaria,
+            habilidades=(habilidade, habilidade),
+            provas=[(turma, ())],
+            competencia=baker.make('itens.Competencia', secretaria=secretaria),
+        )
+        return montada.provas[0], montada.cqs
+
+    return montar
+
+
+def _assert_analiticos(resposta, prova):
+    turma = prova.aluno.turma
+    questao = resposta.caderno_questao.questao
+    assert resposta.avaliacao_id == prova.avaliacao_id
+    assert str(resposta.data_aplicacao) == '2024-06-01'
+    assert resposta.turma_id == turma.id
+    assert resposta.escola_id == turma.escola_id
+    assert resposta.habilidade_id == questao.habilidade_id
+    assert resposta.competencia_id == questao.competencia_id
+
+
+@pytest.mark.django_db
+def test_resposta_save_fills_analytic_columns(admin, montar_prova):
+    secretaria = admin.secretaria
+    prova, cqs = montar_prova()
+
+    resposta = Resposta.objects.create(
+        secretaria=secretaria, prova_aluno=prova, caderno_questao=cqs[0], alternativa='A'
+    )
+
+    resposta.refresh_from_db()
+    _assert_analiticos(resposta, prova)
+
+
+@pytest.mark.django_db
+def test_coleta_respostas_persists_analytic_columns(admin, cliente_api, montar_prova):
+    prova, _ = montar_prova()
+
+    client = cliente_api(admin)
+    response = client.post(
+        reverse('coleta-respostas'),
+        {'prova_aluno_id': prova.id, 'respostas': ['a', 'B']},
+        format='json',
+    )
+
+    assert response.status_code == 200
+    respostas = list(Resposta.objects.filter(prova_aluno=prova).order_by('caderno_questao__ordem'))
+    assert [resposta.alternativa for resposta in respostas] == ['A', 'B']
+    for resposta in respostas:
+        _assert_analiticos(resposta, prova)
+
+
+@pytest.mark.django_db
+def test_backfill_command_fills_missing_rows_in_batches(admin, montar_prova):
+    secretaria = admin.secretaria
+    prova, cqs = montar_prova()
+    for cq in cqs:
+        Resposta.objects.create(
+            secretaria=secretaria, prova_aluno=prova, caderno_questao=cq, alternativa='C'
+        )
+    Resposta.objects.update(
+        avaliacao=None, turma=None, escola=None, habilidade=None, competencia=None, data_aplicacao=None
+    )
+
+    call_command('preencher_analiticos_respostas', batch_size=1)
+
+    for resposta in Resposta.objects.all():
+        _assert_analiticos(resposta, prova)
+
+
+@pytest.mark.django_db
+def test_api_ignores_client_analytics_and_refills_on_patch(admin, cliente_api, montar_prova):
+    secretaria = admin.secretaria
+    prova, cqs = montar_prova()
+    alheia = baker.make('avaliacoes.Avaliacao')
+    client = cliente_api(admin)
+
+    response = client.post(
+        reverse('resposta-list'),
+        {'prova_aluno': prova.id, 'caderno_questao': cqs[0].id, 'alternativa': 'A', 'avaliacao': alheia.id},
+        format='json',
+    )
+    assert response.status_code == 201
+    resposta = Resposta.objects.get(id=response.json()['id'])
+    _assert_analiticos(resposta, prova)
+
+    outra_habilidade = baker.make('itens.Habilidade', secretaria=secretaria)
+    cqs[1].questao.habilidade = outra_habilidade
+    cqs[1].questao.save()
+    response = client.patch(
+        reverse('resposta-detail', args=[resposta.id]), {'caderno_questao': cqs[1].id}, format='json'
+    )
+    assert response.status_code == 200
+    resposta.refresh_from_db()
+    assert resposta.habilidade_id == outra_habilidade.id
+    _assert_analiticos(resposta, prova)
+
+
+def _encerrar(avaliacao):
+    avaliacao.encerrada_em = timezone.now()
+    avaliacao.save()
+
+
+@pytest.mark.django_db
+def test_single_create_refuses_a_closed_avaliacao(admin, cliente_api, montar_prova):
+    prova, cqs = montar_prova()
+    _encerrar(prova.avaliacao)
+    client = cliente_api(admin)
+
+    response = client.post(
+        reverse('resposta-list'),
+        {'prova_aluno': prova.id, 'caderno_questao': cqs[0].id, 'alternativa': 'A'},
+        format='json',
+    )
+
+    assert response.status_code == 409
+    assert not Resposta.objects.exists()
+
+
+@pytest.mark.django_db
+def test_single_update_refuses_a_closed_avaliacao_on_either_side(admin, cliente_api, montar_prova):
+    secretaria = admin.secretaria
+    prova, cqs = montar_prova()
+    fechada, cqs_fechada = montar_prova()
+    resposta = Resposta.objects.create(
+        secretaria=secretaria, prova_aluno=prova, caderno_questao=cqs[0], alternativa='A'
+    )
+    _encerrar(fechada.avaliacao)
+    client = cliente_api(admin)
+    url = reverse('resposta-detail', args=[resposta.id])
+
+    # Moving into a closed avaliação is refused...
+    response = client.patch(url, {'prova_aluno': fechada.id, 'caderno_questao': cqs_fechada[0].id}, format='json')
+    assert response.status_code == 409
+    resposta.refresh_from_db()
+    assert resposta.prova_aluno_id == prova.id
+
+    # ...and so is editing an answer whose avaliação was closed.
+    _encerrar(prova.avaliacao)
+    assert client.patch(url, {'alternativa': 'B'}, format='json').status_code == 409
+    resposta.refresh_from_db()
+    assert resposta.alternativa == 'A'
+
+
+@pytest.mark.django_db
+def test_single_destroy_refuses_a_closed_avaliacao(admin, cliente_api, montar_prova):
+    secretaria = admin.secretaria
+    prova, cqs = montar_prova()
+    resposta = Resposta.objects.create(
+        secretaria=secretaria, prova_aluno=prova, caderno_questao=cqs[0], alternativa='A'
+    )
+    _encerrar(prova.avaliacao)
+    client = cliente_api(admin)
+
+    assert client.delete(reverse('resposta-detail', args=[resposta.id])).status_code == 409
+    assert Resposta.objects.filter(id=resposta.id).exists()
+
+
+@pytest.mark.django_db
+def test_source_edits_refresh_the_copies_and_facts(admin, montar_prova, django_capture_on_commit_callbacks):
+    secretaria = admin.secretaria
+    prova, cqs = montar_prova()
+    resposta = Resposta.objects.create(
+        secretaria=secretaria, prova_aluno=prova, caderno_questao=cqs[0], alternativa='A', correta=True
+    )
+    nova_turma = baker.make('escolas.Turma', secretaria=secretaria, escola__secretaria=secretaria)
+    nova_habilidade = baker.make('itens.Habilidade', secretaria=secretaria)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        prova.aluno.turma = nova_turma
+        prova.aluno.save()
+        questao = cqs[0].questao
+        questao.habilidade = nova_habilidade
+        questao.save()
+        prova.avaliacao.data_aplicacao = '2024-07-01'
+        prova.avaliacao.save()
+
+    resposta.refresh_from_db()
+    assert (resposta.turma_id, resposta.escola_id) == (nova_turma.id, nova_turma.escola_id)
+    assert resposta.habilidade_id == nova_habilidade.id
+    assert str(resposta.data_aplicacao) == '2024-07-01'
+    fato = FatoResultado.objects.get(avaliacao=prova.avaliacao)
+    assert (fato.turma_id, fato.habilidade_id, str(fato.data_aplicacao)) == (
+        nova_turma.id,
+        nova_habilidade.id,
+        '2024-07-01',
+    )
+
+    nova_escola = baker.make('escolas.Escola', secretaria=secretaria)
+    nova_turma.escola = nova_escola
+    nova_turma.save(update_fields=['nome'])
+    resposta.refresh_from_db()
+    assert resposta.escola_id != nova_escola.id
+    nova_turma.save(update_fields=['escola'])
+    resposta.refresh_from_db()
+    assert resposta.escola_id == nova_escola.id
+
+
+@pytest.mark.django_db
+def test_bulk_source_edits_refresh_the_copies(admin, cliente_api, montar_prova):
+    secretaria = admin.secretaria
+    prova, cqs = montar_prova()
+    resposta = Resposta.objects.create(
+        secretaria=secretaria, prova_aluno=prova, caderno_questao=cqs[0], alternativa='A'
+    )
+    nova_turma = baker.make('escolas.Turma', secretaria=secretaria, escola__secretaria=secretaria)
+    client = cliente_api(admin)
+
+    response = client.patch(
+        reverse('aluno-lote'), [{'id': prova.aluno_id, 'turma': nova_turma.id}], format='json'
+    )
+
+    assert response.status_code == 200
+    resposta.refresh_from_db()
+    assert (resposta.turma_id, resposta.escola_id) == (nova_turma.id, nova_turma.escola_id)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_migration_backfills_existing_answers():
+    executor = MigrationExecutor(connection)
+    anterior = [('respostas', '0001_initial')]
+    destino = [('respostas', '0002_resposta_campos_analiticos')]
+    executor.migrate(anterior)
+    executor.loader.build_graph()
+    apps = executor.loader.project_state(list(executor.loader.applied_migrations)).apps
+    secretaria = apps.get_model('core', 'Secretaria').objects.create(nome='Rede')
+    escola = apps.get_model('escolas', 'Escola').objects.create(secretaria=secretaria, nome='E')
+    turma = apps.get_model('escolas', 'Turma').objects.create(secretaria=secretaria, escola=escola, nome='A', ano='5')
+    aluno = apps.get_model('escolas', 'Aluno').objects.create(secretaria=secretaria, turma=turma, nome='Ana')
+    avaliacao = apps.get_model('avaliacoes', 'Avaliacao').objects.create(
+        secretaria=secretaria, titulo='Diagnóstica', data_aplicacao='2024-06-01'
+    )
+    caderno = apps.get_model('avaliacoes', 'Caderno').objects.create(
+        secretaria=secretaria, avaliacao=avaliacao, codigo='C1'
+    )
+    habilidade = apps.get_model('itens', 'Habilidade').objects.create(secretaria=secretaria, codigo='H1')
+    questao = apps.get_model('itens', 'Questao').objects.create(
+        secretaria=secretaria, habilidade=habilidade, enunciado='?'
+    )
+    cq = apps.get_model('avaliacoes', 'CadernoQuestao').objects.create(caderno=caderno, questao=questao, ordem=1)
+    prova = apps.get_model('avaliacoes', 'ProvaAluno').objects.create(
+        secretaria=secretaria, avaliacao=avaliacao, aluno=aluno, caderno=caderno
+    )
+    apps.get_model('respostas', 'Resposta').objects.create(
+        secretaria=secretaria, prova_aluno=prova, caderno_questao=cq, alternativa='A'
+    )
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(destino)
+    Resposta = executor.loader.project_state(destino).apps.get_model('respostas', 'Resposta')
+    resposta = Resposta.objects.get()
+    assert (resposta.avaliacao_id, resposta.turma_id, resposta.escola_id, resposta.habilidade_id) == (
+        avaliacao.id,
+        turma.id,
+        escola.id,
+        habilidade.id,
+    )
+    assert str(resposta.data_aplicacao) == '2024-06-01'
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
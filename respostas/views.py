@@ -1,14 +1,18 @@
 import time
+from typing import Optional
 
 from django.db import transaction
-from rest_framework import status
+from django.db.models import prefetch_related_objects
+from rest_framework import exceptions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import FormParser, MultiPartParser
 
-from avaliacoes.models import Caderno, CadernoQuestao, ProvaAluno
+from avaliacoes.models import Avaliacao, Caderno, CadernoQuestao, ProvaAluno
 from core.tenancy import IsSameSecretaria, TenantScopedViewSet
-from .models import Gabarito, Resposta
+from core.versioning import marcar_alteracao
+from relatorios.services import agendar_atualizacao_fatos, atualizar_fatos
+from .models import CAMPOS_ANALITICOS, Gabarito, Resposta
 from .serializers import (
     GabaritoAnalysisSerializer,
     GabaritoSerializer,
@@ -39,6 +43,23 @@ def _get_caderno_questoes(caderno_id: int) -> list[tuple[int, int]]:
     return questoes
 
 
+def _fatia(resposta: Resposta) -> tuple[Optional[int], Optional[int]]:
+    return resposta.avaliacao_id, resposta.turma_id
+
+
+class AvaliacaoEncerrada(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Avaliação encerrada: reabra-a antes de alterar respostas.'
+    default_code = 'avaliacao_encerrada'
+
+
+def _recusar_encerradas(fatias) -> None:
+    # Raised inside the lote transaction, so nothing of it is kept.
+    avaliacao_ids = {avaliacao_id for avaliacao_id, _ in fatias if avaliacao_id is not None}
+    if Avaliacao.objects.filter(id__in=avaliacao_ids, encerrada_em__isnull=False).exists():
+        raise AvaliacaoEncerrada()
+
+
 class RespostaViewSet(TenantScopedViewSet):
     queryset = Resposta.objects.select_related('prova_aluno', 'caderno_questao')
     serializer_class = RespostaSerializer
@@ -52,6 +73,52 @@ class RespostaViewSet(TenantScopedViewSet):
         'destroy': ['admin'],
     }
 
+    bulk_extra_update_fields = CAMPOS_ANALITICOS
+
+    # Single writes check the slices inside a transaction, like the lote hooks,
+    # so a closed avaliação is left untouched.
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+            _recusar_encerradas([_fatia(serializer.instance)])
+        agendar_atualizacao_fatos([_fatia(serializer.instance)])
+
+    def perform_update(self, serializer):
+        # The answer may move to another prova, so the old slice is checked and refreshed too.
+        anterior = _fatia(serializer.instance)
+        with transaction.atomic():
+            super().perform_update(serializer)
+            fatias = [anterior, _fatia(serializer.instance)]
+            _recusar_encerradas(fatias)
+        agendar_atualizacao_fatos(fatias)
+
+    def perform_destroy(self, instance):
+        _recusar_encerradas([_fatia(instance)])
+        # Resposta has no post_delete receiver (see core.signals), so bump here.
+        super().perform_destroy(instance)
+        marcar_alteracao(Resposta, instance.secretaria_id)
+        agendar_atualizacao_fatos([_fatia(instance)])
+
+    def prepare_bulk_instances(self, instances):
+        # Slices the updated answers leave; new instances have none yet.
+        self._fatias_anteriores = [_fatia(resposta) for resposta in instances if resposta.pk is not None]
+        # Bulk writes skip Resposta.save(); load the sources once for the whole lote.
+        prefetch_related_objects(
+            instances, 'prova_aluno__avaliacao', 'prova_aluno__aluno__turma', 'caderno_questao__questao'
+        )
+        for resposta in instances:
+            resposta.preencher_analiticos()
+
+    def finish_bulk_instances(self, instances):
+        fatias = self._fatias_anteriores + [_fatia(resposta) for resposta in instances]
+        _recusar_encerradas(fatias)
+        agendar_atualizacao_fatos(fatias)
+
+    def finish_bulk_delete(self, instances):
+        fatias = [_fatia(resposta) for resposta in instances]
+        _recusar_encerradas(fatias)
+        agendar_atualizacao_fatos(fatias)
+
 
 class GabaritoViewSet(TenantScopedViewSet):
     queryset = Gabarito.objects.select_related('caderno_questao', 'caderno_questao__caderno')
@@ -76,28 +143,38 @@ class ColetaRespostasView(APIView):
             return Response(status=status.HTTP_403_FORBIDDEN)
         serializer = RespostaInSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        prova_aluno = ProvaAluno.objects.select_related('avaliacao', 'caderno', 'aluno').get(
-            id=serializer.validated_data['prova_aluno_id']
-        )
+        prova_aluno = ProvaAluno.objects.select_related(
+            'avaliacao', 'caderno', 'aluno', 'aluno__turma'
+        ).get(id=serializer.validated_data['prova_aluno_id'])
         if request.user.role != 'superadmin' and request.user.secretaria_id != prova_aluno.secretaria_id:
             return Response(status=status.HTTP_403_FORBIDDEN)
+        if prova_aluno.avaliacao.encerrada:
+            return Response(
+                {'detail': 'Avaliação encerrada: reabra-a antes de alterar respostas.'},
+                status=status.HTTP_409_CONFLICT,
+            )
 
         Resposta.objects.filter(prova_aluno=prova_aluno).delete()
         alternativas = serializer.validated_data['respostas']
         questoes = list(
-            CadernoQuestao.objects.filter(caderno=prova_aluno.caderno).order_by('ordem')
+            CadernoQuestao.objects.filter(caderno=prova_aluno.caderno)
+            .select_related('questao')
+            .order_by('ordem')
         )
-        for idx, alternativa in enumerate(alternativas):
-            if idx >= len(questoes):
-                break
-            cq = questoes[idx]
-            Resposta.objects.create(
+        respostas = []
+        for cq, alternativa in zip(questoes, alternativas):
+            resposta = Resposta(
                 secretaria_id=prova_aluno.secretaria_id,
                 prova_aluno=prova_aluno,
                 caderno_questao=cq,
                 alternativa=alternativa,
             )
+            resposta.preencher_analiticos()
+            respostas.append(resposta)
+        Resposta.objects.bulk_create(respostas)
+        marcar_alteracao(Resposta, prova_aluno.secretaria_id)
         acertos = corrigir_prova(prova_aluno)
+        atualizar_fatos(prova_aluno.avaliacao_id, turma_ids=[prova_aluno.aluno.turma_id])
         return Response({'ok': True, 'acertos': acertos})
 
 